@@ -0,0 +1,117 @@
+import os
+import logging
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.database import utcnow
+from backend.external_integrations.groq_client import summarize_conversation_with_groq
+from backend.scheduler import BACKGROUND, groq_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Turns kept word for word in the prompt; older ones are folded into the summary
+CONVERSATION_RECENT_TURNS = int(os.environ.get("CONVERSATION_RECENT_TURNS", "4"))
+CONVERSATION_SUMMARY_WORDS = int(os.environ.get("CONVERSATION_SUMMARY_WORDS", "150"))
+
+
+def render_history(conversation: Optional[dict], max_turns: int) -> Optional[str]:
+    """Prompt context for the next turn: the running summary plus the latest turns."""
+    if not conversation:
+        return None
+    parts = []
+    if conversation.get("summary"):
+        parts.append(f"Summary of the conversation so far: {conversation['summary']}")
+    turns = (conversation.get("recent") or [])[-max_turns:]
+    if turns:
+        parts.append("Most recent messages:\n" + "\n".join(turn["text"] for turn in turns))
+    return "\n\n".join(parts) or None
+
+
+class ConversationMemory:
+    """
+    Rolling memory of one conversation per relationship, so each new turn is
+    analyzed against a short summary of what came before instead of the whole
+    thread.
+
+    Between `recent_turns` and twice that many of the latest turns are kept
+    verbatim. When the upper bound is reached, `fold()` merges all but the latest
+    `recent_turns` into the summary with a single Groq call that sees only the old
+    summary and those turns, so there's one summary call per `recent_turns` turns.
+    The prompt for every turn, and every fold, stays roughly the same size as the
+    thread grows.
+
+    Documents live in `conversation_summaries`, one per (user_id, relationship_id).
+    """
+
+    def __init__(self, collection, recent_turns: int = CONVERSATION_RECENT_TURNS,
+                 summary_words: int = CONVERSATION_SUMMARY_WORDS):
+        self.collection = collection
+        self.recent_turns = recent_turns
+        self.summary_words = summary_words
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("user_id", 1), ("relationship_id", 1)], unique=True)
+
+    async def get(self, user_id: Optional[str], relationship_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"user_id": user_id, "relationship_id": relationship_id}, {"_id": 0})
+
+    async def history(self, user_id: Optional[str], relationship_id: str) -> Optional[str]:
+        # Turns not folded yet (a fold failed or is in flight) are still shown, up to a cap
+        return render_history(await self.get(user_id, relationship_id), self.recent_turns * 2)
+
+    async def record_turn(self, user_id: Optional[str], relationship_id: str, text: str) -> dict:
+        """Append a turn; returns the updated conversation for `fold()`."""
+        key = {"user_id": user_id, "relationship_id": relationship_id}
+        update = {
+            "$inc": {"turn_count": 1},
+            "$set": {"updated_at": utcnow()},
+            "$setOnInsert": {"summary": "", "summarized_through": 0, "recent": []},
+        }
+        try:
+            counted = await self.collection.find_one_and_update(
+                key, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lost the upsert race for the first turn; the document exists now
+            counted = await self.collection.find_one_and_update(
+                key, update, return_document=ReturnDocument.AFTER
+            )
+        turn = {"seq": counted["turn_count"], "text": text, "at": utcnow()}
+        # Sorting by seq keeps turns in order when two requests for the thread race
+        return await self.collection.find_one_and_update(
+            key,
+            {"$push": {"recent": {"$each": [turn], "$sort": {"seq": 1}}}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def fold(self, conversation: dict):
+        """Merge the turns beyond the verbatim window into the summary once enough have built up."""
+        recent: List[dict] = conversation.get("recent") or []
+        if len(recent) < self.recent_turns * 2:
+            return
+        to_fold = recent[:len(recent) - self.recent_turns]
+        through = to_fold[-1]["seq"]
+        try:
+            summary = await groq_scheduler.run(
+                BACKGROUND,
+                summarize_conversation_with_groq,
+                conversation.get("summary") or "",
+                [turn["text"] for turn in to_fold],
+                self.summary_words,
+            )
+            # Guarded on the summary it extended, so a concurrent fold of the same turns is dropped
+            await self.collection.update_one(
+                {"_id": conversation["_id"], "summarized_through": conversation.get("summarized_through", 0)},
+                {
+                    "$set": {"summary": summary, "summarized_through": through},
+                    "$pull": {"recent": {"seq": {"$lte": through}}},
+                },
+            )
+        except Exception as e:
+            # The turns stay in `recent` and are folded with the next turn
+            logger.warning(f"Could not fold conversation {conversation.get('relationship_id')}: {e}")
+
+    async def delete(self, user_id: Optional[str], relationship_id: str):
+        await self.collection.delete_one({"user_id": user_id, "relationship_id": relationship_id})
@@ -0,0 +1,92 @@
+from datetime import date, datetime, timezone
+
+from bson import json_util
+
+
+def utcnow() -> datetime:
+    """
+    Current UTC time as the naive datetime pymongo hands back, truncated to the
+    millisecond precision BSON stores, so values round-trip unchanged.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC for a datetime; naive values are taken to be UTC already."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def to_json(value):
+    """
+    Convert a document from Mongo into JSON-ready values. Datetimes become ISO
+    strings, the same shape the API returned when timestamps were stored as text.
+    Other BSON types use their extended JSON form ({"$oid": ...}).
+    """
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return to_json(json_util.default(value))
+
+
+class LazyCollection:
+    """Stand-in for a collection looked up before the client exists; resolves on use."""
+
+    def __init__(self, connection: "MongoConnection", name: str):
+        self._connection = connection
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._connection.database[self._name], attr)
+
+
+class MongoConnection:
+    """
+    Motor client for one database, created by `connect()` in the app's lifespan hook
+    rather than at import, so importing the server neither imports Motor nor starts
+    pymongo's monitor threads.
+
+    Attribute access proxies to the database (`db.relationships`, `db.watch`); collections taken
+    before `connect()` resolve when first used. Anything that uses the database
+    before `connect()` was called connects it on demand.
+    """
+
+    def __init__(self, url: str, name: str, **client_kwargs):
+        self.url = url
+        self.name = name
+        self.client_kwargs = client_kwargs
+        self.client = None
+        self._database = None
+
+    def connect(self):
+        if self.client is None:
+            import motor.motor_asyncio
+            self.client = motor.motor_asyncio.AsyncIOMotorClient(self.url, **self.client_kwargs)
+            self._database = self.client[self.name]
+        return self
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self._database = None
+
+    @property
+    def database(self):
+        if self._database is None:
+            self.connect()
+        return self._database
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._database is None:
+            return LazyCollection(self, name)
+        return getattr(self._database, name)
@@ -0,0 +1,197 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from pymongo.errors import OperationFailure
+
+from backend.database import to_json
+from backend.stats import relationship_summary
+
+logger = logging.getLogger(__name__)
+
+EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_KEEPALIVE = float(os.environ.get("EVENTS_KEEPALIVE", "15"))
+EVENTS_RETRY_MS = 3000
+# Bursts of writes within this window produce a single dashboard event
+DASHBOARD_DEBOUNCE = 0.25
+CHANGE_STREAM_RETRY = 5.0
+
+# Raised by servers that can't open change streams (standalone mongod)
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324}
+
+WATCHED_COLLECTIONS = ("analysis_results", "relationships")
+
+# Passed instead of a user_id when a change can't be attributed to one user
+ANY_USER = object()
+
+
+def resync(resource: str) -> dict:
+    return {"type": "resync", "resource": resource}
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(to_json(event))}\n\n"
+
+
+class EventBus:
+    """
+    In-process fan-out of events to every open event stream, one queue each.
+    Events with a `user_id` key only reach that user's streams; others reach all.
+    """
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers: Dict[asyncio.Queue, Optional[str]] = {}
+
+    def subscribe(self, user_id: Optional[str] = None) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self.subscribers[queue] = user_id
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.pop(queue, None)
+
+    def users(self) -> Set[Optional[str]]:
+        return set(self.subscribers.values())
+
+    def publish(self, event: dict):
+        for queue, user_id in list(self.subscribers.items()):
+            if "user_id" in event and event["user_id"] != user_id:
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client fell behind; drop its backlog and have it refetch instead
+                while not queue.empty():
+                    queue.get_nowait()
+                for resource in WATCHED_COLLECTIONS:
+                    queue.put_nowait(resync(resource))
+
+
+class ChangeFeed:
+    """
+    Turns writes to the watched collections into events on an EventBus.
+
+    When the deployment supports change streams (a replica set), a change stream
+    on the database is the source, so every worker sees every write. Otherwise the
+    feed runs in "local" mode: write paths report their changes through
+    `notify()`, and writes made by other worker processes arrive as version bumps
+    through `on_version_change()`.
+
+    Dashboard events carry the full recomputed dashboard of the user who wrote.
+    They are computed once per burst of writes, and only while that user is
+    listening, so the cost scales with writes rather than with viewers.
+    """
+
+    def __init__(self, db, bus: EventBus, dashboard: Callable[[Optional[str]], Awaitable[dict]]):
+        self.db = db
+        self.bus = bus
+        self.dashboard = dashboard
+        self.mode = "local"
+        self._task: Optional[asyncio.Task] = None
+        self._dashboard_task: Optional[asyncio.Task] = None
+        self._dashboard_dirty: Set[Optional[str]] = set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        for task in (self._task, self._dashboard_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+        self._dashboard_task = None
+
+    def notify(self, collection: str, op: str, doc: Optional[dict] = None, user_id=ANY_USER):
+        """
+        Report a write made by this process; ignored while the change stream reports
+        them. The writer is taken from `doc`, or `user_id` when there's no document.
+        """
+        if self.mode == "local":
+            self._handle(collection, op, doc, user_id)
+
+    def on_version_change(self, key: str):
+        """VersionTracker callback for resources bumped by another process."""
+        # Keys are "<resource>" for anonymous data and "<resource>:<user_id>" otherwise
+        resource, _, user_id = key.partition(":")
+        if self.mode == "local" and resource in WATCHED_COLLECTIONS:
+            self._handle(resource, "resync", user_id=user_id or None)
+
+    def _handle(self, collection: str, op: str, doc: Optional[dict] = None, user_id=ANY_USER):
+        if not self.bus.subscribers:
+            return
+        if doc and user_id is ANY_USER:
+            user_id = doc.get("user_id")
+        scope = {} if user_id is ANY_USER else {"user_id": user_id}
+        if collection == "analysis_results":
+            if op == "insert" and doc:
+                self.bus.publish({"type": "analysis", "op": "insert", "analysis": doc, **scope})
+            else:
+                self.bus.publish({**resync(collection), **scope})
+            self._schedule_dashboard(user_id)
+        elif collection == "relationships":
+            if op == "upsert" and doc:
+                # As listed: no flag history or health internals, which grow with every analysis
+                self.bus.publish({"type": "relationship", "op": op, "relationship": relationship_summary(doc), **scope})
+            elif op == "delete" and doc:
+                self.bus.publish({"type": "relationship", "op": op, "relationship": doc, **scope})
+            else:
+                self.bus.publish({**resync(collection), **scope})
+
+    def _schedule_dashboard(self, user_id):
+        listening = self.bus.users()
+        self._dashboard_dirty |= listening if user_id is ANY_USER else listening & {user_id}
+        if self._dashboard_dirty and (self._dashboard_task is None or self._dashboard_task.done()):
+            self._dashboard_task = asyncio.create_task(self._publish_dashboard())
+
+    async def _publish_dashboard(self):
+        while self._dashboard_dirty:
+            await asyncio.sleep(DASHBOARD_DEBOUNCE)
+            users, self._dashboard_dirty = self._dashboard_dirty, set()
+            for user_id in users:
+                try:
+                    data = await self.dashboard(user_id)
+                except Exception as e:
+                    logger.warning(f"Could not compute dashboard for push: {e}")
+                    continue
+                self.bus.publish({"type": "dashboard", "user_id": user_id, "dashboard": data})
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}}}]
+        while True:
+            try:
+                async with self.db.watch(pipeline, full_document="updateLookup") as stream:
+                    self.mode = "change_stream"
+                    logger.info("Push events are sourced from a MongoDB change stream")
+                    async for change in stream:
+                        self._handle_change(change)
+            except asyncio.CancelledError:
+                raise
+            except (OperationFailure, NotImplementedError) as e:
+                if isinstance(e, NotImplementedError) or e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    self.mode = "local"
+                    logger.info("Change streams unavailable; push events are published in-process")
+                    return
+                logger.warning(f"Change stream failed, retrying: {e}")
+            except Exception as e:
+                logger.warning(f"Change stream failed, retrying: {e}")
+            # Writes are published in-process until the stream is back
+            self.mode = "local"
+            await asyncio.sleep(CHANGE_STREAM_RETRY)
+
+    def _handle_change(self, change: dict):
+        collection = change["ns"]["coll"]
+        op = change["operationType"]
+        doc = change.get("fullDocument")
+        if doc:
+            doc.pop("_id", None)
+        if op == "insert":
+            self._handle(collection, "insert" if collection == "analysis_results" else "upsert", doc)
+        elif op in ("update", "replace") and collection == "relationships":
+            self._handle(collection, "upsert", doc)
+        else:
+            # Deletes only carry the Mongo _id, so every listener refetches
+            self._handle(collection, "resync")
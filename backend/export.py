@@ -0,0 +1,114 @@
+import io
+import os
+import csv
+import json
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Optional
+
+from backend.database import to_utc
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "500"))
+# Serialized rows are buffered up to this many bytes before each write to the client
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_COLUMNS = [
+    "id", "created_at", "relationship_id", "relationship_name", "sentiment", "text", "context",
+    "interpretation", "emotional_tone", "communication_style", "relationship_insights",
+    "emotional_maturity_level", "confidence_score", "flags", "suggestions",
+    "potential_triggers", "emotional_flags",
+]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def export_filename(fmt: str, compress: bool, prefix: str = "analyses") -> str:
+    return f"{prefix}.{fmt}" + (".gz" if compress else "")
+
+
+def parse_date_filter(value: Optional[str], name: str) -> Optional[datetime]:
+    """Parse a since/until query value; raises ValueError with a message fit for a 400."""
+    if not value:
+        return None
+    try:
+        return to_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 date or datetime, got {value!r}")
+
+
+def export_query(since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 relationship_id: Optional[str] = None, user_id: Optional[str] = None) -> dict:
+    query = {"user_id": user_id}
+    if relationship_id:
+        query["relationship_id"] = relationship_id
+    created_at = {}
+    if since:
+        created_at["$gte"] = since
+    if until:
+        created_at["$lt"] = until
+    if created_at:
+        query["created_at"] = created_at
+    return query
+
+
+def ndjson_line(doc: dict) -> str:
+    return json.dumps(doc, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def csv_row(doc: dict) -> list:
+    row = []
+    for column in CSV_COLUMNS:
+        value = doc.get(column)
+        if column == "flags":
+            value = "; ".join(f"{f.get('type')}: {f.get('description')}" for f in value or [])
+        elif isinstance(value, list):
+            value = "; ".join(str(item) for item in value)
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        row.append("" if value is None else value)
+    return row
+
+
+async def stream_export(cursor, fmt: str = "ndjson", compress: bool = False) -> AsyncIterator[bytes]:
+    """
+    Serialize documents from a Motor cursor as NDJSON or CSV, optionally gzipped.
+
+    Documents are read one cursor batch at a time and written out in chunks of
+    about EXPORT_CHUNK_BYTES, so memory stays flat however large the history is.
+    """
+    gzip = zlib.compressobj(wbits=31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(CSV_COLUMNS)
+
+    def take() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return gzip.compress(data) if gzip else data
+
+    async for doc in cursor:
+        if writer:
+            writer.writerow(csv_row(doc))
+        else:
+            buffer.write(ndjson_line(doc))
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            chunk = take()
+            if chunk:
+                yield chunk
+
+    chunk = take()
+    if gzip:
+        chunk += gzip.flush()
+    if chunk:
+        yield chunk
@@ -2,16 +2,52 @@ import os
 import json
 import time
 import logging
-from typing import Optional
+from typing import List, Optional
 
-import groq
 from fastapi import HTTPException
 
+from backend.lazy import lazy_import
+from backend.metrics import (
+    GROQ_FALLBACKS,
+    GROQ_PARSE_REPAIRS,
+    GROQ_RETRIES,
+    record_groq_call,
+    record_groq_usage,
+)
+from backend.timing import span
+
 logger = logging.getLogger(__name__)
 
+# The groq SDK is imported on the first analysis rather than at worker startup
+groq = lazy_import("groq")
+
 # Placeholder for GROQ_API_KEY, will be fetched from environment variables
 # GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 
+SYSTEM_PROMPT = "You are an expert emotional intelligence analyst. Always respond with valid JSON only."
+
+# JSON structure the model is asked to return for each analyzed message
+ANALYSIS_JSON_STRUCTURE = """{
+    "sentiment": "positive/negative/neutral",
+    "emotional_tone": "Detailed description of the emotional undertones and feelings expressed",
+    "communication_style": "Analysis of how the person communicates (direct, passive, assertive, etc.)",
+    "potential_triggers": ["specific phrases or topics that might cause emotional reactions"],
+    "suggestions": ["actionable advice for better emotional communication"],
+    "confidence_score": 0.85,
+    "emotional_flags": ["any concerning patterns like anger, desperation, manipulation, etc."],
+    "relationship_insights": "How this communication might affect relationships",
+    "emotional_maturity_level": "Assessment of emotional awareness and regulation shown"
+}"""
+
+def clean_json_response(response_content: str) -> str:
+    """Strip whitespace and markdown code fences from a model response."""
+    cleaned_response = response_content.strip()
+    if cleaned_response.startswith("```json"):
+        cleaned_response = cleaned_response.replace("```json", "").replace("```", "").strip()
+    elif cleaned_response.startswith("```"):
+        cleaned_response = cleaned_response.replace("```", "").strip()
+    return cleaned_response
+
 def transform_groq_response_to_server_format(groq_response: dict, original_text: str) -> dict:
     """
     Transform the enhanced Groq response to match the server's expected format
@@ -89,61 +125,52 @@ def analyze_text_with_groq(text: str, context: Optional[str] = None, model: str
     prompt = f"""You are an expert emotional intelligence analyst. Analyze the following message comprehensively and provide insights that help understand the emotional state, communication patterns, and relationship dynamics.{context_info}
 
 Provide a JSON response with this exact structure:
-{{
-    "sentiment": "positive/negative/neutral",
-    "emotional_tone": "Detailed description of the emotional undertones and feelings expressed",
-    "communication_style": "Analysis of how the person communicates (direct, passive, assertive, etc.)",
-    "potential_triggers": ["specific phrases or topics that might cause emotional reactions"],
-    "suggestions": ["actionable advice for better emotional communication"],
-    "confidence_score": 0.85,
-    "emotional_flags": ["any concerning patterns like anger, desperation, manipulation, etc."],
-    "relationship_insights": "How this communication might affect relationships",
-    "emotional_maturity_level": "Assessment of emotional awareness and regulation shown"
-}}
+{ANALYSIS_JSON_STRUCTURE}
 
 Message to analyze: "{text}"
 
 Important: Respond ONLY with valid JSON. No additional text, explanations, or formatting."""
 
     for attempt in range(max_retries):
+        call_started = time.perf_counter()
         try:
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert emotional intelligence analyst. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt,
-                    }
-                ],
-                model=model,
-                temperature=0.2,  # Slightly higher for more nuanced responses
-                max_tokens=1500,  # Increased for more detailed analysis
-                top_p=0.9
-            )
+            with span("groq_request"):
+                chat_completion = client.chat.completions.create(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user", 
+                            "content": prompt,
+                        }
+                    ],
+                    model=model,
+                    temperature=0.2,  # Slightly higher for more nuanced responses
+                    max_tokens=1500,  # Increased for more detailed analysis
+                    top_p=0.9
+                )
             
+            record_groq_usage(model, getattr(chat_completion, "usage", None))
             response_content = chat_completion.choices[0].message.content
             logger.info(f"Groq API raw response (attempt {attempt + 1}): {response_content[:200]}...")
             
             # Try to parse the JSON response
             try:
-                # Clean the response content
-                cleaned_response = response_content.strip()
-                
-                # Remove any markdown code blocks if present
-                if cleaned_response.startswith("```json"):
-                    cleaned_response = cleaned_response.replace("```json", "").replace("```", "").strip()
-                elif cleaned_response.startswith("```"):
-                    cleaned_response = cleaned_response.replace("```", "").strip()
-                
-                parsed_response = json.loads(cleaned_response)
+                with span("groq_parse"):
+                    # Clean the response content, removing any markdown code blocks if present
+                    cleaned_response = clean_json_response(response_content)
+                    
+                    parsed_response = json.loads(cleaned_response)
                 
                 # Validate required fields
                 required_fields = ["sentiment", "emotional_tone", "communication_style", "confidence_score"]
                 if all(field in parsed_response for field in required_fields):
                     logger.info("Successfully parsed Groq API response")
+                    if cleaned_response != response_content.strip():
+                        GROQ_PARSE_REPAIRS.labels(model=model, kind="fence_strip").inc()
+                    record_groq_call(model, "success", call_started)
                     return parsed_response
                 else:
                     raise ValueError("Missing required fields in response")
@@ -159,29 +186,38 @@ Important: Respond ONLY with valid JSON. No additional text, explanations, or fo
                         parsed_response = json.loads(json_match.group())
                         required_fields = ["sentiment", "emotional_tone", "communication_style"]
                         if all(field in parsed_response for field in required_fields):
-                            return transform_groq_response_to_server_format(parsed_response, text)
+                            repaired_response = transform_groq_response_to_server_format(parsed_response, text)
+                            GROQ_PARSE_REPAIRS.labels(model=model, kind="regex_extract").inc()
+                            record_groq_call(model, "repaired", call_started)
+                            return repaired_response
                     except json.JSONDecodeError:
                         pass
                 
+                record_groq_call(model, "parse_error", call_started)
                 # If this is the last attempt, return fallback
                 if attempt == max_retries - 1:
                     logger.error(f"Failed to parse JSON after {max_retries} attempts")
+                    GROQ_FALLBACKS.labels(model=model, reason="parse_error").inc()
                     return create_fallback_response(text, response_content)
                 else:
+                    GROQ_RETRIES.labels(model=model, reason="parse_error").inc()
                     continue  # Try again
     
         except groq.RateLimitError as e:
             logger.error(f"Groq API rate limit error: {e}")
+            record_groq_call(model, "rate_limited", call_started)
             raise HTTPException(status_code=429, detail="API rate limit exceeded. Please try again later.")
         
         except groq.APIStatusError as e:
             logger.error(f"Groq API status error: {e}")
+            record_groq_call(model, "status_error", call_started)
             if e.status_code == 400:
                 raise HTTPException(status_code=400, detail=f"Invalid request to Groq API: {str(e)}")
             elif e.status_code in [500, 502, 503, 504]:
                 # Server errors - retry if not last attempt
                 if attempt < max_retries - 1:
                     logger.warning(f"Server error (attempt {attempt + 1}), retrying: {e}")
+                    GROQ_RETRIES.labels(model=model, reason="server_error").inc()
                     time.sleep(2 ** attempt)  # Exponential backoff
                     continue
                 else:
@@ -191,8 +227,10 @@ Important: Respond ONLY with valid JSON. No additional text, explanations, or fo
         
         except groq.APIConnectionError as e:
             logger.error(f"Groq API connection error: {e}")
+            record_groq_call(model, "connection_error", call_started)
             if attempt < max_retries - 1:
                 logger.warning(f"Connection error (attempt {attempt + 1}), retrying: {e}")
+                GROQ_RETRIES.labels(model=model, reason="connection_error").inc()
                 time.sleep(2 ** attempt)  # Exponential backoff
                 continue
             else:
@@ -200,17 +238,134 @@ Important: Respond ONLY with valid JSON. No additional text, explanations, or fo
         
         except Exception as e:
             logger.error(f"Unexpected error calling Groq API: {e}")
+            record_groq_call(model, "error", call_started)
             if attempt < max_retries - 1:
                 logger.warning(f"Unexpected error (attempt {attempt + 1}), retrying: {e}")
+                GROQ_RETRIES.labels(model=model, reason="unexpected_error").inc()
                 time.sleep(1)
                 continue
             else:
                 raise HTTPException(status_code=500, detail="Internal server error during text analysis")
     
     # This should never be reached, but just in case
+    GROQ_FALLBACKS.labels(model=model, reason="max_retries").inc()
     return create_fallback_response(text, "Max retries exceeded")
 
 
+def analyze_texts_with_groq(texts: List[str], context: Optional[str] = None, model: str = "llama-3.1-8b-instant") -> Optional[List[dict]]:
+    """
+    Analyze several short texts in a single Groq call.
+
+    Returns one raw analysis dict per text, in order, or None when the packed
+    response cannot be used so the caller can fall back to analyze_text_with_groq
+    for each text. Rate limiting is raised as an HTTPException like the single-text path.
+    """
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        logger.error("GROQ_API_KEY not found in environment variables")
+        raise HTTPException(status_code=500, detail="GROQ API key not configured")
+    if not texts:
+        return []
+
+    client = groq.Groq(api_key=api_key)
+    context_info = f"\n\nAdditional context: {context}" if context else ""
+    numbered_texts = "\n".join(f'{i + 1}. "{text}"' for i, text in enumerate(texts))
+    prompt = f"""You are an expert emotional intelligence analyst. Analyze each of the following {len(texts)} messages independently.{context_info}
+
+Provide a JSON response with this exact structure, with exactly one entry in "results" per message, in the same order:
+{{"results": [{ANALYSIS_JSON_STRUCTURE}]}}
+
+Messages to analyze:
+{numbered_texts}
+
+Important: Respond ONLY with valid JSON. No additional text, explanations, or formatting."""
+
+    call_started = time.perf_counter()
+    try:
+        with span("groq_request"):
+            chat_completion = client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                model=model,
+                temperature=0.2,
+                max_tokens=min(8000, 700 * len(texts)),
+                top_p=0.9
+            )
+        record_groq_usage(model, getattr(chat_completion, "usage", None))
+        response_content = chat_completion.choices[0].message.content
+        results = json.loads(clean_json_response(response_content)).get("results")
+    except groq.RateLimitError as e:
+        logger.error(f"Groq API rate limit error: {e}")
+        record_groq_call(model, "rate_limited", call_started)
+        raise HTTPException(status_code=429, detail="API rate limit exceeded. Please try again later.")
+    except Exception as e:
+        logger.warning(f"Packed analysis of {len(texts)} texts failed: {e}")
+        record_groq_call(model, "error", call_started)
+        return None
+
+    if not isinstance(results, list) or len(results) != len(texts) or not all(isinstance(r, dict) for r in results):
+        logger.warning(f"Packed analysis returned an unusable result set for {len(texts)} texts")
+        record_groq_call(model, "parse_error", call_started)
+        return None
+    record_groq_call(model, "success", call_started)
+    return results
+
+
+def summarize_conversation_with_groq(summary: str, turns: List[str], max_words: int = 150,
+                                     model: str = "llama-3.1-8b-instant") -> str:
+    """
+    Fold new conversation turns into a running summary with one short Groq call.
+
+    Only the previous summary and the new turns are sent, so the prompt stays the
+    same size however long the conversation gets. Raises on any failure; the caller
+    keeps the turns and folds them on a later call.
+    """
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        logger.error("GROQ_API_KEY not found in environment variables")
+        raise HTTPException(status_code=500, detail="GROQ API key not configured")
+
+    client = groq.Groq(api_key=api_key)
+    new_turns = "\n".join(turns)
+    prompt = f"""Update the running summary of a conversation between two people with the new messages below. Keep what matters for understanding how they communicate: recurring topics, unresolved conflicts, emotional shifts and commitments made. Drop small talk.
+
+Previous summary: {summary or "(none, the conversation just started)"}
+
+New messages:
+{new_turns}
+
+Provide a JSON response with this exact structure, the summary at most {max_words} words:
+{{"summary": "updated summary"}}
+
+Important: Respond ONLY with valid JSON. No additional text, explanations, or formatting."""
+
+    call_started = time.perf_counter()
+    try:
+        with span("groq_request"):
+            chat_completion = client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                model=model,
+                temperature=0.2,
+                max_tokens=max_words * 3,
+                top_p=0.9
+            )
+        record_groq_usage(model, getattr(chat_completion, "usage", None))
+        updated = json.loads(clean_json_response(chat_completion.choices[0].message.content))["summary"]
+    except Exception:
+        record_groq_call(model, "error", call_started)
+        raise
+    if not isinstance(updated, str) or not updated.strip():
+        record_groq_call(model, "parse_error", call_started)
+        raise ValueError("Groq returned an empty conversation summary")
+    record_groq_call(model, "success", call_started)
+    return updated.strip()
+
+
 def create_fallback_response(text: str, error_info: str = "") -> dict:
     """Create a fallback response when API analysis fails"""
     fallback_groq_response = {
@@ -229,6 +384,10 @@ def create_fallback_response(text: str, error_info: str = "") -> dict:
     # Transform to server format
     return transform_groq_response_to_server_format(fallback_groq_response, text)
 
+def is_fallback_response(analysis: dict) -> bool:
+    """Whether an analysis is the placeholder from create_fallback_response rather than a real one"""
+    return "analysis_failed" in (analysis.get("emotional_flags") or [])
+
 if __name__ == '__main__':
     # Example usage (requires GROQ_API_KEY to be set in the environment)
     # This part is for testing the module directly and will not be part of the final app.
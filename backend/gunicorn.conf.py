@@ -0,0 +1,53 @@
+"""
+Production gunicorn settings: uvicorn workers serving backend.server:app.
+
+    cd / && gunicorn -c /backend/gunicorn.conf.py backend.server:app
+
+Every value can be overridden from the environment.
+"""
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+bind = os.environ.get("BACKEND_BIND", "0.0.0.0:8001")
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# The app is I/O bound (Groq, Mongo), so one async worker per core keeps every core
+# busy without oversubscribing the CPU-bound parts (JSON and pydantic work)
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# State shared between workers lives in Mongo (jobs, versions behind ETags and the
+# growth plan cache, idempotency keys, leases). What stays per worker is sized per
+# worker on purpose: the similarity index only saves Groq calls, each worker's
+# Groq scheduler and concurrency limit bound that worker's own calls, and journal
+# entries queued in memory are claimed atomically when a worker re-queues them.
+# Data migrations run once per deploy from entrypoint.sh, beside the workers.
+
+# Recycle workers after a jittered number of requests so memory growth can't
+# accumulate, and so workers never restart in lockstep
+max_requests = int(os.environ.get("MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "200"))
+
+# Groq analyses can take tens of seconds; give in-flight requests time to finish
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+
+accesslog = None
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+# Workers write Prometheus samples to a shared directory so /metrics covers all of them
+PROMETHEUS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-multiproc")
+)
+
+
+def on_starting(server):
+    shutil.rmtree(PROMETHEUS_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,204 @@
+"""
+Relationship health scores, kept up to date incrementally.
+
+Every analysis contributes a score in [0, 100] from its sentiment and the
+severity of its flags. The health score is an exponentially weighted moving
+average of those, stored on the relationship (and per user for the dashboard)
+and updated in O(1) on each analysis write. A message arriving soon after the
+last one moves the score by HEALTH_ALPHA of the difference; after a gap the new
+message counts for more, because the older evidence has decayed with a half-life
+of HEALTH_HALF_LIFE_DAYS.
+
+    python -m backend.health                       # rebuild every score from stored analyses
+    python -m backend.health --user u1 --relationship r1
+"""
+import os
+import random
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from backend.database import utcnow
+from backend.external_integrations.groq_client import is_fallback_response
+
+logger = logging.getLogger(__name__)
+
+HEALTH_BASELINE = 75.0
+HEALTH_ALPHA = float(os.environ.get("HEALTH_ALPHA", "0.2"))
+HEALTH_HALF_LIFE_DAYS = float(os.environ.get("HEALTH_HALF_LIFE_DAYS", "7"))
+# Concurrent writers retry the compare-and-set this many times before giving up on the score
+HEALTH_UPDATE_ATTEMPTS = 5
+# Upper bound of the random pause before the first retry, doubling with each one
+HEALTH_RETRY_BACKOFF = 0.005
+HEALTH_RECOMPUTE_BATCH_SIZE = 500
+
+SENTIMENT_SCORES = {"positive": 90.0, "neutral": 70.0, "negative": 40.0}
+FLAG_PENALTY = 8.0
+MAX_FLAG_PENALTY = 40.0
+# Flags mentioning these count several times over; anything else counts once
+FLAG_SEVERITY = {
+    "abuse": 3, "threat": 3, "manipulat": 3, "gaslight": 3, "contempt": 3, "control": 3,
+    "anger": 2, "hostil": 2, "aggress": 2, "desperat": 2, "blame": 2, "dismissive": 2,
+    "defensive": 2, "passive-aggressive": 2,
+}
+
+
+def flag_severity(flag: dict) -> int:
+    text = f"{flag.get('type', '')} {flag.get('description', '')}".lower()
+    return max((weight for keyword, weight in FLAG_SEVERITY.items() if keyword in text), default=1)
+
+
+def analysis_score(sentiment: Optional[str], flags: Iterable[dict]) -> float:
+    """What a single analysis says about the relationship, from 0 to 100."""
+    penalty = min(MAX_FLAG_PENALTY, FLAG_PENALTY * sum(flag_severity(flag) for flag in flags))
+    return max(0.0, min(100.0, SENTIMENT_SCORES.get(sentiment, SENTIMENT_SCORES["neutral"]) - penalty))
+
+
+def update_health(state: Optional[dict], score: float, at: datetime) -> dict:
+    """Fold one analysis score into a health state ({"score", "samples", "updated_at"})."""
+    if not state:
+        state = {"score": HEALTH_BASELINE, "samples": 0, "updated_at": at}
+    gap_days = max(0.0, (at - state["updated_at"]).total_seconds() / 86400)
+    alpha = 1 - (1 - HEALTH_ALPHA) * 0.5 ** (gap_days / HEALTH_HALF_LIFE_DAYS)
+    return {
+        "score": state["score"] + alpha * (score - state["score"]),
+        "samples": state["samples"] + 1,
+        "updated_at": max(at, state["updated_at"]),
+    }
+
+
+def health_fields(state: dict) -> dict:
+    return {"health": state, "health_score": round(state["score"])}
+
+
+async def apply_scores(collection, match: dict, scores: List[Tuple[float, datetime]],
+                       current: Optional[dict] = None,
+                       update: Union[dict, Callable[[List[int]], dict], None] = None,
+                       upsert: bool = False, return_document: bool = False) -> Tuple[Optional[dict], List[int]]:
+    """
+    Fold analysis scores into the health of the document matching `match`,
+    atomically: the new state is computed from the state read and written only
+    if no other writer got there first (compare-and-set on the sample count),
+    retrying otherwise. `current` is the document if the caller already read it;
+    `update` holds other changes to make in the same write, or builds them from
+    the snapshots.
+
+    Only the health score is subject to the compare-and-set: if every attempt
+    conflicts, the scores are dropped but `update` (built with no snapshots) is
+    still applied.
+
+    Returns the rounded score after each analysis, for storing alongside them
+    (empty if nothing matched or the scores were dropped), and with
+    `return_document` the updated document.
+    """
+    def build_update(snapshots: List[int]) -> Optional[dict]:
+        return update(snapshots) if callable(update) else update
+
+    async def apply_without_scores() -> Optional[dict]:
+        changes = build_update([])
+        if not changes:
+            return current
+        return await collection.find_one_and_update(
+            match, changes, projection={"_id": 0}, upsert=upsert, return_document=ReturnDocument.AFTER
+        )
+
+    if not scores:
+        return await apply_without_scores(), []
+    for attempt in range(HEALTH_UPDATE_ATTEMPTS):
+        if attempt:
+            # Spread out writers that keep colliding on the same document
+            await asyncio.sleep(random.uniform(0, HEALTH_RETRY_BACKOFF * 2 ** attempt))
+        if current is None:
+            current = await collection.find_one(match, {"health": 1})
+            if current is None and not upsert:
+                return None, []
+        state = (current or {}).get("health")
+        snapshots = []
+        for score, at in scores:
+            state = update_health(state, score, at)
+            snapshots.append(round(state["score"]))
+        previous = (current or {}).get("health") or {}
+        guard = {**match, "health.samples": previous.get("samples") or {"$in": [0, None]}}
+        changes = {**(build_update(snapshots) or {})}
+        changes["$set"] = {**changes.get("$set", {}), **health_fields(state)}
+        try:
+            result = await collection.update_one(guard, changes, upsert=upsert)
+        except DuplicateKeyError:
+            result = None  # Another writer created the document first
+        if result and (result.matched_count or result.upserted_id is not None):
+            updated = await collection.find_one(match, {"_id": 0}) if return_document else None
+            return updated, snapshots
+        current = None
+    logger.warning(f"Gave up updating health of {match} after {HEALTH_UPDATE_ATTEMPTS} conflicting writes")
+    return await apply_without_scores(), []
+
+
+async def _replay(cursor, snapshots_to=None) -> Optional[dict]:
+    """Health state after every analysis from `cursor`; snapshots are written to `snapshots_to` if given."""
+    state, updates = None, []
+    async for analysis in cursor:
+        # Placeholders stored while Groq was unavailable say nothing about health
+        if is_fallback_response(analysis) or not isinstance(analysis.get("created_at"), datetime):
+            continue
+        state = update_health(state, analysis_score(analysis.get("sentiment"), analysis.get("flags") or []),
+                              analysis["created_at"])
+        if snapshots_to is not None:
+            updates.append(UpdateOne({"_id": analysis["_id"]}, {"$set": {"health_score": round(state["score"])}}))
+            if len(updates) >= HEALTH_RECOMPUTE_BATCH_SIZE:
+                await snapshots_to.bulk_write(updates, ordered=False)
+                updates = []
+    if updates:
+        await snapshots_to.bulk_write(updates, ordered=False)
+    return state
+
+
+async def recompute_health(db, user_id: Optional[str] = None, relationship_id: Optional[str] = None) -> int:
+    """
+    Rebuild health from stored analyses, oldest first: each relationship's state,
+    each user's state (unless one relationship was asked for), and the score
+    snapshot on every analysis. Analyses written while this runs may be lost from
+    the rebuilt score; run it again, or at a quiet time. Returns relationships rebuilt.
+    """
+    projection = {"sentiment": 1, "flags": 1, "emotional_flags": 1, "created_at": 1}
+    relationship_query = {}
+    if user_id is not None:
+        relationship_query["user_id"] = user_id
+    if relationship_id is not None:
+        relationship_query["id"] = relationship_id
+    rebuilt = 0
+    async for relationship in db.relationships.find(relationship_query, {"user_id": 1, "id": 1}):
+        cursor = db.analysis_results.find(
+            {"user_id": relationship.get("user_id"), "relationship_id": relationship["id"]}, projection
+        ).sort("created_at", 1).batch_size(HEALTH_RECOMPUTE_BATCH_SIZE)
+        state = await _replay(cursor, db.analysis_results)
+        state = state or {"score": HEALTH_BASELINE, "samples": 0, "updated_at": utcnow()}
+        await db.relationships.update_one({"_id": relationship["_id"]}, {"$set": health_fields(state)})
+        rebuilt += 1
+
+    if relationship_id is None:
+        users = [user_id] if user_id is not None else await db.analysis_results.distinct("user_id")
+        for user in users:
+            cursor = db.analysis_results.find({"user_id": user}, projection).sort("created_at", 1)
+            state = await _replay(cursor)
+            if state:
+                await db.health_scores.update_one({"user_id": user}, {"$set": health_fields(state)}, upsert=True)
+    return rebuilt
+
+
+if __name__ == "__main__":
+    import argparse
+    import motor.motor_asyncio
+
+    parser = argparse.ArgumentParser(description="Rebuild health scores from stored analyses")
+    parser.add_argument("--user", default=None)
+    parser.add_argument("--relationship", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    client = motor.motor_asyncio.AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    count = asyncio.run(recompute_health(client.test_database, args.user, args.relationship))
+    logger.info(f"Rebuilt health of {count} relationships")
@@ -0,0 +1,164 @@
+"""
+Idempotency keys for write endpoints.
+
+A client that sends an Idempotency-Key header with a POST can retry it safely:
+the first request with a key claims it by inserting a "pending" record, runs,
+and stores its response in the record. A retry with the same key gets the
+stored response back, with no Groq call and no write. A retry that arrives while
+the first is still running waits for it and gets its response too.
+
+Records live in `idempotency_keys` and expire IDEMPOTENCY_TTL seconds after they
+were claimed (TTL index on `created_at`). A key is scoped to one user and route.
+It also remembers a fingerprint of the request it was first used with, and reusing
+it with a different request is an error. Failed requests release their key, so a
+retry runs again. The request holding a key renews its lease (`lease_until`)
+while it runs; a pending record whose lease has lapsed belongs to a worker that
+died mid-request and can be claimed by the next retry.
+"""
+import os
+import uuid
+import hashlib
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.database import utcnow
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_LEASE = float(os.environ.get("IDEMPOTENCY_LEASE", "120"))
+# How long a duplicate waits for the original before giving up with a conflict
+IDEMPOTENCY_MAX_WAIT = float(os.environ.get("IDEMPOTENCY_MAX_WAIT", "60"))
+IDEMPOTENCY_POLL_INTERVAL = 0.2
+MAX_KEY_LENGTH = 255
+
+PENDING = "pending"
+COMPLETED = "completed"
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was first used with a different request."""
+
+
+class IdempotencyKeyInProgress(Exception):
+    """The request first sent with this key is still running after the wait."""
+
+
+def request_fingerprint(path: str, body: bytes) -> str:
+    """Hash of a request as the client sent it; a retry sends the same path and body."""
+    return hashlib.sha256(path.encode() + b"\n" + body).hexdigest()
+
+
+class IdempotencyStore:
+    """Claims, waits on and replays idempotency keys; see the module docstring."""
+
+    def __init__(self, collection, ttl: int = IDEMPOTENCY_TTL, lease: float = IDEMPOTENCY_LEASE,
+                 max_wait: float = IDEMPOTENCY_MAX_WAIT, poll_interval: float = IDEMPOTENCY_POLL_INTERVAL):
+        self.collection = collection
+        self.ttl = ttl
+        self.lease = lease
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        # Requests running in this process, so local duplicates wake as soon as they finish
+        self._running: Dict[str, asyncio.Event] = {}
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl)
+
+    async def run(self, scope: str, key: str, fingerprint: str, produce: Callable[[], Awaitable[Any]],
+                  keep: Callable[[Any], bool] = lambda response: True) -> Tuple[Any, bool]:
+        """
+        The response for `key` within `scope`, and whether it is a replay. `produce`
+        computes a fresh response (a JSON-compatible value) when the key is new; a
+        response for which `keep` is false is returned but not stored, releasing the key.
+        """
+        record_id = f"{scope}:{key}"
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while True:
+            owner = await self._claim(record_id, fingerprint)
+            if owner:
+                break
+            record = await self._wait(record_id, fingerprint, deadline)
+            if record is None:
+                continue  # Released by a failed or abandoned request; try to claim it ourselves
+            if record["fingerprint"] != fingerprint:
+                raise IdempotencyKeyReused(key)
+            if record["status"] == COMPLETED:
+                return record["response"], True
+            raise IdempotencyKeyInProgress(key)
+
+        done = self._running[record_id] = asyncio.Event()
+        renewal = asyncio.create_task(self._renew(record_id, owner))
+        try:
+            response = await produce()
+            if not keep(response):
+                await self.collection.delete_one({"_id": record_id, "owner": owner})
+                return response, False
+        except BaseException:
+            await self.collection.delete_one({"_id": record_id, "owner": owner})
+            raise
+        else:
+            await self.collection.update_one(
+                {"_id": record_id, "owner": owner},
+                {"$set": {"status": COMPLETED, "response": response, "completed_at": utcnow()}},
+            )
+            return response, False
+        finally:
+            renewal.cancel()
+            del self._running[record_id]
+            done.set()
+
+    async def _claim(self, record_id: str, fingerprint: str) -> Optional[str]:
+        """Insert a pending record for the key; the owner token on success, None if it exists."""
+        owner = uuid.uuid4().hex
+        try:
+            now = utcnow()
+            await self.collection.insert_one({
+                "_id": record_id, "fingerprint": fingerprint, "status": PENDING,
+                "owner": owner, "created_at": now, "lease_until": now + timedelta(seconds=self.lease),
+            })
+        except DuplicateKeyError:
+            return None
+        return owner
+
+    async def _renew(self, record_id: str, owner: str):
+        """Keep the lease on a key for as long as its request runs."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self.collection.update_one(
+                    {"_id": record_id, "owner": owner},
+                    {"$set": {"lease_until": utcnow() + timedelta(seconds=self.lease)}},
+                )
+            except Exception as e:
+                logger.warning(f"Could not renew idempotency key {record_id}: {e}")
+
+    async def _wait(self, record_id: str, fingerprint: str, deadline: float) -> Optional[dict]:
+        """
+        The record once it's completed, still pending at `deadline`, or found to be
+        for another request; None once it is gone (abandoned ones are removed first).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            record = await self.collection.find_one({"_id": record_id})
+            if record is None or record["status"] == COMPLETED or record["fingerprint"] != fingerprint:
+                return record
+            if record["lease_until"] < utcnow():
+                logger.warning(f"Taking over abandoned idempotency key {record_id}")
+                await self.collection.delete_one({"_id": record_id, "owner": record["owner"]})
+                return None
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return record
+            done = self._running.get(record_id)
+            if done is None:
+                await asyncio.sleep(min(self.poll_interval, remaining))
+            else:
+                try:
+                    await asyncio.wait_for(done.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
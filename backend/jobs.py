@@ -0,0 +1,262 @@
+import os
+import uuid
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from backend.database import utcnow
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get("JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when retrying the job cannot succeed (e.g. a 400 from Groq)."""
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff before a failed job becomes visible again, capped at 5 minutes."""
+    return min(300.0, 2.0 ** attempts)
+
+
+class JobQueue:
+    """
+    Mongo-backed job queue.
+
+    Jobs are claimed with an atomic find_one_and_update that leases the job for
+    `visibility_timeout` seconds. A running job whose lease has expired (its
+    worker crashed or hung) is claimable again, so no job is lost with its worker.
+    Higher `priority` values are claimed first, FIFO within a priority.
+    """
+
+    def __init__(self, collection, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.collection = collection
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index(
+            [("status", ASCENDING), ("priority", DESCENDING), ("available_at", ASCENDING)]
+        )
+        await self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], priority: int = 0,
+                      max_attempts: Optional[int] = None, user_id: Optional[str] = None) -> dict:
+        now = time.time()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "kind": kind,
+            "payload": payload,
+            "status": JOB_QUEUED,
+            "priority": priority,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.max_attempts,
+            "available_at": now,
+            "lease_expires_at": None,
+            "worker_id": None,
+            "progress": [],
+            "result": None,
+            "error": None,
+            "created_at": utcnow(),
+            "updated_at": utcnow(),
+        }
+        await self.collection.insert_one(dict(job))
+        return job
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        """The job, if it was queued for `user_id`."""
+        return await self.collection.find_one({"id": job_id, "user_id": user_id}, {"_id": 0})
+
+    async def claim(self, worker_id: str) -> Optional[dict]:
+        """Lease the next runnable job, or return None if the queue is empty."""
+        now = time.time()
+        await self.fail_expired(now)
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JOB_QUEUED, "available_at": {"$lte": now}},
+                    {
+                        "status": JOB_RUNNING,
+                        "lease_expires_at": {"$lte": now},
+                        "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+                    },
+                ]
+            },
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + self.visibility_timeout,
+                    "updated_at": utcnow(),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", DESCENDING), ("available_at", ASCENDING)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def fail_expired(self, now: float):
+        """
+        Fail jobs whose lease expired on their last attempt: each of those attempts
+        killed or hung its worker, so another one would too.
+        """
+        await self.collection.update_many(
+            {
+                "status": JOB_RUNNING,
+                "lease_expires_at": {"$lte": now},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+            },
+            {
+                "$set": {
+                    "status": JOB_FAILED,
+                    "error": "Lease expired on the last attempt",
+                    "lease_expires_at": None,
+                    "updated_at": utcnow(),
+                }
+            },
+        )
+
+    async def extend_lease(self, job: dict) -> bool:
+        """Push the lease forward; returns False if another worker has taken the job over."""
+        res = await self.collection.update_one(
+            {"id": job["id"], "worker_id": job["worker_id"], "status": JOB_RUNNING},
+            {"$set": {"lease_expires_at": time.time() + self.visibility_timeout}},
+        )
+        return res.modified_count == 1
+
+    async def save_progress(self, job: dict, progress: List[Any]):
+        """Persist partial results so a retried job can resume instead of starting over."""
+        await self.collection.update_one(
+            {"id": job["id"], "worker_id": job["worker_id"]},
+            {"$set": {"progress": progress, "updated_at": utcnow()}},
+        )
+
+    async def complete(self, job: dict, result: Any):
+        await self.collection.update_one(
+            {"id": job["id"], "worker_id": job["worker_id"]},
+            {
+                "$set": {
+                    "status": JOB_SUCCEEDED,
+                    "result": result,
+                    "error": None,
+                    "lease_expires_at": None,
+                    "updated_at": utcnow(),
+                }
+            },
+        )
+
+    async def fail(self, job: dict, error: str, permanent: bool = False):
+        """Record a failed attempt, re-queueing with backoff while attempts remain."""
+        exhausted = permanent or job["attempts"] >= job.get("max_attempts", self.max_attempts)
+        update = {
+            "error": error[:500],
+            "lease_expires_at": None,
+            "updated_at": utcnow(),
+        }
+        if exhausted:
+            update["status"] = JOB_FAILED
+        else:
+            update["status"] = JOB_QUEUED
+            update["available_at"] = time.time() + retry_delay(job["attempts"])
+        await self.collection.update_one(
+            {"id": job["id"], "worker_id": job["worker_id"]}, {"$set": update}
+        )
+
+
+JobHandler = Callable[[dict, JobQueue], Awaitable[Any]]
+
+
+class WorkerPool:
+    """A fixed number of asyncio tasks that drain a JobQueue, dispatching on job `kind`."""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler],
+                 concurrency: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def start(self):
+        self._stopping.clear()
+        for i in range(self.concurrency):
+            worker_id = f"{os.getpid()}-{i}-{uuid.uuid4().hex[:8]}"
+            self._tasks.append(asyncio.create_task(self._run(worker_id)))
+        logger.info(f"Started {self.concurrency} job workers")
+
+    async def stop(self):
+        # Jobs interrupted here keep their lease and are picked up again once it expires
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker_id: str):
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.claim(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    async def _heartbeat(self, job: dict, run: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 2)
+            if not await self.queue.extend_lease(job):
+                # Another worker has the job now; carrying on would duplicate its writes
+                logger.warning(f"Lost lease on job {job['id']}, stopping it")
+                run.cancel()
+                return
+
+    async def _execute(self, job: dict):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await self.queue.fail(job, f"No handler for job kind '{job['kind']}'", permanent=True)
+            return
+        run = asyncio.create_task(handler(job, self.queue))
+        heartbeat = asyncio.create_task(self._heartbeat(job, run))
+        try:
+            result = await run
+        except PermanentJobError as e:
+            logger.error(f"Job {job['id']} failed permanently: {e}")
+            await self.queue.fail(job, str(e), permanent=True)
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                return  # Lease lost; the job's new holder records the outcome
+            run.cancel()
+            raise
+        except Exception as e:
+            logger.warning(f"Job {job['id']} attempt {job['attempts']} failed: {e}")
+            await self.queue.fail(job, str(e))
+        else:
+            await self.queue.complete(job, result)
+        finally:
+            heartbeat.cancel()
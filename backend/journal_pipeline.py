@@ -0,0 +1,271 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+import logging
+from typing import List, Optional
+
+from backend.external_integrations.groq_client import (
+    analyze_text_with_groq,
+    analyze_texts_with_groq,
+    transform_groq_response_to_server_format,
+)
+from backend.database import utcnow
+from backend.scheduler import BACKGROUND, groq_scheduler
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_BATCH_SIZE = int(os.environ.get("JOURNAL_BATCH_SIZE", "16"))
+JOURNAL_BATCH_WAIT = float(os.environ.get("JOURNAL_BATCH_WAIT", "2.0"))
+JOURNAL_CONCURRENCY = int(os.environ.get("JOURNAL_CONCURRENCY", "4"))
+# Entries at most this long are packed together into a single Groq call
+JOURNAL_PACK_MAX_CHARS = int(os.environ.get("JOURNAL_PACK_MAX_CHARS", "400"))
+JOURNAL_PACK_SIZE = int(os.environ.get("JOURNAL_PACK_SIZE", "5"))
+JOURNAL_MAX_ATTEMPTS = 3
+# A failed entry is retried in-process after this many seconds, doubling per attempt
+JOURNAL_RETRY_BACKOFF = float(os.environ.get("JOURNAL_RETRY_BACKOFF", "5"))
+JOURNAL_RETRY_MAX_BACKOFF = 60.0
+# A pending entry not analyzed within this many seconds is assumed lost with its process
+JOURNAL_STALE_AFTER = float(os.environ.get("JOURNAL_STALE_AFTER", "600"))
+
+JOURNAL_CONTEXT = "This is a private journal entry written as part of a personal growth exercise."
+
+
+def _stat_key(value: str) -> str:
+    """Make a model-provided label safe to use as a Mongo field name."""
+    return re.sub(r"[^a-z0-9_]+", "_", str(value).lower()).strip("_")[:40] or "unknown"
+
+
+def pack_entries(entries: List[dict], max_chars: int = JOURNAL_PACK_MAX_CHARS,
+                 pack_size: int = JOURNAL_PACK_SIZE) -> List[List[dict]]:
+    """Group short entries into packs of up to `pack_size`; long entries go alone."""
+    groups, pack = [], []
+    for entry in entries:
+        if len(entry.get("content") or "") > max_chars:
+            groups.append([entry])
+            continue
+        pack.append(entry)
+        if len(pack) >= pack_size:
+            groups.append(pack)
+            pack = []
+    if pack:
+        groups.append(pack)
+    return groups
+
+
+class JournalPipeline:
+    """
+    Analyzes new journal entries in the background.
+
+    Entries are buffered into batches, short ones are packed into a single Groq
+    call, and at most `concurrency` Groq calls run at once. Results go to
+    `journal_analyses` linked by `entry_id`, and per-user rollups are kept in
+    `journal_stats`. An entry whose analysis or write fails is retried after a
+    backoff, up to JOURNAL_MAX_ATTEMPTS attempts. Entries still marked pending
+    when the process stops are picked up again by `recover()` on the next start.
+    """
+
+    def __init__(self, db, batch_size: int = JOURNAL_BATCH_SIZE, batch_wait: float = JOURNAL_BATCH_WAIT,
+                 concurrency: int = JOURNAL_CONCURRENCY):
+        self.db = db
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._started_at = time.monotonic()
+        self.stats = {
+            "processed": 0,
+            "failed": 0,
+            "groq_calls": 0,
+            "packed_calls": 0,
+            "in_flight": 0,
+            "last_lag_seconds": None,
+            "max_lag_seconds": 0.0,
+            "total_lag_seconds": 0.0,
+        }
+
+    def submit(self, entry: dict):
+        self.queue.put_nowait((time.monotonic(), entry))
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def recover(self):
+        """
+        Re-queue entries a previous process left behind: failed ones with attempts
+        left, and pending ones queued longer ago than JOURNAL_STALE_AFTER. Each entry
+        is claimed atomically (by refreshing `queued_at`), so when several workers
+        start at once every entry is re-queued by exactly one of them.
+        """
+        count = 0
+        while True:
+            entry = await self.db.journal_entries.find_one_and_update(
+                {
+                    "analysis_attempts": {"$lt": JOURNAL_MAX_ATTEMPTS},
+                    "$or": [
+                        {"analysis_status": "failed"},
+                        {"analysis_status": "pending", "queued_at": {"$lt": time.time() - JOURNAL_STALE_AFTER}},
+                        {"analysis_status": "pending", "queued_at": {"$exists": False}},
+                    ],
+                },
+                {"$set": {"analysis_status": "pending", "queued_at": time.time()}},
+                projection={"_id": 0},
+            )
+            if entry is None:
+                break
+            self.submit(entry)
+            count += 1
+        if count:
+            logger.info(f"Re-queued {count} journal entries for analysis")
+
+    def snapshot(self) -> dict:
+        """Pipeline lag and throughput for the status endpoint."""
+        uptime = max(time.monotonic() - self._started_at, 1e-9)
+        processed = self.stats["processed"]
+        return {
+            "queued": self.queue.qsize(),
+            "in_flight": self.stats["in_flight"],
+            "processed": processed,
+            "failed": self.stats["failed"],
+            "groq_calls": self.stats["groq_calls"],
+            "packed_calls": self.stats["packed_calls"],
+            "last_lag_seconds": self.stats["last_lag_seconds"],
+            "max_lag_seconds": self.stats["max_lag_seconds"],
+            "avg_lag_seconds": self.stats["total_lag_seconds"] / processed if processed else None,
+            "throughput_per_minute": processed * 60.0 / uptime,
+        }
+
+    async def _next_batch(self) -> list:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            submitted = {entry["id"]: queued_at for queued_at, entry in batch}
+            entries = [entry for _, entry in batch if entry.get("content")]
+            groups = pack_entries(entries)
+            # Groups run concurrently; the semaphore bounds in-flight Groq calls
+            await asyncio.gather(
+                *(self._process_group(group, submitted) for group in groups),
+                return_exceptions=True,
+            )
+
+    async def _analyze_group(self, group: List[dict]) -> List[dict]:
+        texts = [entry["content"] for entry in group]
+        async with self.semaphore:
+            if len(group) > 1:
+                self.stats["groq_calls"] += 1
+                self.stats["packed_calls"] += 1
+                results = await groq_scheduler.run(BACKGROUND, analyze_texts_with_groq, texts, JOURNAL_CONTEXT)
+                if results is not None:
+                    return [transform_groq_response_to_server_format(r, t) for r, t in zip(results, texts)]
+            # Single entry, or the packed response was unusable: analyze one at a time
+            results = []
+            for text in texts:
+                self.stats["groq_calls"] += 1
+                raw = await groq_scheduler.run(BACKGROUND, analyze_text_with_groq, text, JOURNAL_CONTEXT)
+                results.append(transform_groq_response_to_server_format(raw, text))
+            return results
+
+    async def _process_group(self, group: List[dict], submitted: dict):
+        self.stats["in_flight"] += len(group)
+        try:
+            analyses = await self._analyze_group(group)
+        except Exception as e:
+            logger.error(f"Journal analysis failed for {len(group)} entries: {e}")
+            for entry in group:
+                await self._failed(entry)
+            return
+        finally:
+            self.stats["in_flight"] -= len(group)
+
+        for entry, analysis in zip(group, analyses):
+            try:
+                stored = await self._store(entry, analysis)
+            except Exception as e:
+                logger.error(f"Failed to store analysis for journal entry {entry['id']}: {e}")
+                await self._failed(entry)
+                continue
+            if not stored:
+                continue
+            lag = time.monotonic() - submitted[entry["id"]]
+            self.stats["processed"] += 1
+            self.stats["last_lag_seconds"] = lag
+            self.stats["total_lag_seconds"] += lag
+            self.stats["max_lag_seconds"] = max(self.stats["max_lag_seconds"], lag)
+
+    async def _failed(self, entry: dict):
+        """Record a failed attempt; re-queue the entry after a backoff while attempts remain."""
+        self.stats["failed"] += 1
+        attempts = entry.get("analysis_attempts", 0) + 1
+        retry = attempts < JOURNAL_MAX_ATTEMPTS
+        try:
+            # Left pending while a retry is scheduled, so recover() elsewhere only takes it if this process dies
+            await self.db.journal_entries.update_one(
+                {"id": entry["id"], "analysis_status": {"$ne": "done"}},
+                {"$set": {"analysis_status": "pending" if retry else "failed", "queued_at": time.time()},
+                 "$inc": {"analysis_attempts": 1}},
+            )
+        except Exception as e:
+            logger.warning(f"Could not record failed analysis of journal entry {entry['id']}: {e}")
+        if retry:
+            delay = min(JOURNAL_RETRY_BACKOFF * 2 ** (attempts - 1), JOURNAL_RETRY_MAX_BACKOFF)
+            asyncio.get_running_loop().call_later(delay, self.submit, {**entry, "analysis_attempts": attempts})
+
+    async def _store(self, entry: dict, analysis: dict) -> bool:
+        """Store an entry's analysis and count it; False if another worker already had."""
+        now = utcnow()
+        analysis_doc = {
+            "id": str(uuid.uuid4()),
+            "entry_id": entry["id"],
+            "user_id": entry.get("user_id"),
+            "day": entry.get("day"),
+            "activity_id": entry.get("activity_id"),
+            **analysis,
+            "created_at": now,
+        }
+        await self.db.journal_analyses.insert_one(analysis_doc)
+        # An entry re-queued by recover() while still in flight here is analyzed twice;
+        # only the first to finish marks it done and counts it in the stats
+        result = await self.db.journal_entries.update_one(
+            {"id": entry["id"], "analysis_status": {"$ne": "done"}},
+            {"$set": {"analysis_status": "done", "analysis_id": analysis_doc["id"]},
+             "$inc": {"analysis_attempts": 1}},
+        )
+        if result.modified_count != 1:
+            await self.db.journal_analyses.delete_one({"id": analysis_doc["id"]})
+            return False
+
+        sentiment = _stat_key(analysis.get("sentiment", "neutral"))
+        inc = {"entries_analyzed": 1, f"sentiment_counts.{sentiment}": 1}
+        for flag in analysis.get("emotional_flags", []):
+            key = f"flag_counts.{_stat_key(flag)}"
+            inc[key] = inc.get(key, 0) + 1
+        await self.db.journal_stats.update_one(
+            {"user_id": entry.get("user_id")},
+            {
+                "$inc": inc,
+                "$set": {"last_sentiment": analysis.get("sentiment"), "last_analyzed_at": now},
+            },
+            upsert=True,
+        )
+        return True
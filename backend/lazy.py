@@ -0,0 +1,33 @@
+import sys
+import types
+import importlib
+import threading
+
+
+class _LazyModule(types.ModuleType):
+    """Stands in for a module until first attribute access, then delegates to it."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._module = None
+
+    def _load(self):
+        # Analyses run in worker threads, so the first uses can race; import once
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name: str):
+    """
+    Return module `name` without importing it yet; the import runs on first
+    attribute access. Keeps heavy SDKs out of worker startup until they're used.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
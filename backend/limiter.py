@@ -0,0 +1,127 @@
+"""
+Admission control for interactive analyses.
+
+Each analysis that needs Groq takes a slot from an AdaptiveLimiter. The limit
+follows Groq latency, in the style of a gradient limiter:
+
+- A slow average tracks what latency looks like normally, and a fast one tracks
+  right now.
+- While the two agree and the slots are in use, the limit grows by about
+  sqrt(limit) per sample.
+- When current latency rises past LIMIT_TOLERANCE times normal, the limit shrinks
+  in proportion.
+- Failed calls (errors, fallbacks) cut it by LIMIT_BACKOFF, as in AIMD.
+
+The result is that in-flight calls stay near what Groq serves without queueing.
+A request that finds no free slot is overloaded, and its route's policy decides
+what happens:
+
+- "shed": fail fast with 503 and a Retry-After of about one Groq round trip.
+- "degrade": answer at once with the local placeholder analysis.
+
+Policies are set per route template with OVERLOAD_POLICIES, e.g.
+"/api/analyze=degrade,/api/relationships/{relationship_id}/analyze=shed". Routes
+not listed use OVERLOAD_POLICY.
+"""
+import os
+import math
+from typing import Dict, Optional
+
+from backend.metrics import ANALYSIS_CONCURRENCY_LIMIT, ANALYSIS_IN_FLIGHT
+
+SHED = "shed"
+DEGRADE = "degrade"
+OVERLOAD_ACTIONS = (SHED, DEGRADE)
+
+LIMIT_INITIAL = int(os.environ.get("ANALYZE_LIMIT_INITIAL", "16"))
+LIMIT_MIN = int(os.environ.get("ANALYZE_LIMIT_MIN", "2"))
+LIMIT_MAX = int(os.environ.get("ANALYZE_LIMIT_MAX", "128"))
+# Current latency may be this many times the normal latency before the limit shrinks
+LIMIT_TOLERANCE = float(os.environ.get("ANALYZE_LIMIT_TOLERANCE", "1.5"))
+LIMIT_BACKOFF = 0.9
+# Weights of each sample in the fast and slow latency averages, and in limit changes
+SHORT_ALPHA = 0.1
+LONG_ALPHA = 0.002
+LIMIT_SMOOTHING = 0.2
+
+
+def parse_policies(value: str) -> Dict[str, str]:
+    """Route template -> overload action, from "route=action,..."; raises ValueError on bad entries."""
+    policies = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        route, _, action = entry.rpartition("=")
+        if not route or action not in OVERLOAD_ACTIONS:
+            raise ValueError(f"Bad overload policy {entry!r}: expected <route>={'|'.join(OVERLOAD_ACTIONS)}")
+        policies[route.strip()] = action
+    return policies
+
+
+OVERLOAD_POLICY = os.environ.get("OVERLOAD_POLICY", SHED)
+OVERLOAD_POLICIES = parse_policies(os.environ.get("OVERLOAD_POLICIES", ""))
+
+
+def overload_policy(route: str) -> str:
+    return OVERLOAD_POLICIES.get(route, OVERLOAD_POLICY)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to observed latency; see the module docstring."""
+
+    def __init__(self, name: str, initial: int = LIMIT_INITIAL, min_limit: int = LIMIT_MIN,
+                 max_limit: int = LIMIT_MAX, tolerance: float = LIMIT_TOLERANCE):
+        self.name = name
+        self.limit = float(max(min_limit, min(max_limit, initial)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        ANALYSIS_CONCURRENCY_LIMIT.labels(name).set(int(self.limit))
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        ANALYSIS_IN_FLIGHT.labels(self.name).inc()
+        return True
+
+    def release(self, latency: Optional[float], ok: bool = True):
+        """Give back a slot, with how long its call took and whether it succeeded."""
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        ANALYSIS_IN_FLIGHT.labels(self.name).dec()
+        if latency is None:
+            return
+        if not ok:
+            self._set_limit(self.limit * LIMIT_BACKOFF)
+            return
+        if self.long_latency is None:
+            self.short_latency = self.long_latency = latency
+            return
+        self.short_latency += SHORT_ALPHA * (latency - self.short_latency)
+        self.long_latency += LONG_ALPHA * (latency - self.long_latency)
+        if self.long_latency > self.short_latency * 2:
+            # Latency dropped for good (Groq recovered); stop comparing against the old normal
+            self.long_latency = self.short_latency
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_latency / self.short_latency))
+        if gradient == 1.0 and in_flight * 2 < self.limit:
+            return  # Not using the slots we have, so no evidence a higher limit would be served
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self._set_limit((1 - LIMIT_SMOOTHING) * self.limit + LIMIT_SMOOTHING * target)
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: about one call at current latency."""
+        return max(1, math.ceil(self.short_latency or 1))
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "short_latency": self.short_latency,
+            "long_latency": self.long_latency,
+        }
+
+    def _set_limit(self, limit: float):
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        ANALYSIS_CONCURRENCY_LIMIT.labels(self.name).set(int(self.limit))
@@ -0,0 +1,199 @@
+import os
+import time
+import logging
+import threading
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Label values are always drawn from small fixed sets (route templates, model names,
+# outcome/reason enums, collection and command names) so series counts stay bounded.
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+GROQ_CALL_LATENCY = Histogram(
+    "groq_call_duration_seconds",
+    "Groq chat completion latency by model and outcome",
+    ["model", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+GROQ_RETRIES = Counter(
+    "groq_retries_total",
+    "Groq call attempts that were retried",
+    ["model", "reason"],
+)
+GROQ_FALLBACKS = Counter(
+    "groq_fallbacks_total",
+    "Analyses answered with the local fallback response",
+    ["model", "reason"],
+)
+GROQ_PARSE_REPAIRS = Counter(
+    "groq_parse_repairs_total",
+    "Groq responses that needed cleanup before they parsed",
+    ["model", "kind"],
+)
+GROQ_TOKENS = Counter(
+    "groq_tokens_total",
+    "Tokens consumed by Groq calls",
+    ["model", "kind"],
+)
+GROQ_QUEUE_WAIT = Histogram(
+    "groq_scheduler_wait_seconds",
+    "Time Groq calls waited for a scheduler slot, by priority class",
+    ["priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+GROQ_QUEUED = Gauge(
+    "groq_scheduler_queued",
+    "Groq calls waiting for a scheduler slot, by priority class",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+
+ANALYSIS_REUSE = Counter(
+    "analysis_reuse_total",
+    "Analyses answered from a prior analysis of the same or a near-identical message",
+    ["match"],
+)
+ANALYSIS_IN_FLIGHT = Gauge(
+    "analysis_in_flight",
+    "Interactive analyses holding an admission slot while they call Groq",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+ANALYSIS_CONCURRENCY_LIMIT = Gauge(
+    "analysis_concurrency_limit",
+    "Current adaptive limit on interactive analyses calling Groq",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+ANALYSIS_SHED = Counter(
+    "analysis_shed_total",
+    "Interactive analyses turned away over the concurrency limit, by route and action",
+    ["route", "action"],
+)
+
+MONGO_OPERATION_LATENCY = Histogram(
+    "mongo_operation_duration_seconds",
+    "MongoDB command latency by collection and operation",
+    ["collection", "operation", "outcome"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Commands whose first value names a collection; anything else is recorded without one
+_COLLECTION_COMMANDS = {
+    "find", "insert", "update", "delete", "aggregate", "count", "distinct",
+    "findAndModify", "createIndexes", "getMore", "listIndexes", "drop",
+}
+
+
+def metrics_payload() -> bytes:
+    """
+    Exposition text for /metrics. Under gunicorn, PROMETHEUS_MULTIPROC_DIR is set and
+    every worker writes its samples there, so the scrape aggregates all workers.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def record_groq_call(model: str, outcome: str, started_at: float):
+    GROQ_CALL_LATENCY.labels(model=model, outcome=outcome).observe(time.perf_counter() - started_at)
+
+
+def record_groq_usage(model: str, usage):
+    """Count prompt/completion tokens from a chat completion's `usage`, if it has one."""
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int) and tokens > 0:
+            GROQ_TOKENS.labels(model=model, kind=kind).inc(tokens)
+
+
+# Server-sent event streams stay open for as long as a page does; counting them
+# would keep the in-flight gauge permanently raised
+LONG_LIVED_PATHS = ("/api/events",)
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = None
+        if scope["path"] not in LONG_LIVED_PATHS:
+            in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method=method)
+            in_flight.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if in_flight is not None:
+                in_flight.dec()
+            # FastAPI stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            HTTP_REQUEST_LATENCY.labels(
+                method=method,
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - started_at)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener timing every operation Motor sends to the server."""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        name = event.command_name
+        target = event.command.get(name) if name in _COLLECTION_COMMANDS else None
+        if name == "getMore":
+            target = event.command.get("collection")
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = (
+                target if isinstance(target, str) else "none"
+            )
+
+    def _observe(self, event, outcome: str):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        MONGO_OPERATION_LATENCY.labels(
+            collection=collection, operation=event.command_name, outcome=outcome
+        ).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._observe(event, "success")
+
+    def failed(self, event):
+        self._observe(event, "error")
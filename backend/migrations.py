@@ -0,0 +1,230 @@
+"""
+Data migrations. Completed migrations are recorded in the `migrations` collection
+and skipped on later runs.
+
+entrypoint.sh runs them once per deploy, in the background once the backend
+has started: they are batched and paced so they can run under traffic, and
+readiness doesn't wait for them. Rebuilds like `recompute_health` may miss
+analyses written while they run; rerun them at a quiet time if that matters.
+The app's workers never run them. A run holds a lease in the same collection, so
+containers started together don't migrate twice; the others skip.
+
+    python -m backend.migrations          # run pending migrations and exit
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from backend.database import to_utc, utcnow
+from backend.health import recompute_health
+from backend.stats import rebuild_stats
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "500"))
+# Pause between batches so a migration never saturates Mongo
+MIGRATION_BATCH_PAUSE = float(os.environ.get("MIGRATION_BATCH_PAUSE", "0.05"))
+# A run that holds the lease longer than this is assumed dead and can be taken over
+MIGRATION_LEASE = float(os.environ.get("MIGRATION_LEASE", "3600"))
+MIGRATION_LEASE_ID = "_lease"
+
+# Top-level timestamp fields that used to be written as datetime.now().isoformat()
+TIMESTAMP_FIELDS = {
+    "analysis_results": ["created_at", "sent_at"],
+    "relationships": ["created_at", "last_contact", "updated_at"],
+}
+# Converted by a later migration, since timestamps_to_datetimes has already run
+LATER_TIMESTAMP_FIELDS = {
+    "journal_entries": ["created_at"],
+    "journal_analyses": ["created_at"],
+    "journal_stats": ["last_analyzed_at"],
+    "growth_plans": ["created_at", "updated_at"],
+    "analysis_jobs": ["created_at", "updated_at"],
+}
+
+
+def parse_legacy_timestamp(value) -> Optional[datetime]:
+    """
+    Datetime for a stored ISO string, or None if it isn't one. Legacy strings carry
+    no zone; the server has always run in UTC, so they're read as UTC.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return to_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+def _convert_flag_history(history) -> Optional[list]:
+    if not isinstance(history, list):
+        return None
+    changed = False
+    converted = []
+    for entry in history:
+        parsed = parse_legacy_timestamp(entry.get("date")) if isinstance(entry, dict) else None
+        if parsed:
+            entry = {**entry, "date": parsed}
+            changed = True
+        converted.append(entry)
+    return converted if changed else None
+
+
+def timestamp_update(doc: dict, fields) -> Optional[UpdateOne]:
+    """The update converting one document's string timestamps, guarded by their old values."""
+    match, update = {"_id": doc["_id"]}, {}
+    for field in fields:
+        parsed = parse_legacy_timestamp(doc.get(field))
+        if parsed:
+            match[field] = doc[field]
+            update[field] = parsed
+    history = _convert_flag_history(doc.get("flag_history"))
+    if history is not None:
+        # A $push since the read changes the size, so the update misses and the next pass retries
+        match["flag_history"] = {"$size": len(history)}
+        update["flag_history"] = history
+    return UpdateOne(match, {"$set": update}) if update else None
+
+
+async def migrate_timestamps(db, batch_size: int = MIGRATION_BATCH_SIZE, pause: float = MIGRATION_BATCH_PAUSE,
+                             timestamp_fields: Dict[str, List[str]] = TIMESTAMP_FIELDS) -> int:
+    """Rewrite ISO-string timestamps as BSON datetimes. Returns documents converted."""
+    converted = 0
+    for name, fields in timestamp_fields.items():
+        collection = getattr(db, name)
+        pending = [{field: {"$type": "string"}} for field in fields]
+        if name == "relationships":
+            pending.append({"flag_history.date": {"$type": "string"}})
+        projection = {field: 1 for field in fields + ["flag_history"]}
+        last_id = None
+        while True:
+            # Page by _id so unparseable values are skipped instead of re-read forever
+            query = {"$or": pending} if last_id is None else {"$or": pending, "_id": {"$gt": last_id}}
+            docs = await collection.find(query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            updates = [u for u in (timestamp_update(doc, fields) for doc in docs) if u]
+            if updates:
+                result = await collection.bulk_write(updates, ordered=False)
+                converted += result.modified_count
+            last_id = docs[-1]["_id"]
+            await asyncio.sleep(pause)
+        logger.info(f"Timestamp migration finished for {name}")
+    return converted
+
+
+# Collections partitioned by user, and the unscoped indexes the user_id-led ones replace
+USER_PARTITIONED = {
+    "analysis_results": ["created_at_-1", "relationship_id_1_created_at_-1"],
+    "relationships": [],
+    "transcript_imports": [],
+}
+
+
+async def backfill_user_ids(db, batch_size: int = MIGRATION_BATCH_SIZE,
+                            pause: float = MIGRATION_BATCH_PAUSE) -> int:
+    """
+    Give documents written before per-user partitioning an explicit null user_id
+    (the anonymous user's partition), then drop the indexes that didn't lead with
+    user_id. Returns documents updated.
+    """
+    updated = 0
+    missing = {"user_id": {"$exists": False}}
+    for name, superseded in USER_PARTITIONED.items():
+        collection = getattr(db, name)
+        last_id = None
+        while True:
+            query = missing if last_id is None else {**missing, "_id": {"$gt": last_id}}
+            docs = await collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            # Guarded by the field still being absent, so a user_id written meanwhile is kept
+            updates = [UpdateOne({"_id": doc["_id"], **missing}, {"$set": {"user_id": None}}) for doc in docs]
+            result = await collection.bulk_write(updates, ordered=False)
+            updated += result.modified_count
+            last_id = docs[-1]["_id"]
+            await asyncio.sleep(pause)
+        for index in superseded:
+            try:
+                await collection.drop_index(index)
+            except OperationFailure:
+                pass  # Never created, or already dropped by another worker
+        logger.info(f"user_id backfill finished for {name}")
+    return updated
+
+
+async def dedupe_growth_plans(db) -> int:
+    """
+    Collapse duplicate growth plans to one per user, then build the unique index
+    on user_id that keeps it that way. Concurrent first GETs used to insert a
+    default plan each; the most recently updated plan is kept. Returns plans removed.
+    """
+    removed = 0
+    duplicates = db.growth_plans.aggregate([
+        {"$sort": {"updated_at": -1, "_id": 1}},
+        {"$group": {"_id": "$user_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    async for group in duplicates:
+        result = await db.growth_plans.delete_many({"_id": {"$in": group["ids"][1:]}})
+        removed += result.deleted_count
+    await db.growth_plans.create_index("user_id", unique=True)
+    logger.info(f"Removed {removed} duplicate growth plans")
+    return removed
+
+
+# Applied in order; names are recorded once a migration completes
+MIGRATIONS = [
+    ("timestamps_to_datetimes", migrate_timestamps),
+    ("backfill_user_ids", backfill_user_ids),
+    ("recompute_health", recompute_health),
+    ("relationship_stats", rebuild_stats),
+    ("dedupe_growth_plans", dedupe_growth_plans),
+    ("more_timestamps_to_datetimes", lambda db: migrate_timestamps(db, timestamp_fields=LATER_TIMESTAMP_FIELDS)),
+]
+
+
+async def run_migrations(db) -> bool:
+    """Run pending migrations; False if another process holds the lease."""
+    now = utcnow()
+    try:
+        await db.migrations.update_one(
+            {"_id": MIGRATION_LEASE_ID, "$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}]},
+            {"$set": {"lease_until": now + timedelta(seconds=MIGRATION_LEASE)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    try:
+        for name, migration in MIGRATIONS:
+            if await db.migrations.find_one({"_id": name, "completed_at": {"$exists": True}}):
+                continue
+            logger.info(f"Running migration {name}")
+            result = await migration(db)
+            await db.migrations.update_one(
+                {"_id": name}, {"$set": {"completed_at": utcnow(), "result": result}}, upsert=True
+            )
+            logger.info(f"Migration {name} complete: {result}")
+    finally:
+        await db.migrations.update_one({"_id": MIGRATION_LEASE_ID}, {"$set": {"lease_until": None}})
+    return True
+
+
+if __name__ == "__main__":
+    import sys
+    import motor.motor_asyncio
+
+    logging.basicConfig(level=logging.INFO)
+    client = motor.motor_asyncio.AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    try:
+        if not asyncio.run(run_migrations(client.test_database)):
+            logger.info("Another process is running migrations")
+    except Exception:
+        # Completed migrations stay recorded; the failed one runs again on the next start
+        logger.exception("Data migrations failed")
+        sys.exit(1)
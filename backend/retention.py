@@ -0,0 +1,180 @@
+"""
+Retention for analysis_results.
+
+Analyses older than ANALYSIS_RETENTION_DAYS are compacted. The full documents are
+copied, a batch at a time, into `analysis_archive` as gzipped NDJSON (the export
+format), then the bulky text fields are removed from the originals. What's left
+(ids, timestamps, sentiment, flags, health snapshots) is all the dashboard,
+relationship stats and health recomputes read, so rollups are unchanged while the
+documents, and the text search index, stop growing with old message text.
+
+A TTL index can only delete whole documents, so archiving runs as a job instead:
+every ARCHIVE_INTERVAL seconds in one backend worker (whichever takes the lease),
+or on demand:
+
+    python -m backend.retention --days 180
+"""
+import os
+import gzip
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Set
+
+from bson.binary import Binary
+from pymongo.errors import DuplicateKeyError
+
+from backend.database import utcnow
+from backend.export import ndjson_line
+
+logger = logging.getLogger(__name__)
+
+# 0 keeps analyses in full forever
+ANALYSIS_RETENTION_DAYS = int(os.environ.get("ANALYSIS_RETENTION_DAYS", "0"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL = float(os.environ.get("ARCHIVE_INTERVAL", "3600"))
+# Pause between batches so archiving never saturates Mongo
+ARCHIVE_BATCH_PAUSE = float(os.environ.get("ARCHIVE_BATCH_PAUSE", "0.05"))
+
+# Removed from archived analyses; everything else stays in analysis_results
+ARCHIVED_FIELDS = (
+    "text", "context", "interpretation", "suggestions", "emotional_tone", "communication_style",
+    "potential_triggers", "relationship_insights", "emotional_maturity_level",
+)
+
+OnArchived = Callable[[Optional[str], Set[str]], Awaitable[None]]
+
+
+def pack(docs: List[dict]) -> bytes:
+    return gzip.compress("".join(ndjson_line(doc) for doc in docs).encode("utf-8"))
+
+
+def unpack(data: bytes) -> List[dict]:
+    """Analyses stored in an archive document's `data`, with timestamps as ISO strings."""
+    return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines()]
+
+
+async def archive_batch(db, user_id: Optional[str], docs: List[dict]) -> int:
+    """Archive one user's analyses and compact the originals. Returns analyses compacted."""
+    archive_id = str(uuid.uuid4())
+    ids = [doc["id"] for doc in docs]
+    await db.analysis_archive.insert_one({
+        "id": archive_id,
+        "user_id": user_id,
+        "count": len(docs),
+        "first_created_at": docs[0]["created_at"],
+        "last_created_at": docs[-1]["created_at"],
+        "analysis_ids": ids,
+        "format": "ndjson.gz",
+        "data": Binary(pack(docs)),
+        "archived_at": utcnow(),
+    })
+    # If this step fails the batch is archived again next time; readers dedupe by id
+    result = await db.analysis_results.update_many(
+        {"user_id": user_id, "id": {"$in": ids}, "archived_at": {"$exists": False}},
+        {"$unset": {field: "" for field in ARCHIVED_FIELDS}, "$set": {"archived_at": utcnow(), "archive_id": archive_id}},
+    )
+    return result.modified_count
+
+
+async def archive_analyses(db, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE,
+                           pause: float = ARCHIVE_BATCH_PAUSE, on_archived: Optional[OnArchived] = None) -> int:
+    """
+    Archive every analysis created before `cutoff` that isn't archived yet, user
+    by user along the (user_id, archived_at, created_at) index. Runs don't resume
+    from a created_at reached last time: imported analyses are inserted with
+    their original, older timestamps. Returns analyses compacted.
+    """
+    archived = 0
+    for user_id in await db.analysis_results.distinct("user_id"):
+        start = None
+        while True:
+            created_at = {"$lt": cutoff}
+            if start:
+                created_at["$gte"] = start
+            docs = await db.analysis_results.find(
+                {"user_id": user_id, "created_at": created_at, "archived_at": {"$exists": False}}, {"_id": 0}
+            ).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            archived += await archive_batch(db, user_id, docs)
+            # Later batches start at this one's end, not back over what's archived
+            start = docs[-1]["created_at"]
+            if on_archived:
+                await on_archived(user_id, {doc["relationship_id"] for doc in docs if doc.get("relationship_id")})
+            await asyncio.sleep(pause)
+    return archived
+
+
+class RetentionJob:
+    """
+    Runs `archive_analyses` every `interval` seconds. Workers share a lease in the
+    `retention` collection so only one archives at a time.
+    """
+
+    LEASE_ID = "analysis_results"
+
+    def __init__(self, db, retention_days: int = ANALYSIS_RETENTION_DAYS, interval: float = ARCHIVE_INTERVAL,
+                 on_archived: Optional[OnArchived] = None):
+        self.db = db
+        self.retention_days = retention_days
+        self.interval = interval
+        self.on_archived = on_archived
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        await self.db.analysis_archive.create_index("id", unique=True)
+        await self.db.analysis_archive.create_index([("user_id", 1), ("first_created_at", 1)])
+        # Unarchived analyses (no archived_at) of a user, oldest first
+        await self.db.analysis_results.create_index([("user_id", 1), ("archived_at", 1), ("created_at", 1)])
+
+    def start(self):
+        if self.retention_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"Archiving old analyses failed, will retry: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> Optional[int]:
+        """Archive analyses past retention; None if another worker holds the lease."""
+        now = now or utcnow()
+        try:
+            await self.db.retention.update_one(
+                {"_id": self.LEASE_ID, "$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}]},
+                {"$set": {"lease_until": now + timedelta(seconds=self.interval)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+        cutoff = now - timedelta(days=self.retention_days)
+        archived = await archive_analyses(self.db, cutoff, on_archived=self.on_archived)
+        if archived:
+            logger.info(f"Archived {archived} analyses created before {cutoff.isoformat()}")
+        return archived
+
+
+if __name__ == "__main__":
+    import argparse
+    import motor.motor_asyncio
+
+    parser = argparse.ArgumentParser(description="Archive analyses older than the retention period")
+    parser.add_argument("--days", type=int, default=ANALYSIS_RETENTION_DAYS or None, required=not ANALYSIS_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    client = motor.motor_asyncio.AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    count = asyncio.run(RetentionJob(client.test_database, args.days).run_once())
+    logger.info("Another worker is archiving" if count is None else f"Archived {count} analyses")
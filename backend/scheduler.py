@@ -0,0 +1,146 @@
+"""
+One scheduler for every Groq call in the process.
+
+Interactive analyses, batch work (analysis jobs, transcript imports) and
+background work (journal entries, conversation summaries) share GROQ_CONCURRENCY
+slots and the threads that make the blocking SDK calls. When slots are free a call
+starts at once. Otherwise it waits in its class's queue, and freed slots go to
+the waiting call with the smallest start tag (start-time fair queuing). Classes
+therefore share a saturated scheduler in proportion to PRIORITY_WEIGHTS.
+
+Batch and background classes are also capped below GROQ_CONCURRENCY, so a large
+import can never occupy every slot; interactive calls always find one within a
+Groq round trip. A call that has waited more than GROQ_MAX_QUEUE_WAIT seconds is
+served next regardless of weight, so no class starves.
+"""
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+from backend.metrics import GROQ_QUEUED, GROQ_QUEUE_WAIT
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+
+GROQ_CONCURRENCY = int(os.environ.get("GROQ_CONCURRENCY", "16"))
+GROQ_BATCH_CONCURRENCY = int(os.environ.get("GROQ_BATCH_CONCURRENCY", str(max(1, GROQ_CONCURRENCY // 2))))
+GROQ_BACKGROUND_CONCURRENCY = int(os.environ.get("GROQ_BACKGROUND_CONCURRENCY", str(max(1, GROQ_CONCURRENCY // 4))))
+GROQ_MAX_QUEUE_WAIT = float(os.environ.get("GROQ_MAX_QUEUE_WAIT", "30"))
+PRIORITY_WEIGHTS = {INTERACTIVE: 8, BATCH: 3, BACKGROUND: 1}
+
+
+class _Waiter:
+    __slots__ = ("future", "tag", "queued_at")
+
+    def __init__(self, future: asyncio.Future, tag: float, queued_at: float):
+        self.future = future
+        self.tag = tag
+        self.queued_at = queued_at
+
+
+class _PriorityClass:
+    def __init__(self, name: str, weight: int, limit: int):
+        self.name = name
+        self.weight = weight
+        self.limit = limit
+        self.running = 0
+        self.finish_tag = 0.0
+        self.waiting: Deque[_Waiter] = deque()
+
+
+class GroqScheduler:
+    """Weighted fair queuing of Groq calls across priority classes; see the module docstring."""
+
+    def __init__(self, concurrency: int = GROQ_CONCURRENCY, limits: Optional[Dict[str, int]] = None,
+                 weights: Optional[Dict[str, int]] = None, max_wait: float = GROQ_MAX_QUEUE_WAIT):
+        limits = {
+            INTERACTIVE: concurrency,
+            BATCH: min(concurrency, GROQ_BATCH_CONCURRENCY),
+            BACKGROUND: min(concurrency, GROQ_BACKGROUND_CONCURRENCY),
+            **(limits or {}),
+        }
+        weights = {**PRIORITY_WEIGHTS, **(weights or {})}
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.classes = {name: _PriorityClass(name, weights[name], limits[name]) for name in weights}
+        self.running = 0
+        self.virtual_time = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, priority: str, func: Callable[..., T], *args, **kwargs) -> T:
+        """Call blocking `func` in a worker thread once a slot for `priority` is free."""
+        await self.acquire(priority)
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="groq")
+            # Like asyncio.to_thread, the call sees this task's context (request timing spans)
+            call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self.release(priority)
+
+    async def acquire(self, priority: str):
+        cls = self.classes[priority]
+        tag = max(self.virtual_time, cls.finish_tag)
+        cls.finish_tag = tag + 1.0 / cls.weight
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tag, time.monotonic())
+        cls.waiting.append(waiter)
+        GROQ_QUEUED.labels(priority).inc()
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if not waiter.future.cancelled():
+                # Granted a slot just as the caller gave up; hand it on
+                self.release(priority)
+            elif waiter in cls.waiting:
+                cls.waiting.remove(waiter)
+                GROQ_QUEUED.labels(priority).dec()
+            raise
+        GROQ_QUEUE_WAIT.labels(priority).observe(time.monotonic() - waiter.queued_at)
+
+    def release(self, priority: str):
+        self.classes[priority].running -= 1
+        self.running -= 1
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        return {
+            name: {"running": cls.running, "waiting": len(cls.waiting), "limit": cls.limit, "weight": cls.weight}
+            for name, cls in self.classes.items()
+        }
+
+    def _start(self, cls: _PriorityClass, tag: float):
+        cls.running += 1
+        self.running += 1
+        self.virtual_time = max(self.virtual_time, tag)
+
+    def _dispatch(self):
+        while self.running < self.concurrency:
+            eligible = [cls for cls in self.classes.values() if cls.waiting and cls.running < cls.limit]
+            if not eligible:
+                return
+            starved_before = time.monotonic() - self.max_wait
+            starved = [cls for cls in eligible if cls.waiting[0].queued_at < starved_before]
+            if starved:
+                cls = min(starved, key=lambda c: c.waiting[0].queued_at)
+            else:
+                cls = min(eligible, key=lambda c: c.waiting[0].tag)
+            waiter = cls.waiting.popleft()
+            GROQ_QUEUED.labels(cls.name).dec()
+            if waiter.future.done():
+                continue  # Cancelled while queued
+            self._start(cls, waiter.tag)
+            waiter.future.set_result(None)
+
+
+# Shared by every module that calls Groq, so all of them draw from the same slots
+groq_scheduler = GroqScheduler()
@@ -0,0 +1,119 @@
+"""
+Full-text search over a user's analysis history.
+
+Backed by one Mongo text index on `text`, `interpretation` and `suggestions`,
+with `user_id` as an equality prefix so each search only reads that user's
+index entries. Results are ordered by relevance ("score") or newest first
+("recent") and paged with an opaque cursor holding the sort key of the last
+result, so later pages cost the same as the first instead of skipping over
+everything before them.
+"""
+import os
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_INDEX_NAME = "analysis_text_search"
+SEARCH_INDEX = [("user_id", 1), ("text", "text"), ("interpretation", "text"), ("suggestions", "text")]
+# A match in the message itself counts for more than one in what the model said about it
+SEARCH_WEIGHTS = {"text": 10, "interpretation": 4, "suggestions": 1}
+SEARCH_SORTS = ("score", "recent")
+# Returned when the caller doesn't pick fields; `id` and `created_at` are always included
+SEARCH_DEFAULT_FIELDS = (
+    "relationship_id", "relationship_name", "text", "interpretation", "suggestions", "sentiment", "flags",
+)
+
+
+async def ensure_search_index(collection):
+    await collection.create_index(SEARCH_INDEX, name=SEARCH_INDEX_NAME, weights=SEARCH_WEIGHTS)
+
+
+def encode_cursor(sort: str, last: dict) -> str:
+    key = last["score"] if sort == "score" else last["created_at"].isoformat()
+    payload = json.dumps([sort, key, last["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, str]:
+    """Sort key and id of the last result a cursor points after; raises ValueError with a message fit for a 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if cursor_sort == "recent":
+            key = datetime.fromisoformat(key)
+        elif not isinstance(key, (int, float)):
+            raise ValueError
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise ValueError("Invalid search cursor")
+    if cursor_sort != sort:
+        raise ValueError(f"Search cursor was issued for sort={cursor_sort!r}, not {sort!r}")
+    return key, last_id
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> List[str]:
+    """Fields to return from a comma-separated `fields` value; raises ValueError for unknown ones."""
+    if not fields:
+        return list(SEARCH_DEFAULT_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def search_pipeline(query: dict, q: str, sort: str = "score", flag_types: Optional[List[str]] = None,
+                    fields: Iterable[str] = SEARCH_DEFAULT_FIELDS, limit: int = SEARCH_PAGE_SIZE,
+                    cursor: Optional[str] = None) -> List[dict]:
+    """
+    Aggregation for one page of results. `query` holds the user, relationship and
+    date filters (see export_query). One extra result is fetched to tell whether
+    there is a next page.
+    """
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"'sort' must be one of {', '.join(SEARCH_SORTS)}")
+    match = {**query, "$text": {"$search": q}}
+    if flag_types:
+        match["flags.type"] = {"$in": flag_types}
+    after = decode_cursor(cursor, sort) if cursor else None
+
+    if sort == "recent":
+        if after:
+            created_at, last_id = after
+            match["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lt": last_id}},
+            ]
+        stages = [
+            {"$match": match},
+            {"$sort": {"created_at": -1, "id": -1}},
+            {"$limit": limit + 1},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+    else:
+        # The score only exists once documents are matched, so the cursor filters after it
+        stages = [{"$match": match}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+        if after:
+            score, last_id = after
+            stages.append({"$match": {"$or": [{"score": {"$lt": score}}, {"score": score, "id": {"$lt": last_id}}]}})
+        stages += [{"$sort": {"score": -1, "id": -1}}, {"$limit": limit + 1}]
+
+    projection = {"_id": 0, "id": 1, "created_at": 1, "score": 1}
+    projection.update({field: 1 for field in fields if field not in projection})
+    stages.append({"$project": projection})
+    return stages
+
+
+async def run_search(collection, query: dict, q: str, sort: str = "score", flag_types: Optional[List[str]] = None,
+                     fields: Iterable[str] = SEARCH_DEFAULT_FIELDS, limit: int = SEARCH_PAGE_SIZE,
+                     cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """One page of matching analyses and the cursor for the next page (None on the last one)."""
+    pipeline = search_pipeline(query, q, sort, flag_types, fields, limit, cursor)
+    results = await collection.aggregate(pipeline).to_list(limit + 1)
+    if len(results) <= limit:
+        return results, None
+    results = results[:limit]
+    return results, encode_cursor(sort, results[-1])
@@ -1,23 +1,115 @@
 import os
 import uuid
-import json
 import time
+import copy
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Query, Header
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from prometheus_client import CONTENT_TYPE_LATEST
 # import groq # No longer directly used here
-import motor.motor_asyncio
-from bson import json_util
-from backend.external_integrations.groq_client import analyze_text_with_groq
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from backend.database import MongoConnection, to_json, to_utc, utcnow
+from backend.external_integrations.groq_client import analyze_text_with_groq, create_fallback_response, is_fallback_response
+from backend.jobs import JobQueue, WorkerPool, PermanentJobError, JOB_WORKERS
+from backend.journal_pipeline import JournalPipeline
+from backend.cache import TTLCache
+from backend.scheduler import BATCH, INTERACTIVE, groq_scheduler
+from backend.limiter import SHED, AdaptiveLimiter, overload_policy
+from backend.similarity import SimilarityIndex
+from backend.conversations import ConversationMemory
+from backend.health import HEALTH_BASELINE, analysis_score, apply_scores
+from backend.retention import RetentionJob
+from backend.idempotency import (
+    MAX_KEY_LENGTH, IdempotencyKeyInProgress, IdempotencyKeyReused, IdempotencyStore, request_fingerprint,
+)
+from backend.stats import LIST_EXCLUDED_FIELDS, merge_updates, relationship_summary, stats_update
+from backend.search import SEARCH_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, ensure_search_index, parse_fields, run_search
+from backend.metrics import ANALYSIS_REUSE, ANALYSIS_SHED, PrometheusMiddleware, MongoCommandMetrics, metrics_payload
+from backend.timing import TimingMiddleware, configure_structlog, span
+from backend.versions import VersionTracker, etag_matches, user_key, CACHE_CONTROL
+from backend.events import EventBus, ChangeFeed, format_sse, EVENTS_KEEPALIVE, EVENTS_RETRY_MS
+from backend.export import (
+    EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_filename, export_query, parse_date_filter, stream_export,
+)
+from backend.transcripts import (
+    IMPORT_INSERT_BATCH, TranscriptParser, analyze_transcript_pack, iter_lines, parse_transcript, run_import,
+    stage_transcript,
+)
 
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
+# Load environment variables from backend/.env when present (containers pass them directly)
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
+
+logger = logging.getLogger(__name__)
+configure_structlog()
+
+async def prepare_database():
+    """Create indexes and re-queue unfinished background work; runs alongside startup."""
+    indexes = [
+        ("jobs", job_queue.ensure_indexes),
+        # Every analysis and relationship query is scoped to one user, so user_id leads each index
+        ("analysis_results by user", lambda: db.analysis_results.create_index([("user_id", 1), ("created_at", -1)])),
+        ("analysis_results by relationship", lambda: db.analysis_results.create_index(
+            [("user_id", 1), ("relationship_id", 1), ("created_at", -1)])),
+        ("analysis_results search", lambda: ensure_search_index(db.analysis_results)),
+        ("relationships by user", lambda: db.relationships.create_index([("user_id", 1), ("created_at", -1)])),
+        ("relationships by id", lambda: db.relationships.create_index([("user_id", 1), ("id", 1)])),
+        ("journal_entries", lambda: db.journal_entries.create_index([("analysis_status", 1), ("queued_at", 1)])),
+        ("journal_analyses", lambda: db.journal_analyses.create_index("entry_id")),
+        ("journal_stats", lambda: db.journal_stats.create_index("user_id", unique=True)),
+        # Fails until the dedupe_growth_plans migration has removed duplicate plans; it builds the index then
+        ("growth_plans", lambda: db.growth_plans.create_index("user_id", unique=True)),
+        ("transcript_imports", lambda: db.transcript_imports.create_index("id", unique=True)),
+        ("transcript_messages", lambda: db.transcript_messages.create_index([("import_id", 1), ("seq", 1)], unique=True)),
+        ("conversation_summaries", conversation_memory.ensure_indexes),
+        ("health_scores", lambda: db.health_scores.create_index("user_id", unique=True)),
+        ("resource_versions", versions.ensure_indexes),
+        ("retention", retention_job.ensure_indexes),
+        ("idempotency_keys", idempotency_keys.ensure_indexes),
+    ]
+    # One at a time, so an index that can't be built doesn't keep the others from being created
+    for name, create in indexes:
+        try:
+            await create()
+        except Exception as e:
+            logger.warning(f"Could not create {name} index at startup: {e}")
+    try:
+        await journal_pipeline.recover()
+    except Exception as e:
+        logger.warning(f"Could not re-queue pending journal entries: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.connect()
+    # Don't hold up startup on Mongo; the server can answer requests meanwhile
+    prepare_task = asyncio.create_task(prepare_database())
+    if JOB_WORKERS > 0:
+        job_workers.start()
+    journal_pipeline.start()
+    versions.start()
+    change_feed.start()
+    retention_job.start()
+    yield
+    prepare_task.cancel()
+    await retention_job.stop()
+    await change_feed.stop()
+    await versions.stop()
+    await journal_pipeline.stop()
+    await job_workers.stop()
+    db.close()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -27,17 +119,47 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(TimingMiddleware)
 
 # Connect to MongoDB
 mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-client = motor.motor_asyncio.AsyncIOMotorClient(mongo_url)
-db = client.test_database
+READINESS_TIMEOUT = float(os.environ.get("READINESS_TIMEOUT", "2.0"))
+# The Motor client itself is created in the lifespan hook, see backend/database.py
+db = MongoConnection(mongo_url, "test_database", event_listeners=[MongoCommandMetrics()])
+
+# Read-through cache of growth plans keyed by (user_id, plan version). Writes bump the
+# version in `versions`, which every worker sees within VERSION_REFRESH_INTERVAL
+growth_plan_cache = TTLCache(maxsize=1024, ttl=300)
+
+# Recent Groq analyses, reused for repeats and near-duplicates of the same message
+analysis_index = SimilarityIndex()
+
+# Bounds interactive analyses waiting on Groq; past the limit they're shed or degraded
+analyze_limiter = AdaptiveLimiter("analyze")
+
+# Stored responses of POSTs sent with an Idempotency-Key, replayed to retries
+idempotency_keys = IdempotencyStore(db.idempotency_keys)
+
+# Rolling per-relationship summaries that give conversation turns their history
+conversation_memory = ConversationMemory(db.conversation_summaries)
+
+# Version counters behind the ETags of polled read endpoints; bumped by every write
+versions = VersionTracker(db.resource_versions)
 
 # Models
 class MessageInput(BaseModel):
     text: str
     context: Optional[str] = None
     relationship_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+class ConversationTurnInput(BaseModel):
+    text: str
+    # Who sent the turn, e.g. "Them" or "You"; shown to the model with the turn
+    speaker: Optional[str] = None
+    context: Optional[str] = None
+    user_id: Optional[str] = None
 
 class Flag(BaseModel):
     type: str
@@ -46,6 +168,7 @@ class Flag(BaseModel):
 
 class AnalysisResult(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: Optional[str] = None
     text: str
     context: Optional[str] = None
     relationship_id: Optional[str] = None
@@ -54,7 +177,7 @@ class AnalysisResult(BaseModel):
     interpretation: str
     suggestions: List[str] = []
     sentiment: str
-    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    created_at: datetime = Field(default_factory=utcnow)
     # Enhanced emotional intelligence fields from Groq API
     emotional_tone: Optional[str] = None
     communication_style: Optional[str] = None
@@ -63,17 +186,35 @@ class AnalysisResult(BaseModel):
     emotional_flags: List[str] = []
     relationship_insights: Optional[str] = None
     emotional_maturity_level: Optional[str] = None
+    # Set for messages that came from an imported chat transcript
+    speaker: Optional[str] = None
+    sent_at: Optional[datetime] = None
+    import_id: Optional[str] = None
+    # Position of the message in its imported chat
+    import_seq: Optional[int] = None
+    # Set on the placeholder returned while analysis is at capacity; it isn't stored
+    degraded: bool = False
+    # Set when the analysis was copied from that earlier one of a near-identical message
+    reused_from: Optional[str] = None
+    # The relationship's health score right after this analysis
+    health_score: Optional[int] = None
 
 class Relationship(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: Optional[str] = None
     name: str
     type: str
     notes: Optional[str] = None
     health_score: int = 75
-    last_contact: str = Field(default_factory=lambda: datetime.now().isoformat())
+    last_contact: datetime = Field(default_factory=utcnow)
     sentiment: str = "neutral"
     flag_history: List[Dict[str, Any]] = []
-    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    created_at: datetime = Field(default_factory=utcnow)
+
+    @field_validator("last_contact", "created_at")
+    @classmethod
+    def store_as_utc(cls, value: datetime) -> datetime:
+        return to_utc(value)
 
 class GrowthActivity(BaseModel):
     day: int
@@ -90,70 +231,254 @@ class GrowthPlan(BaseModel):
     user_id: Optional[str] = None
     current_week: WeeklyPlan
     goals: List[str]
-    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
-    updated_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
+
+class AnalysisJobInput(BaseModel):
+    messages: List[MessageInput]
+    priority: int = 0
+
+# Default plan content, built and validated once at import; per-user plans are copies of it
+DEFAULT_GROWTH_PLAN_TEMPLATE = GrowthPlan(
+    current_week=WeeklyPlan(
+        theme="Emotional self-validation",
+        days=[
+            GrowthActivity(
+                day=1,
+                title="Understanding Self-Validation",
+                activity_type="Guided Self-Inquiry",
+                content="Reflect on when you've dismissed your own feelings. What triggers self-doubt about your emotional responses?"
+            ),
+            GrowthActivity(
+                day=2,
+                title="Recognizing Emotional Patterns",
+                activity_type="Emotional Pattern Reframe",
+                content="Identify a recurring emotional response that you often judge. How would you respond to a friend with the same feelings?"
+            ),
+            GrowthActivity(
+                day=3,
+                title="Practice Validating Language",
+                activity_type="Practice/Script Challenge",
+                content="Write three statements that validate your feelings about a recent difficult situation."
+            ),
+            GrowthActivity(
+                day=4,
+                title="Micro-Ritual",
+                activity_type="Daily Practice",
+                content="Each time you notice self-criticism today, place a hand over your heart and say 'This feeling is valid.'"
+            ),
+            GrowthActivity(
+                day=5,
+                title="Weekly Reflection",
+                activity_type="Journal Prompt",
+                content="How has validating your emotions changed your interactions this week? What differences did you notice?"
+            )
+        ]
+    ),
+    goals=[
+        "Affirm my feelings without judgment",
+        "Recognize when I'm dismissing my own emotions",
+        "Respond to myself with the same compassion I'd offer others"
+    ]
+).model_dump(include={"current_week", "goals"})
+
+def new_default_growth_plan() -> dict:
+    now = utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        **copy.deepcopy(DEFAULT_GROWTH_PLAN_TEMPLATE),
+        "created_at": now,
+        "updated_at": now
+    }
 
 # Helper to parse MongoDB results
 def parse_json(data):
-    return json.loads(json_util.dumps(data))
+    return to_json(data)
+
+def day_of(timestamp) -> str:
+    """YYYY-MM-DD for a stored timestamp (a datetime, or an ISO string not yet migrated)."""
+    if isinstance(timestamp, datetime):
+        return timestamp.date().isoformat()
+    return (timestamp or "").split("T")[0]
+
+def check_not_modified(request: Request, response: Response, *version_keys: str) -> Optional[Response]:
+    """
+    Tag `response` with the current ETag of `version_keys`. If the client already
+    has that version, return the 304 to send instead, before any query runs.
+    """
+    etag = versions.etag(*version_keys)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def idempotent(request: Request, response: Response, key: Optional[str], route: str,
+                     user_id: Optional[str], produce) -> Any:
+    """
+    Run `produce()` once per Idempotency-Key: a retry with the same `key` gets the
+    stored response of the first request (and an Idempotent-Replayed header)
+    instead. Requests without a key just run.
+    """
+    if key is None:
+        return await produce()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+    async def produce_json():
+        return jsonable_encoder(await produce())
+
+    try:
+        body, replayed = await idempotency_keys.run(
+            f"{route}:{user_id}", key, request_fingerprint(request.url.path, await request.body()), produce_json,
+            # A placeholder served at capacity is no answer to keep; a retry should get a real analysis
+            keep=lambda body: not (isinstance(body, dict) and body.get("degraded")),
+        )
+    except IdempotencyKeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    except IdempotencyKeyInProgress:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress",
+                            headers={"Retry-After": "1"})
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+def build_analysis_result(message_input: MessageInput, analysis_data: dict,
+                          relationship_name: Optional[str] = None) -> AnalysisResult:
+    """Map the dict returned by the Groq client onto an AnalysisResult."""
+    # `analyze_text_with_groq` returns:
+    # {'flags': [{'type': '...', 'description': '...', 'participant': '...'}, ...], 
+    #  'interpretation': '...', 'suggestions': ['...'], 'sentiment': '...'}
+    # The 'participant' field in flags is optional, and the groq_client returns
+    # dicts compatible with Flag(**flag_data_dict)
+    parsed_flags_for_result = [Flag(**flag_data_dict) for flag_data_dict in analysis_data.get("flags", [])]
+
+    return AnalysisResult(
+        user_id=message_input.user_id,
+        text=message_input.text,
+        context=message_input.context,
+        relationship_id=message_input.relationship_id,
+        relationship_name=relationship_name,
+        flags=parsed_flags_for_result,
+        interpretation=analysis_data.get("interpretation", "No interpretation provided."),
+        suggestions=analysis_data.get("suggestions", []),
+        sentiment=analysis_data.get("sentiment", "neutral"),
+        # Enhanced emotional intelligence fields
+        emotional_tone=analysis_data.get("emotional_tone"),
+        communication_style=analysis_data.get("communication_style"),
+        potential_triggers=analysis_data.get("potential_triggers", []),
+        confidence_score=analysis_data.get("confidence_score"),
+        emotional_flags=analysis_data.get("emotional_flags", []),
+        relationship_insights=analysis_data.get("relationship_insights"),
+        emotional_maturity_level=analysis_data.get("emotional_maturity_level")
+    )
 
 # Routes
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(metrics_payload(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/api/health")
 async def health():
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe: the app can serve traffic once MongoDB answers a ping."""
+    try:
+        await asyncio.wait_for(db.client.admin.command("ping"), timeout=READINESS_TIMEOUT)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "mongo": (str(e) or type(e).__name__)[:200]})
+    return {"status": "ready", "mongo": "ok"}
+
 @app.post("/api/analyze", response_model=AnalysisResult)
-async def analyze_message(message_input: MessageInput):
+async def analyze_message(message_input: MessageInput, request: Request, response: Response,
+                          idempotency_key: Optional[str] = Header(None)):
+    return await idempotent(
+        request, response, idempotency_key, "/api/analyze", message_input.user_id,
+        lambda: analyze_and_store(message_input, route="/api/analyze"),
+    )
+
+async def analyze_with_groq(message_input: MessageInput, context: Optional[str], priority: str,
+                            route: Optional[str]) -> dict:
+    """Groq analysis of a message, admitted by `analyze_limiter` when made for a `route`."""
+    if route is None:
+        return await groq_scheduler.run(priority, analyze_text_with_groq, text=message_input.text, context=context)
+    if not analyze_limiter.try_acquire():
+        action = overload_policy(route)
+        ANALYSIS_SHED.labels(route, action).inc()
+        if action == SHED:
+            raise HTTPException(status_code=503, detail="Analysis is at capacity, please retry shortly",
+                                headers={"Retry-After": str(analyze_limiter.retry_after())})
+        return {**create_fallback_response(message_input.text, "Analysis is at capacity"), "degraded": True}
+    started = time.perf_counter()
+    latency, ok = None, False
+    try:
+        analysis_data = await groq_scheduler.run(priority, analyze_text_with_groq, text=message_input.text, context=context)
+        latency, ok = time.perf_counter() - started, not is_fallback_response(analysis_data)
+        return analysis_data
+    except HTTPException as http_exc:
+        # Rejected input says nothing about Groq's capacity; failed calls do
+        if http_exc.status_code >= 500:
+            latency = time.perf_counter() - started
+        raise
+    finally:
+        analyze_limiter.release(latency, ok)
+
+async def analyze_and_store(message_input: MessageInput, history: Optional[str] = None,
+                            priority: str = INTERACTIVE, route: Optional[str] = None) -> AnalysisResult:
+    """
+    Analyze a message, store the result and update its relationship. `history`
+    (earlier turns of a conversation) is given to the model alongside the
+    message's own context but isn't stored with the analysis. `priority` is the
+    Groq scheduler class the call waits in; requests served for a `route` are also
+    subject to its overload policy. A degraded placeholder returned under that
+    policy is not stored and changes nothing.
+    """
     relationship_name = None
+    relationship = None
     if message_input.relationship_id:
-        relationship = await db.relationships.find_one({"id": message_input.relationship_id})
+        with span("relationship_lookup"):
+            relationship = await db.relationships.find_one(
+                {"user_id": message_input.user_id, "id": message_input.relationship_id}
+            )
         if relationship:
             relationship_name = relationship.get("name")
 
     try:
         # Call the new Groq client function
         # analyze_text_with_groq is expected to raise HTTPException on API errors or ValueError if API key is missing
-        analysis_data = analyze_text_with_groq(text=message_input.text, context=message_input.context)
-
-        # The groq_client returns a dict. We need to map its fields to AnalysisResult.
-        # `analyze_text_with_groq` returns:
-        # {'flags': [{'type': '...', 'description': '...', 'participant': '...'}, ...], 
-        #  'interpretation': '...', 'suggestions': ['...'], 'sentiment': '...'}
-        # The 'participant' field in flags is optional.
+        # Run the blocking Groq SDK call off the event loop so concurrent requests and job workers overlap
+        prompt_context = "\n\n".join(part for part in (message_input.context, history) if part) or None
+        # A repeat of a recent message (up to punctuation, casing and emoji) reuses its analysis instead
+        similarity_scope = (message_input.user_id, prompt_context or "")
+        with span("similarity_lookup"):
+            reused = analysis_index.lookup(similarity_scope, message_input.text)
+        if reused:
+            (reused_from, analysis_data), distance = reused
+            ANALYSIS_REUSE.labels("exact" if distance == 0 else "near").inc()
+        else:
+            with span("analysis"):
+                analysis_data = await analyze_with_groq(message_input, prompt_context, priority, route)
 
+        with span("build_result"):
+            result = build_analysis_result(message_input, analysis_data, relationship_name)
+        if analysis_data.get("degraded"):
+            result.degraded = True
+            return result
+        if reused:
+            result.reused_from = reused_from
+        elif not is_fallback_response(analysis_data):
+            analysis_index.add(similarity_scope, message_input.text, (result.id, analysis_data))
         raw_flags_from_groq = analysis_data.get("flags", [])
-        parsed_flags_for_result = []
-        for flag_data_dict in raw_flags_from_groq:
-            # Ensure all required fields for Flag model are present or provide defaults if appropriate
-            # The Flag model has 'type' and 'description' as required, 'participant' is optional.
-            # The groq_client should be returning dicts compatible with Flag(**flag_data_dict)
-            parsed_flags_for_result.append(Flag(**flag_data_dict))
-
-        result = AnalysisResult(
-            text=message_input.text,
-            context=message_input.context,
-            relationship_id=message_input.relationship_id,
-            relationship_name=relationship_name,
-            flags=parsed_flags_for_result,
-            interpretation=analysis_data.get("interpretation", "No interpretation provided."),
-            suggestions=analysis_data.get("suggestions", []),
-            sentiment=analysis_data.get("sentiment", "neutral"),
-            # Enhanced emotional intelligence fields
-            emotional_tone=analysis_data.get("emotional_tone"),
-            communication_style=analysis_data.get("communication_style"),
-            potential_triggers=analysis_data.get("potential_triggers", []),
-            confidence_score=analysis_data.get("confidence_score"),
-            emotional_flags=analysis_data.get("emotional_flags", []),
-            relationship_insights=analysis_data.get("relationship_insights"),
-            emotional_maturity_level=analysis_data.get("emotional_maturity_level")
-        )
+        changed = [user_key("analysis_results", message_input.user_id)]
+        updated_relationship = None
+        # Every real analysis moves the health scores; fallback placeholders don't
+        new_scores = [] if is_fallback_response(analysis_data) else [
+            (analysis_score(result.sentiment, raw_flags_from_groq), result.created_at)
+        ]
         
-        # Save the result to the database
-        # Using result.dict(by_alias=True) is good practice if your Pydantic models use aliases (e.g. for '_id')
-        # but AnalysisResult uses 'id' directly, so result.dict() is fine.
-        await db.analysis_results.insert_one(result.model_dump()) # Pydantic v2 uses model_dump()
-        
-        # If this is related to a relationship, update the relationship's flag history
+        # If this is related to a relationship, update the relationship's flag history and health
         if message_input.relationship_id:
             # The flag_history expects a list of dicts, and `raw_flags_from_groq` is already in that format.
             # Specifically, it was `[f["type"] for f in detected_flags]`
@@ -161,118 +486,216 @@ async def analyze_message(message_input: MessageInput):
             flag_types_for_history = [f_dict.get("type", "Unknown") for f_dict in raw_flags_from_groq]
             
             flag_entry = {
-                "date": datetime.now().isoformat(),
+                "date": utcnow(),
                 "text": message_input.text[:100] + ("..." if len(message_input.text) > 100 else ""),
                 "flags": flag_types_for_history, 
                 "sentiment": result.sentiment
             }
             
-            await db.relationships.update_one(
-                {"id": message_input.relationship_id},
-                {
-                    "$set": {
-                        "last_contact": datetime.now().isoformat(),
-                        "sentiment": result.sentiment
-                    },
-                    "$push": {"flag_history": flag_entry}
-                }
-            )
+            with span("db_relationship_update"):
+                updated_relationship, snapshots = await apply_scores(
+                    db.relationships,
+                    {"user_id": message_input.user_id, "id": message_input.relationship_id},
+                    new_scores,
+                    current=relationship,
+                    update=lambda snapshots: merge_updates(
+                        {
+                            "$set": {
+                                "last_contact": utcnow(),
+                                "sentiment": result.sentiment
+                            },
+                            "$push": {"flag_history": flag_entry}
+                        },
+                        stats_update([{"flags": raw_flags_from_groq}], snapshots),
+                    ),
+                    return_document=True,
+                )
+            if snapshots:
+                # The relationship's score right after this analysis, for its health trend
+                result.health_score = snapshots[-1]
+            changed += [user_key("relationships", message_input.user_id), f"relationship:{message_input.relationship_id}"]
+        if new_scores:
+            with span("db_health_update"):
+                await apply_scores(db.health_scores, {"user_id": message_input.user_id}, new_scores, upsert=True)
+        
+        # Save the result to the database
+        # Using result.dict(by_alias=True) is good practice if your Pydantic models use aliases (e.g. for '_id')
+        # but AnalysisResult uses 'id' directly, so result.dict() is fine.
+        with span("db_insert"):
+            await db.analysis_results.insert_one(result.model_dump()) # Pydantic v2 uses model_dump()
+        change_feed.notify("analysis_results", "insert", result.model_dump())
+        if updated_relationship:
+            change_feed.notify("relationships", "upsert", updated_relationship)
+        await versions.bump(*changed)
         
         return result
         
     except ValueError as ve: # Specifically for GROQ_API_KEY not set, raised by groq_client
         # Log the error for server visibility
-        print(f"Configuration error: {ve}")
+        logger.error(f"Configuration error: {ve}")
         raise HTTPException(status_code=500, detail=str(ve))
     except HTTPException as http_exc: # Re-raise HTTPExceptions from analyze_text_with_groq
         raise http_exc
     except Exception as e:
         # Catch any other unexpected errors during the process
-        print(f"An unexpected error occurred in analyze_message: {e}")
+        logger.error(f"An unexpected error occurred in analyze_and_store: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed due to an unexpected error: {str(e)}")
 
 @app.get("/api/history")
-async def get_history():
+async def get_history(request: Request, response: Response, user_id: Optional[str] = None):
+    not_modified = check_not_modified(request, response, user_key("analysis_results", user_id))
+    if not_modified:
+        return not_modified
     try:
-        results = await db.analysis_results.find().sort("created_at", -1).to_list(50)
+        results = await db.analysis_results.find({"user_id": user_id}).sort("created_at", -1).to_list(50)
         return parse_json(results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve history: {str(e)}")
 
-@app.get("/api/dashboard")
-async def get_dashboard():
+@app.get("/api/search")
+async def search_analyses(request: Request, response: Response, q: str, user_id: Optional[str] = None,
+                          relationship_id: Optional[str] = None, since: Optional[str] = None,
+                          until: Optional[str] = None, flag_type: Optional[List[str]] = Query(None),
+                          sort: str = "score", fields: Optional[str] = None, cursor: Optional[str] = None,
+                          limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE)):
+    """Search a user's analyses by the words in the message, interpretation and suggestions."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
     try:
-        # Get analysis history
-        analysis_results = await db.analysis_results.find().sort("created_at", -1).to_list(100)
-        
-        # Calculate overall health score based on flag frequency and sentiment
-        total_analyses = len(analysis_results)
-        if total_analyses == 0:
-            return {
-                "health_score": 75,  # Default score
-                "total_analyses": 0,
-                "total_flags_detected": 0,
-                "flag_counts": {},
-                "sentiment_timeline": []
-            }
-        
-        # Count flags
-        total_flags = 0
-        flag_counts = {}
-        for result in analysis_results:
-            flags = result.get("flags", [])
-            total_flags += len(flags)
-            
-            for flag in flags:
-                flag_type = flag.get("type", "Unknown")
-                flag_counts[flag_type] = flag_counts.get(flag_type, 0) + 1
-        
-        # Calculate health score (simple algorithm for demo)
-        flag_ratio = total_flags / total_analyses
-        health_score = max(0, min(100, int(100 - (flag_ratio * 100))))
-        
-        # Build sentiment timeline
-        sentiment_timeline = []
-        dates_seen = set()
-        for result in analysis_results:
-            date = result.get("created_at", "").split("T")[0]
-            if date and date not in dates_seen:
-                dates_seen.add(date)
-                sentiment_timeline.append([date, result.get("sentiment", "neutral")])
-        
-        # Sort chronologically
-        sentiment_timeline.sort(key=lambda x: x[0])
-        
+        query = export_query(parse_date_filter(since, "since"), parse_date_filter(until, "until"), relationship_id, user_id)
+        projection = parse_fields(fields, AnalysisResult.model_fields)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    not_modified = check_not_modified(request, response, user_key("analysis_results", user_id))
+    if not_modified:
+        return not_modified
+    try:
+        results, next_cursor = await run_search(
+            db.analysis_results, query, q, sort, flag_type, projection, limit, cursor
+        )
+        return {"results": parse_json(results), "next_cursor": next_cursor}
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search analyses: {str(e)}")
+
+async def compute_dashboard(user_id: Optional[str] = None) -> dict:
+    """Dashboard summary over a user's latest analyses; also pushed to their /api/events listeners."""
+    # Get analysis history
+    analysis_results = await db.analysis_results.find({"user_id": user_id}).sort("created_at", -1).to_list(100)
+    # The overall health score is kept up to date on each analysis, see backend/health.py
+    health = await db.health_scores.find_one({"user_id": user_id}, {"_id": 0, "health_score": 1})
+    health_score = health["health_score"] if health else round(HEALTH_BASELINE)
+    
+    total_analyses = len(analysis_results)
+    if total_analyses == 0:
         return {
             "health_score": health_score,
-            "total_analyses": total_analyses,
-            "total_flags_detected": total_flags,
-            "flag_counts": flag_counts,
-            "sentiment_timeline": sentiment_timeline
+            "total_analyses": 0,
+            "total_flags_detected": 0,
+            "flag_counts": {},
+            "sentiment_timeline": []
         }
+    
+    # Count flags
+    total_flags = 0
+    flag_counts = {}
+    for result in analysis_results:
+        flags = result.get("flags", [])
+        total_flags += len(flags)
+        
+        for flag in flags:
+            flag_type = flag.get("type", "Unknown")
+            flag_counts[flag_type] = flag_counts.get(flag_type, 0) + 1
+    
+    # Build sentiment timeline
+    sentiment_timeline = []
+    dates_seen = set()
+    for result in analysis_results:
+        date = day_of(result.get("created_at"))
+        if date and date not in dates_seen:
+            dates_seen.add(date)
+            sentiment_timeline.append([date, result.get("sentiment", "neutral")])
+    
+    # Sort chronologically
+    sentiment_timeline.sort(key=lambda x: x[0])
+    
+    return {
+        "health_score": health_score,
+        "total_analyses": total_analyses,
+        "total_flags_detected": total_flags,
+        "flag_counts": flag_counts,
+        "sentiment_timeline": sentiment_timeline
+    }
+
+def export_response(user_id: Optional[str], relationship_id: Optional[str], format: str, since: Optional[str],
+                    until: Optional[str], gzip: bool, filename_prefix: str) -> StreamingResponse:
+    """Stream matching analyses, oldest first, straight from a Mongo cursor."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    try:
+        query = export_query(parse_date_filter(since, "since"), parse_date_filter(until, "until"), relationship_id, user_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    cursor = db.analysis_results.find(query, {"_id": 0}).sort("created_at", 1).batch_size(EXPORT_BATCH_SIZE)
+    filename = export_filename(format, gzip, filename_prefix)
+    return StreamingResponse(
+        stream_export(cursor, format, gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/api/export/analyses")
+async def export_analyses(format: str = "ndjson", since: Optional[str] = None, until: Optional[str] = None,
+                          relationship_id: Optional[str] = None, gzip: bool = False,
+                          user_id: Optional[str] = None):
+    return export_response(user_id, relationship_id, format, since, until, gzip, "analyses")
+
+@app.get("/api/dashboard")
+async def get_dashboard(request: Request, response: Response, user_id: Optional[str] = None):
+    not_modified = check_not_modified(request, response, user_key("analysis_results", user_id))
+    if not_modified:
+        return not_modified
+    try:
+        return await compute_dashboard(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve dashboard data: {str(e)}")
 
 @app.get("/api/relationships")
-async def get_relationships():
+async def get_relationships(request: Request, response: Response, user_id: Optional[str] = None):
+    not_modified = check_not_modified(request, response, user_key("relationships", user_id))
+    if not_modified:
+        return not_modified
     try:
-        relationships = await db.relationships.find().sort("created_at", -1).to_list(50)
-        return parse_json(relationships)
+        # Summary stats are kept on each relationship, so one query serves the list
+        relationships = await db.relationships.find(
+            {"user_id": user_id}, {"_id": 0, **{field: 0 for field in LIST_EXCLUDED_FIELDS}}
+        ).sort("created_at", -1).to_list(50)
+        return parse_json([relationship_summary(relationship) for relationship in relationships])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve relationships: {str(e)}")
 
 @app.post("/api/relationships", response_model=Relationship)
-async def create_relationship(relationship: Relationship):
+async def create_relationship(relationship: Relationship, request: Request, response: Response,
+                              idempotency_key: Optional[str] = Header(None)):
+    return await idempotent(request, response, idempotency_key, "/api/relationships", relationship.user_id,
+                            lambda: store_relationship(relationship))
+
+async def store_relationship(relationship: Relationship) -> Relationship:
     try:
+        # Health starts at the baseline and is only moved by analyses
+        relationship.health_score = round(HEALTH_BASELINE)
         await db.relationships.insert_one(relationship.dict())
+        await versions.bump(user_key("relationships", relationship.user_id))
+        change_feed.notify("relationships", "upsert", relationship.dict())
         return relationship
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create relationship: {str(e)}")
 
 @app.get("/api/relationships/{relationship_id}")
-async def get_relationship(relationship_id: str):
+async def get_relationship(relationship_id: str, user_id: Optional[str] = None):
     try:
-        relationship = await db.relationships.find_one({"id": relationship_id})
+        relationship = await db.relationships.find_one({"user_id": user_id, "id": relationship_id})
         if not relationship:
             raise HTTPException(status_code=404, detail="Relationship not found")
         return parse_json(relationship)
@@ -282,10 +705,17 @@ async def get_relationship(relationship_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to retrieve relationship: {str(e)}")
 
 @app.post("/api/relationships/{relationship_id}/analyze", response_model=AnalysisResult)
-async def analyze_relationship_message(relationship_id: str, message_input: MessageInput):
+async def analyze_relationship_message(relationship_id: str, message_input: MessageInput, request: Request,
+                                       response: Response, idempotency_key: Optional[str] = Header(None)):
+    return await idempotent(
+        request, response, idempotency_key, "/api/relationships/{relationship_id}/analyze", message_input.user_id,
+        lambda: analyze_for_relationship(relationship_id, message_input),
+    )
+
+async def analyze_for_relationship(relationship_id: str, message_input: MessageInput) -> AnalysisResult:
     try:
-        # Verify relationship exists
-        relationship = await db.relationships.find_one({"id": relationship_id})
+        # Verify relationship exists and belongs to the user
+        relationship = await db.relationships.find_one({"user_id": message_input.user_id, "id": relationship_id})
         if not relationship:
             raise HTTPException(status_code=404, detail="Relationship not found")
         
@@ -293,8 +723,7 @@ async def analyze_relationship_message(relationship_id: str, message_input: Mess
         if not message_input.relationship_id:
             message_input.relationship_id = relationship_id
         
-        # Call the analyze endpoint
-        result = await analyze_message(message_input)
+        result = await analyze_and_store(message_input, route="/api/relationships/{relationship_id}/analyze")
         
         return result
     except HTTPException as http_exc:
@@ -302,16 +731,249 @@ async def analyze_relationship_message(relationship_id: str, message_input: Mess
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze message: {str(e)}")
 
+@app.post("/api/relationships/{relationship_id}/conversation", response_model=AnalysisResult)
+async def analyze_conversation_turn(relationship_id: str, turn: ConversationTurnInput,
+                                    background_tasks: BackgroundTasks, request: Request, response: Response,
+                                    idempotency_key: Optional[str] = Header(None)):
+    """
+    Analyze the next turn of an ongoing conversation with this relationship. The
+    model sees a rolling summary of earlier turns plus the last few verbatim, so
+    the prompt doesn't grow with the thread; the summary is updated after the
+    response is sent.
+    """
+    return await idempotent(
+        request, response, idempotency_key, "/api/relationships/{relationship_id}/conversation", turn.user_id,
+        lambda: record_conversation_turn(relationship_id, turn, background_tasks),
+    )
+
+async def record_conversation_turn(relationship_id: str, turn: ConversationTurnInput,
+                                   background_tasks: BackgroundTasks) -> AnalysisResult:
+    try:
+        relationship = await db.relationships.find_one({"user_id": turn.user_id, "id": relationship_id})
+        if not relationship:
+            raise HTTPException(status_code=404, detail="Relationship not found")
+
+        history = await conversation_memory.history(turn.user_id, relationship_id)
+        result = await analyze_and_store(
+            MessageInput(text=turn.text, context=turn.context, relationship_id=relationship_id, user_id=turn.user_id),
+            history,
+            route="/api/relationships/{relationship_id}/conversation",
+        )
+        if result.degraded:
+            return result
+        conversation = await conversation_memory.record_turn(
+            turn.user_id, relationship_id, f"{turn.speaker}: {turn.text}" if turn.speaker else turn.text
+        )
+        background_tasks.add_task(conversation_memory.fold, conversation)
+        return result
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to analyze conversation turn: {str(e)}")
+
+@app.get("/api/relationships/{relationship_id}/conversation")
+async def get_conversation(relationship_id: str, user_id: Optional[str] = None):
+    try:
+        relationship = await db.relationships.find_one({"user_id": user_id, "id": relationship_id}, {"_id": 0, "id": 1})
+        if not relationship:
+            raise HTTPException(status_code=404, detail="Relationship not found")
+        conversation = await conversation_memory.get(user_id, relationship_id)
+        return parse_json(conversation or {
+            "user_id": user_id, "relationship_id": relationship_id, "summary": "",
+            "summarized_through": 0, "turn_count": 0, "recent": [],
+        })
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve conversation: {str(e)}")
+
+@app.get("/api/relationships/{relationship_id}/export")
+async def export_relationship_analyses(relationship_id: str, format: str = "ndjson", since: Optional[str] = None,
+                                       until: Optional[str] = None, gzip: bool = False,
+                                       user_id: Optional[str] = None):
+    relationship = await db.relationships.find_one({"user_id": user_id, "id": relationship_id}, {"_id": 0, "id": 1})
+    if not relationship:
+        raise HTTPException(status_code=404, detail="Relationship not found")
+    return export_response(user_id, relationship_id, format, since, until, gzip,
+                           f"relationship-{relationship_id}-analyses")
+
+@app.post("/api/relationships/{relationship_id}/import", status_code=202)
+async def import_transcript(relationship_id: str, request: Request, dayfirst: bool = False,
+                            context: Optional[str] = None, user_id: Optional[str] = None):
+    """
+    Import an exported chat (WhatsApp or a plain `Speaker: text` log) sent as the
+    raw request body. The upload is parsed and stored line by line, then analyzed
+    by a background job; the import is returned at once so its progress can be
+    followed on GET /api/imports/{id} and /api/events.
+    """
+    relationship = await db.relationships.find_one({"user_id": user_id, "id": relationship_id}, {"_id": 0, "id": 1})
+    if not relationship:
+        raise HTTPException(status_code=404, detail="Relationship not found")
+
+    now = utcnow()
+    record = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "relationship_id": relationship_id,
+        "status": "queued",
+        "context": context,
+        "format": None,
+        "parsed": 0,
+        "analyzed": 0,
+        "failed": 0,
+        "next_seq": 0,
+        "skipped_lines": 0,
+        "truncated": False,
+        "error": None,
+        "job_id": None,
+        "started_at": now,
+        "updated_at": now,
+    }
+    await db.transcript_imports.insert_one(dict(record))
+
+    parser = TranscriptParser(dayfirst=dayfirst)
+    try:
+        staged = await stage_transcript(
+            parse_transcript(iter_lines(request.stream()), parser), db.transcript_messages, record["id"]
+        )
+        job = await job_queue.enqueue("import_transcript", {"import_id": record["id"]}, user_id=user_id)
+        record.update(staged, job_id=job["id"])
+    except Exception as e:
+        logger.error(f"Transcript import {record['id']} failed: {e}")
+        record.update(status="failed", error=str(e)[:500])
+    record.update(format=parser.format, skipped_lines=parser.skipped_lines, updated_at=utcnow())
+    await db.transcript_imports.update_one({"id": record["id"]}, {"$set": record})
+    if record["status"] == "failed":
+        await db.transcript_messages.delete_many({"import_id": record["id"]})
+        raise HTTPException(status_code=500, detail=f"Failed to import transcript: {record['error']}")
+    return record
+
+async def run_import_job(job: dict, queue: JobQueue):
+    """
+    Analyze the staged messages of a transcript import in chat order, resuming
+    after the last stored batch if an earlier attempt was interrupted.
+    """
+    record = await db.transcript_imports.find_one({"id": job["payload"]["import_id"]}, {"_id": 0})
+    if not record:
+        raise PermanentJobError("Import not found")
+    user_id, relationship_id = record["user_id"], record["relationship_id"]
+    relationship = await db.relationships.find_one({"user_id": user_id, "id": relationship_id}, {"_id": 0})
+    if not relationship:
+        record.update(status="failed", error="Relationship not found", updated_at=utcnow())
+        await db.transcript_imports.update_one({"id": record["id"]}, {"$set": record})
+        await db.transcript_messages.delete_many({"import_id": record["id"]})
+        raise PermanentJobError("Relationship not found")
+
+    context = record.get("context")
+    analysis_context = context or (
+        f"These messages come from a chat with {relationship.get('name')} ({relationship.get('type')}). "
+        "Each message is prefixed with its sender."
+    )
+    # Counts from earlier attempts; this attempt's stats are added to them
+    earlier = {"analyzed": record["analyzed"], "failed": record["failed"]}
+    last_sentiment = None
+
+    async def analyze(pack: List[dict]) -> List[dict]:
+        analyses = await analyze_transcript_pack([f"{m['speaker']}: {m['text']}" for m in pack], analysis_context)
+        documents = []
+        for message, analysis_data in zip(pack, analyses):
+            result = build_analysis_result(
+                MessageInput(text=message["text"], context=context, relationship_id=relationship_id, user_id=user_id),
+                analysis_data,
+                relationship.get("name"),
+            )
+            result.speaker = message["speaker"]
+            result.sent_at = message["sent_at"]
+            # Analyses of a chat are dated when its messages were sent, so history and health follow the chat
+            if message["sent_at"]:
+                result.created_at = message["sent_at"]
+            result.import_id = record["id"]
+            result.import_seq = message["seq"]
+            documents.append(result.model_dump())
+        return documents
+
+    async def store(documents: List[dict], stats: dict):
+        nonlocal last_sentiment
+        # The whole batch moves the health scores and stats in one write each
+        scored = [doc for doc in documents if not is_fallback_response(doc)]
+        new_scores = [(analysis_score(doc["sentiment"], doc["flags"]), doc["created_at"]) for doc in scored]
+        _, snapshots = await apply_scores(
+            db.relationships, {"user_id": user_id, "id": relationship_id}, new_scores,
+            update=lambda snapshots: stats_update(documents, snapshots),
+        )
+        for doc, snapshot in zip(scored, snapshots):
+            doc["health_score"] = snapshot
+        await apply_scores(db.health_scores, {"user_id": user_id}, new_scores, upsert=True)
+        await db.analysis_results.insert_many(documents, ordered=False)
+        last_sentiment = documents[-1]["sentiment"]
+        record.update(analyzed=earlier["analyzed"] + stats["analyzed"], failed=earlier["failed"] + stats["failed"],
+                      next_seq=documents[-1]["import_seq"] + 1, updated_at=utcnow())
+        await db.transcript_imports.update_one({"id": record["id"]}, {"$set": record})
+        await versions.bump(user_key("analysis_results", user_id), user_key("relationships", user_id),
+                            f"relationship:{relationship_id}")
+        change_feed.notify("analysis_results", "bulk", user_id=user_id)
+        event_bus.publish({"type": "import", "user_id": user_id, "import_id": record["id"],
+                           "relationship_id": relationship_id, "analyzed": record["analyzed"],
+                           "failed": record["failed"], "parsed": record["parsed"]})
+
+    record.update(status="running", updated_at=utcnow())
+    await db.transcript_imports.update_one({"id": record["id"]}, {"$set": record})
+    messages = db.transcript_messages.find(
+        {"import_id": record["id"], "seq": {"$gte": record["next_seq"]}}, {"_id": 0}
+    ).sort("seq", 1).batch_size(IMPORT_INSERT_BATCH)
+    try:
+        stats = await run_import(messages, analyze, store)
+        if stats["failed"] and not stats["analyzed"]:
+            raise RuntimeError(f"None of {stats['failed']} messages could be analyzed")
+    except Exception as e:
+        if job["attempts"] >= job.get("max_attempts", queue.max_attempts):
+            record.update(status="failed", error=str(e)[:500], updated_at=utcnow())
+            await db.transcript_imports.update_one({"id": record["id"]}, {"$set": record})
+            await db.transcript_messages.delete_many({"import_id": record["id"]})
+            event_bus.publish({"type": "import", "user_id": user_id, "import_id": record["id"],
+                               "relationship_id": relationship_id, "status": record["status"]})
+        raise
+    finally:
+        if last_sentiment:
+            await db.relationships.update_one(
+                {"user_id": user_id, "id": relationship_id},
+                {"$set": {"last_contact": utcnow(), "sentiment": last_sentiment}},
+            )
+            await versions.bump(user_key("relationships", user_id), f"relationship:{relationship_id}")
+            change_feed.notify("relationships", "resync", user_id=user_id)
+    record.update(status="done", failed=earlier["failed"] + stats["failed"], updated_at=utcnow())
+    await db.transcript_imports.update_one({"id": record["id"]}, {"$set": record})
+    await db.transcript_messages.delete_many({"import_id": record["id"]})
+    event_bus.publish({"type": "import", "user_id": user_id, "import_id": record["id"],
+                       "relationship_id": relationship_id, "status": record["status"]})
+    return {"import_id": record["id"], "analyzed": record["analyzed"], "failed": record["failed"]}
+
+@app.get("/api/imports/{import_id}")
+async def get_import(import_id: str, user_id: Optional[str] = None):
+    try:
+        record = await db.transcript_imports.find_one({"id": import_id, "user_id": user_id}, {"_id": 0})
+        if not record:
+            raise HTTPException(status_code=404, detail="Import not found")
+        return record
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve import: {str(e)}")
+
 @app.get("/api/relationships/{relationship_id}/history")
-async def get_relationship_history(relationship_id: str):
+async def get_relationship_history(relationship_id: str, request: Request, response: Response,
+                                   user_id: Optional[str] = None):
+    not_modified = check_not_modified(request, response, f"relationship:{relationship_id}")
+    if not_modified:
+        return not_modified
     try:
         # Get all analyses for this relationship
         analyses = await db.analysis_results.find(
-            {"relationship_id": relationship_id}
+            {"user_id": user_id, "relationship_id": relationship_id}
         ).sort("created_at", -1).to_list(100)
         
         # Get the relationship
-        relationship = await db.relationships.find_one({"id": relationship_id})
+        relationship = await db.relationships.find_one({"user_id": user_id, "id": relationship_id})
         if not relationship:
             raise HTTPException(status_code=404, detail="Relationship not found")
         
@@ -323,7 +985,7 @@ async def get_relationship_history(relationship_id: str):
         # Group analyses by date
         analyses_by_date = {}
         for analysis in analyses:
-            date = analysis.get("created_at", "").split("T")[0]
+            date = day_of(analysis.get("created_at"))
             if date not in analyses_by_date:
                 analyses_by_date[date] = []
             analyses_by_date[date].append(analysis)
@@ -337,14 +999,13 @@ async def get_relationship_history(relationship_id: str):
                 flag_type = flag.get("type", "Unknown")
                 flag_types[flag_type] = flag_types.get(flag_type, 0) + 1
         
-        # Create daily health scores (simulated for demo)
+        # Daily health: the relationship's stored score after the day's last analysis
         dates = sorted(analyses_by_date.keys())
         for date in dates:
-            day_analyses = analyses_by_date[date]
-            # Simple algorithm: start with base score and reduce for each flag
-            day_score = 75
-            total_flags = sum(len(a.get("flags", [])) for a in day_analyses)
-            day_score = max(0, min(100, day_score - (total_flags * 5)))
+            # Analyses are newest first, so the first snapshot is the latest of the day
+            day_score = next((a["health_score"] for a in analyses_by_date[date] if a.get("health_score") is not None), None)
+            if day_score is None:
+                continue
             
             health_trend.append({
                 "date": date,
@@ -364,44 +1025,65 @@ async def get_relationship_history(relationship_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to retrieve relationship history: {str(e)}")
 
 @app.put("/api/relationships/{relationship_id}", response_model=Relationship)
-async def update_relationship(relationship_id: str, relationship_update: dict):
+async def update_relationship(relationship_id: str, relationship_update: dict, user_id: Optional[str] = None):
     try:
-        # Ensure id isn't changed
+        # Ensure id and owner aren't changed
         if "id" in relationship_update and relationship_update["id"] != relationship_id:
             raise HTTPException(status_code=400, detail="Cannot change relationship ID")
+        if "user_id" in relationship_update and relationship_update["user_id"] != user_id:
+            raise HTTPException(status_code=400, detail="Cannot change relationship owner")
         
         # Make sure the relationship exists
-        existing = await db.relationships.find_one({"id": relationship_id})
+        existing = await db.relationships.find_one({"user_id": user_id, "id": relationship_id})
         if not existing:
             raise HTTPException(status_code=404, detail="Relationship not found")
         
+        # Health and stats are derived from analyses, so client-sent values are ignored
+        for field in ("health", "health_score", "stats"):
+            relationship_update.pop(field, None)
+        
+        # Timestamps sent by the client are stored as datetimes like the ones we write
+        for field in ("last_contact", "created_at"):
+            if isinstance(relationship_update.get(field), str):
+                try:
+                    relationship_update[field] = to_utc(datetime.fromisoformat(relationship_update[field].replace("Z", "+00:00")))
+                except ValueError:
+                    raise HTTPException(status_code=400, detail=f"Invalid {field}: expected an ISO 8601 timestamp")
+        
         # Update the relationship
         await db.relationships.update_one(
-            {"id": relationship_id},
-            {"$set": {**relationship_update, "updated_at": datetime.now().isoformat()}}
+            {"user_id": user_id, "id": relationship_id},
+            {"$set": {**relationship_update, "updated_at": utcnow()}}
         )
+        await versions.bump(user_key("relationships", user_id), f"relationship:{relationship_id}")
         
         # Return the updated relationship
-        updated = await db.relationships.find_one({"id": relationship_id})
-        return parse_json(updated)
+        updated = parse_json(await db.relationships.find_one({"user_id": user_id, "id": relationship_id}, {"_id": 0}))
+        change_feed.notify("relationships", "upsert", updated)
+        return updated
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update relationship: {str(e)}")
 
 @app.delete("/api/relationships/{relationship_id}")
-async def delete_relationship(relationship_id: str):
+async def delete_relationship(relationship_id: str, user_id: Optional[str] = None):
     try:
         # Make sure the relationship exists
-        existing = await db.relationships.find_one({"id": relationship_id})
+        existing = await db.relationships.find_one({"user_id": user_id, "id": relationship_id})
         if not existing:
             raise HTTPException(status_code=404, detail="Relationship not found")
         
         # Delete the relationship
-        await db.relationships.delete_one({"id": relationship_id})
+        await db.relationships.delete_one({"user_id": user_id, "id": relationship_id})
         
         # Optionally, you could also delete all analyses related to this relationship
-        await db.analysis_results.delete_many({"relationship_id": relationship_id})
+        await db.analysis_results.delete_many({"user_id": user_id, "relationship_id": relationship_id})
+        await conversation_memory.delete(user_id, relationship_id)
+        await versions.bump(user_key("relationships", user_id), user_key("analysis_results", user_id),
+                            f"relationship:{relationship_id}")
+        change_feed.notify("relationships", "delete", {"id": relationship_id, "user_id": user_id})
+        change_feed.notify("analysis_results", "delete", user_id=user_id)
         
         return {"success": True, "message": "Relationship deleted successfully"}
     except HTTPException as http_exc:
@@ -412,87 +1094,202 @@ async def delete_relationship(relationship_id: str):
 @app.get("/api/growth-plan")
 async def get_growth_plan(user_id: Optional[str] = None):
     try:
-        # In a real app, we'd filter by user_id
-        growth_plan = await db.growth_plans.find_one({"user_id": user_id} if user_id else {})
-        
-        if not growth_plan:
-            # Create a default growth plan
-            default_plan = GrowthPlan(
-                user_id=user_id,
-                current_week=WeeklyPlan(
-                    theme="Emotional self-validation",
-                    days=[
-                        GrowthActivity(
-                            day=1,
-                            title="Understanding Self-Validation",
-                            activity_type="Guided Self-Inquiry",
-                            content="Reflect on when you've dismissed your own feelings. What triggers self-doubt about your emotional responses?"
-                        ),
-                        GrowthActivity(
-                            day=2,
-                            title="Recognizing Emotional Patterns",
-                            activity_type="Emotional Pattern Reframe",
-                            content="Identify a recurring emotional response that you often judge. How would you respond to a friend with the same feelings?"
-                        ),
-                        GrowthActivity(
-                            day=3,
-                            title="Practice Validating Language",
-                            activity_type="Practice/Script Challenge",
-                            content="Write three statements that validate your feelings about a recent difficult situation."
-                        ),
-                        GrowthActivity(
-                            day=4,
-                            title="Micro-Ritual",
-                            activity_type="Daily Practice",
-                            content="Each time you notice self-criticism today, place a hand over your heart and say 'This feeling is valid.'"
-                        ),
-                        GrowthActivity(
-                            day=5,
-                            title="Weekly Reflection",
-                            activity_type="Journal Prompt",
-                            content="How has validating your emotions changed your interactions this week? What differences did you notice?"
-                        )
-                    ]
-                ),
-                goals=[
-                    "Affirm my feelings without judgment",
-                    "Recognize when I'm dismissing my own emotions",
-                    "Respond to myself with the same compassion I'd offer others"
-                ]
+        cache_key = (user_id, versions.etag(user_key("growth_plans", user_id)))
+        cached = growth_plan_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Atomic get-or-create: the unique index on user_id makes concurrent first
+        # requests converge on one plan instead of each inserting a default
+        try:
+            growth_plan = await db.growth_plans.find_one_and_update(
+                {"user_id": user_id},
+                {"$setOnInsert": new_default_growth_plan()},
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
             )
-            
-            await db.growth_plans.insert_one(default_plan.dict())
-            return default_plan
-        
-        return parse_json(growth_plan)
+        except DuplicateKeyError:
+            # Lost the upsert race to another request; its plan is there now
+            growth_plan = await db.growth_plans.find_one({"user_id": user_id}, {"_id": 0})
+
+        growth_plan = parse_json(growth_plan)
+        growth_plan_cache.set(cache_key, growth_plan)
+        return growth_plan
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve growth plan: {str(e)}")
 
+@app.put("/api/growth-plan")
+async def update_growth_plan(plan_update: dict, user_id: Optional[str] = None):
+    try:
+        # Only plan content may change; identity and timestamps are managed here
+        update = {k: v for k, v in plan_update.items() if k in ("current_week", "goals")}
+        if not update:
+            raise HTTPException(status_code=400, detail="Nothing to update")
+        updated = await db.growth_plans.find_one_and_update(
+            {"user_id": user_id},
+            {"$set": {**update, "updated_at": utcnow()}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        await versions.bump(user_key("growth_plans", user_id))
+        if not updated:
+            raise HTTPException(status_code=404, detail="Growth plan not found")
+        return parse_json(updated)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update growth plan: {str(e)}")
+
 @app.post("/api/journal-entry")
 async def create_journal_entry(
     request: Request,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
 ):
     try:
         data = await request.json()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save journal entry: {str(e)}")
+    return await idempotent(request, response, idempotency_key, "/api/journal-entry", data.get("user_id"),
+                            lambda: save_journal_entry(data, background_tasks))
+
+async def save_journal_entry(data: dict, background_tasks: BackgroundTasks) -> dict:
+    try:
         entry = {
             "id": str(uuid.uuid4()),
             "user_id": data.get("user_id"),
             "content": data.get("content"),
             "day": data.get("day"),
             "activity_id": data.get("activity_id"),
-            "created_at": datetime.now().isoformat()
+            "created_at": utcnow(),
+            "analysis_status": "pending" if data.get("content") else "skipped",
+            "analysis_attempts": 0,
+            "queued_at": time.time()
         }
         
         await db.journal_entries.insert_one(entry)
         
-        # In a real app, we would queue a background task to analyze the journal entry
-        # and update the user's growth plan based on the content
+        # Analysis runs in the journal pipeline after the response is sent; it stores the
+        # result linked to the entry and updates the user's journal_stats rollup
+        if entry["analysis_status"] == "pending":
+            background_tasks.add_task(journal_pipeline.submit, entry)
         
         return {"success": True, "id": entry["id"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save journal entry: {str(e)}")
 
+# Analysis jobs: queued analyses drained by a pool of async workers
+job_queue = JobQueue(db.analysis_jobs)
+
+async def run_analysis_job(job: dict, queue: JobQueue):
+    """Analyze each message of a job, checkpointing after every message so retries resume."""
+    results = list(job.get("progress") or [])
+    for message in job["payload"]["messages"][len(results):]:
+        try:
+            result = await analyze_and_store(MessageInput(**message), priority=BATCH)
+        except HTTPException as http_exc:
+            # Client errors will fail the same way on every attempt; 429 and 5xx are worth retrying
+            if 400 <= http_exc.status_code < 500 and http_exc.status_code != 429:
+                raise PermanentJobError(http_exc.detail)
+            raise
+        results.append(result.model_dump())
+        await queue.save_progress(job, results)
+    return results
+
+job_workers = WorkerPool(job_queue, {"analyze": run_analysis_job, "import_transcript": run_import_job})
+
+@app.post("/api/jobs/analyze", status_code=202)
+async def create_analysis_job(job_input: AnalysisJobInput, request: Request, response: Response,
+                              idempotency_key: Optional[str] = Header(None)):
+    # A job's messages come from one client, so its first message names the user
+    user_id = job_input.messages[0].user_id if job_input.messages else None
+    return await idempotent(request, response, idempotency_key, "/api/jobs/analyze", user_id,
+                            lambda: enqueue_analysis_job(job_input, user_id))
+
+async def enqueue_analysis_job(job_input: AnalysisJobInput, user_id: Optional[str]) -> dict:
+    if not job_input.messages:
+        raise HTTPException(status_code=400, detail="At least one message is required")
+    try:
+        job = await job_queue.enqueue(
+            "analyze",
+            {"messages": [m.model_dump() for m in job_input.messages]},
+            priority=job_input.priority,
+            user_id=user_id,
+        )
+        return {"job_id": job["id"], "status": job["status"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue analysis job: {str(e)}")
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, user_id: Optional[str] = None):
+    try:
+        job = await job_queue.get(job_id, user_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "priority": job["priority"],
+            "attempts": job["attempts"],
+            "completed": len(job.get("progress") or []),
+            "total": len(job["payload"].get("messages") or []),
+            "result": job.get("result"),
+            "error": job.get("error"),
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve job: {str(e)}")
+
+# Journal entries are analyzed in batches in the background
+journal_pipeline = JournalPipeline(db)
+
+# Operational, like /metrics: served outside /api so nginx doesn't expose it publicly
+@app.get("/journal/pipeline", include_in_schema=False)
+async def get_journal_pipeline_status():
+    return journal_pipeline.snapshot()
+
+# Server push: analyses, relationship changes and dashboard updates for open pages
+event_bus = EventBus()
+change_feed = ChangeFeed(db, event_bus, compute_dashboard)
+versions.on_change = change_feed.on_version_change
+
+async def on_analyses_archived(user_id: Optional[str], relationship_ids: set):
+    await versions.bump(user_key("analysis_results", user_id), *(f"relationship:{rid}" for rid in relationship_ids))
+    change_feed.notify("analysis_results", "resync", user_id=user_id)
+
+# Analyses older than ANALYSIS_RETENTION_DAYS are archived and compacted in the background
+retention_job = RetentionJob(db, on_archived=on_analyses_archived)
+
+@app.get("/api/events")
+async def stream_events(user_id: Optional[str] = None):
+    """Server-sent events replacing dashboard polling; see backend/events.py for event types."""
+    async def event_stream():
+        queue = event_bus.subscribe(user_id)
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            yield format_sse({"type": "ready", "source": change_feed.mode})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Run the server if executed directly
 if __name__ == "__main__":
     import uvicorn
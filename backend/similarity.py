@@ -0,0 +1,139 @@
+import os
+import re
+import time
+import hashlib
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+SIMILARITY_THRESHOLD = int(os.environ.get("SIMILARITY_THRESHOLD", "3"))
+SIMILARITY_CACHE_SIZE = int(os.environ.get("SIMILARITY_CACHE_SIZE", "10000"))
+SIMILARITY_CACHE_TTL = float(os.environ.get("SIMILARITY_CACHE_TTL", "86400"))
+
+FINGERPRINT_BITS = 64
+
+_WHITESPACE = re.compile(r"\s+")
+# "sooooo" and "so" normalize alike; two letters are kept so "too" stays apart from "to"
+_REPEATS = re.compile(r"(.)\1{2,}")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Reduce a message to the words that carry its meaning: Unicode-normalized,
+    case-folded, with punctuation, symbols and emoji removed and whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    # Apostrophes join words ("don't" -> "dont") instead of splitting them
+    text = text.replace("'", "").replace("’", "")
+    kept = (ch if unicodedata.category(ch)[0] in "LN" else " " for ch in text)
+    text = _REPEATS.sub(r"\1\1", "".join(kept))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(normalized: str) -> int:
+    """64-bit SimHash over the words and word pairs of a normalized message."""
+    words = normalized.split()
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    weights = [0] * FINGERPRINT_BITS
+    for feature, count in features.items():
+        h = _feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimilarityIndex:
+    """
+    In-process cache of recent analyses that finds a prior analysis of the same or
+    a near-identical message.
+
+    Messages are compared on their normalized text, first exactly and then by the
+    Hamming distance between SimHash fingerprints. Fingerprints are split into
+    `threshold + 1` bands and indexed by each band, so any fingerprint within
+    `threshold` bits shares at least one band with the query (pigeonhole) and a
+    lookup only inspects those bucket members rather than every entry.
+
+    Entries are partitioned by `scope` (the user and the analysis context), expire
+    after `ttl` seconds and are evicted least-recently-used beyond `maxsize`.
+    """
+
+    def __init__(self, threshold: int = SIMILARITY_THRESHOLD, maxsize: int = SIMILARITY_CACHE_SIZE,
+                 ttl: float = SIMILARITY_CACHE_TTL):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        bands = max(1, min(threshold + 1, FINGERPRINT_BITS))
+        width = FINGERPRINT_BITS // bands
+        self._bands = [(i * width, (1 << width) - 1) for i in range(bands)]
+        # key -> (expires_at, fingerprint, value), in least-recently-used order
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, Any]]" = OrderedDict()
+        self._buckets: Dict[Tuple, Set[Tuple]] = {}
+
+    def _band_keys(self, scope: Hashable, fingerprint: int) -> List[Tuple]:
+        return [(scope, i, fingerprint >> shift & mask) for i, (shift, mask) in enumerate(self._bands)]
+
+    def lookup(self, scope: Hashable, text: str) -> Optional[Tuple[Any, int]]:
+        """(cached value, Hamming distance) for the closest match within the threshold, or None."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        now = time.monotonic()
+        exact = self._entries.get((scope, normalized))
+        if exact and exact[0] >= now:
+            self._entries.move_to_end((scope, normalized))
+            return exact[2], 0
+        if exact:
+            self._remove((scope, normalized))
+
+        fingerprint = simhash(normalized)
+        best_key, best_distance = None, self.threshold + 1
+        for band_key in self._band_keys(scope, fingerprint):
+            for key in self._buckets.get(band_key, ()):
+                expires_at, other, _ = self._entries[key]
+                distance = hamming(fingerprint, other)
+                if expires_at >= now and distance < best_distance:
+                    best_key, best_distance = key, distance
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][2], best_distance
+
+    def add(self, scope: Hashable, text: str, value: Any):
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+        key = (scope, normalized)
+        self._remove(key)
+        fingerprint = simhash(normalized)
+        self._entries[key] = (time.monotonic() + self.ttl, fingerprint, value)
+        for band_key in self._band_keys(scope, fingerprint):
+            self._buckets.setdefault(band_key, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(key[0], entry[1]):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+
+    def __len__(self):
+        return len(self._entries)
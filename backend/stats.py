@@ -0,0 +1,93 @@
+"""
+Summary stats kept on each relationship document, so the relationship list can
+show them without reading any analyses.
+
+`stats` holds the analysis count, a count per flag type and the health score
+after each of the latest STATS_TREND_POINTS analyses (a sparkline). It is
+updated in the same write that records an analysis on the relationship; see
+`stats_update`. `relationship_summary` is what the list endpoint returns.
+"""
+import os
+import logging
+from collections import Counter, deque
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+STATS_TREND_POINTS = int(os.environ.get("STATS_TREND_POINTS", "20"))
+STATS_TOP_FLAGS = 3
+# Fields left out of the relationship list; the full history is on GET /api/relationships/{id}
+LIST_EXCLUDED_FIELDS = ("flag_history", "health")
+
+
+def flag_key(flag_type: Optional[str]) -> str:
+    """Flag type as a document key; Mongo field names can't contain dots or start with $."""
+    return (flag_type or "Unknown").replace(".", "_").lstrip("$") or "Unknown"
+
+
+def stats_update(analyses: Iterable[dict], trend: Iterable[int] = ()) -> dict:
+    """Update adding analyses and the health scores after them, oldest first, to a relationship's stats."""
+    analyses = list(analyses)
+    inc = Counter({"stats.analysis_count": len(analyses)})
+    for analysis in analyses:
+        for flag in analysis.get("flags") or []:
+            inc[f"stats.flag_counts.{flag_key(flag.get('type'))}"] += 1
+    update = {"$inc": dict(inc)}
+    trend = list(trend)
+    if trend:
+        update["$push"] = {"stats.health_trend": {"$each": trend, "$slice": -STATS_TREND_POINTS}}
+    return update
+
+
+def merge_updates(*updates: Optional[dict]) -> dict:
+    """Combine update documents that touch different fields into one."""
+    merged = {}
+    for update in updates:
+        for operator, fields in (update or {}).items():
+            merged[operator] = {**merged.get(operator, {}), **fields}
+    return merged
+
+
+def relationship_summary(relationship: dict) -> dict:
+    """A relationship as listed: its own fields plus compact stats."""
+    summary = {key: value for key, value in relationship.items() if key not in LIST_EXCLUDED_FIELDS}
+    stats = relationship.get("stats") or {}
+    count = stats.get("analysis_count", 0)
+    top_flags = Counter(stats.get("flag_counts") or {}).most_common(STATS_TOP_FLAGS)
+    summary["stats"] = {
+        "analysis_count": count,
+        "last_sentiment": relationship.get("sentiment") if count else None,
+        "top_flags": [{"type": flag_type, "count": n} for flag_type, n in top_flags],
+        "health_trend": stats.get("health_trend") or [],
+    }
+    return summary
+
+
+async def rebuild_stats(db, user_id: Optional[str] = None, relationship_id: Optional[str] = None) -> int:
+    """
+    Recompute every relationship's stats from its stored analyses. Like health
+    recomputes, analyses written while this runs may be missed; run it again, or at
+    a quiet time. Returns relationships rebuilt.
+    """
+    query = {}
+    if user_id is not None:
+        query["user_id"] = user_id
+    if relationship_id is not None:
+        query["id"] = relationship_id
+    rebuilt = 0
+    async for relationship in db.relationships.find(query, {"user_id": 1, "id": 1}):
+        count, flag_counts, trend = 0, Counter(), deque(maxlen=STATS_TREND_POINTS)
+        cursor = db.analysis_results.find(
+            {"user_id": relationship.get("user_id"), "relationship_id": relationship["id"]},
+            {"flags.type": 1, "health_score": 1},
+        ).sort("created_at", 1).batch_size(1000)
+        async for analysis in cursor:
+            count += 1
+            flag_counts.update(flag_key(flag.get("type")) for flag in analysis.get("flags") or [])
+            if analysis.get("health_score") is not None:
+                trend.append(analysis["health_score"])
+        stats = {"analysis_count": count, "flag_counts": dict(flag_counts), "health_trend": list(trend)}
+        await db.relationships.update_one({"_id": relationship["_id"]}, {"$set": {"stats": stats}})
+        rebuilt += 1
+    logger.info(f"Rebuilt stats of {rebuilt} relationships")
+    return rebuilt
@@ -0,0 +1,126 @@
+import time
+import uuid
+import logging
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import structlog
+
+request_log = structlog.get_logger("request")
+
+# Timer for the request being served. GroqScheduler.run calls the Groq SDK in its
+# thread pool with a copy of the caller's context, so spans opened there land on the
+# same timer.
+_current_timer: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+
+def configure_structlog(level: int = logging.INFO):
+    """Render structlog events as one JSON object per line on stdout."""
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.JSONRenderer(),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        logger_factory=structlog.PrintLoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
+
+class RequestTimer:
+    """Accumulated stage durations (milliseconds) for one request."""
+
+    __slots__ = ("request_id", "durations", "started_at")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.durations: Dict[str, float] = {}
+        self.started_at = time.perf_counter()
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds * 1000.0
+
+    def server_timing(self, total_ms: float) -> str:
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.durations.items()]
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+class span:
+    """
+    Time a stage of the current request: `with span("db_insert"): ...`.
+
+    A plain class rather than a generator-based context manager keeps the cost to
+    two perf_counter calls and a dict update; outside a request it does nothing.
+    """
+
+    __slots__ = ("name", "timer", "started_at")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timer = _current_timer.get()
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.timer is not None:
+            self.timer.add(self.name, time.perf_counter() - self.started_at)
+        return False
+
+
+def current_request_id() -> Optional[str]:
+    timer = _current_timer.get()
+    return timer.request_id if timer else None
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that opens a RequestTimer per HTTP request, adds `Server-Timing`
+    and `X-Request-ID` response headers, and writes one structured log line per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        timer = RequestTimer(request_id or uuid.uuid4().hex)
+        token = _current_timer.set(timer)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - timer.started_at) * 1000.0
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing(total_ms).encode("latin-1")))
+                headers.append((b"x-request-id", timer.request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timer.reset(token)
+            route = scope.get("route")
+            request_log.info(
+                "request",
+                request_id=timer.request_id,
+                method=scope["method"],
+                route=getattr(route, "path", scope["path"]),
+                status=status_code,
+                duration_ms=round((time.perf_counter() - timer.started_at) * 1000.0, 2),
+                spans={name: round(ms, 2) for name, ms in timer.durations.items()},
+            )
@@ -0,0 +1,279 @@
+import os
+import re
+import codecs
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from backend.external_integrations.groq_client import (
+    analyze_text_with_groq,
+    analyze_texts_with_groq,
+    transform_groq_response_to_server_format,
+)
+from backend.scheduler import BATCH, groq_scheduler
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CONCURRENCY = int(os.environ.get("IMPORT_CONCURRENCY", "4"))
+# Consecutive messages analyzed together in one packed Groq call
+IMPORT_PACK_SIZE = int(os.environ.get("IMPORT_PACK_SIZE", "5"))
+IMPORT_INSERT_BATCH = int(os.environ.get("IMPORT_INSERT_BATCH", "50"))
+IMPORT_MAX_MESSAGES = int(os.environ.get("IMPORT_MAX_MESSAGES", "5000"))
+# Longer messages (pasted essays, runaway continuation lines) are cut to this length
+IMPORT_MAX_MESSAGE_CHARS = 4000
+
+_TIME = r"(\d{1,2}[:.]\d{2}(?:[:.]\d{2})?(?:\s?[APap]\.?\s?[Mm]\.?)?)"
+# Timestamped line formats, tried in order until one matches; the rest of the file
+# is then read in that format so continuation lines are never mistaken for headers
+LINE_FORMATS = {
+    # 12/31/23, 9:41 PM - Alice: text   (WhatsApp, Android)
+    "whatsapp_android": re.compile(r"^(\d{1,2}[./-]\d{1,2}[./-]\d{2,4}),? " + _TIME + r" - (.*)$"),
+    # [12/31/23, 9:41:05 PM] Alice: text   (WhatsApp, iOS)
+    "whatsapp_ios": re.compile(r"^\[(\d{1,2}[./-]\d{1,2}[./-]\d{2,4}),? " + _TIME + r"\] (.*)$"),
+    # 2023-12-31 21:41 Alice: text   or   [2023-12-31T21:41:05] Alice: text
+    "iso": re.compile(r"^\[?(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}(?::\d{2})?)\]?(?: -)? (.*)$"),
+}
+_SPEAKER = re.compile(r"^([^:]{1,64}?): (.*)$")
+_PLAIN = re.compile(r"^([^:\s][^:]{0,63}?): (.*)$")
+_MEDIA_PLACEHOLDERS = {"<media omitted>", "<attached>", "image omitted", "video omitted", "sticker omitted"}
+_INVISIBLE = str.maketrans({"\u200e": None, "\u200f": None, "\ufeff": None, "\u202f": " ", "\u00a0": " "})
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream as UTF-8 and yield it one line at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def parse_timestamp(date_part: str, time_part: str, dayfirst: bool = False) -> Optional[datetime]:
+    """Datetime from a chat export's date and time, or None if it doesn't parse."""
+    try:
+        raw_parts = re.split(r"[./-]", date_part)
+        parts = [int(p) for p in raw_parts]
+        if len(raw_parts[0]) == 4:
+            year, month, day = parts
+        else:
+            first, second, year = parts
+            month, day = (second, first) if dayfirst else (first, second)
+            if month > 12:
+                month, day = day, month
+            if year < 100:
+                year += 2000
+        clock = time_part.strip().lower().replace(".", ":")
+        meridiem = None
+        for suffix in ("am", "pm", "a:m:", "p:m:", "a:m", "p:m"):
+            if clock.endswith(suffix):
+                meridiem = suffix[0]
+                clock = clock[: -len(suffix)].strip()
+                break
+        numbers = [int(p) for p in clock.split(":")]
+        hour, minute, second = (numbers + [0])[:3]
+        if meridiem == "p" and hour < 12:
+            hour += 12
+        elif meridiem == "a" and hour == 12:
+            hour = 0
+        return datetime(year, month, day, hour, minute, second)
+    except (ValueError, TypeError):
+        return None
+
+
+class TranscriptParser:
+    """
+    Incremental parser for exported chats (WhatsApp on Android or iOS, ISO-timestamped
+    logs, or plain `Speaker: text` lines). Feed it lines; it yields one message dict
+    (`speaker`, `sent_at`, `text`) per chat message, joining multi-line messages.
+    """
+
+    def __init__(self, dayfirst: bool = False):
+        self.dayfirst = dayfirst
+        self.format: Optional[str] = None
+        self.current: Optional[dict] = None
+        self.skipped_lines = 0
+
+    def _match(self, line: str):
+        """(sent_at, rest of line) if `line` starts a new entry, else None."""
+        if self.format is None:
+            candidates = list(LINE_FORMATS)
+        elif self.format in LINE_FORMATS:
+            candidates = [self.format]
+        else:
+            candidates = []
+        for name in candidates:
+            match = LINE_FORMATS[name].match(line)
+            if match:
+                self.format = name
+                date_part, time_part, rest = match.groups()
+                return parse_timestamp(date_part, time_part, self.dayfirst), rest
+        if self.format in (None, "plain") and _PLAIN.match(line):
+            self.format = "plain"
+            return None, line
+        return None
+
+    def feed(self, line: str) -> Optional[dict]:
+        """Consume one line; returns the previous message once this line starts a new one."""
+        line = line.translate(_INVISIBLE)
+        header = self._match(line)
+        if header is None:
+            # Continuation of the current message, or noise before the first message
+            if self.current is not None and line.strip():
+                if len(self.current["text"]) < IMPORT_MAX_MESSAGE_CHARS:
+                    self.current["text"] = (self.current["text"] + "\n" + line.strip())[:IMPORT_MAX_MESSAGE_CHARS]
+            elif line.strip():
+                self.skipped_lines += 1
+            return None
+
+        sent_at, rest = header
+        finished = self.finish()
+        speaker = _SPEAKER.match(rest)
+        if speaker is None:
+            # Timestamped system line ("Messages are end-to-end encrypted")
+            self.skipped_lines += 1
+            return finished
+        self.current = {
+            "speaker": speaker.group(1).strip(),
+            "sent_at": sent_at,
+            "text": speaker.group(2).strip()[:IMPORT_MAX_MESSAGE_CHARS],
+        }
+        return finished
+
+    def finish(self) -> Optional[dict]:
+        """The message in progress, if it's worth analyzing."""
+        message, self.current = self.current, None
+        if message is None:
+            return None
+        if not message["text"] or message["text"].strip().lower() in _MEDIA_PLACEHOLDERS:
+            self.skipped_lines += 1
+            return None
+        return message
+
+
+async def parse_transcript(lines: AsyncIterator[str], parser: TranscriptParser) -> AsyncIterator[dict]:
+    async for line in lines:
+        message = parser.feed(line)
+        if message:
+            yield message
+    message = parser.finish()
+    if message:
+        yield message
+
+
+async def stage_transcript(messages: AsyncIterator[dict], collection, import_id: str,
+                           batch_size: int = IMPORT_INSERT_BATCH, max_messages: int = IMPORT_MAX_MESSAGES) -> dict:
+    """
+    Store parsed messages in `collection`, numbered by `seq` in chat order, for an
+    import job to analyze later. Returns how many were stored and whether the chat
+    was cut at `max_messages`.
+    """
+    stats = {"parsed": 0, "truncated": False}
+    batch: List[dict] = []
+    async for message in messages:
+        if stats["parsed"] >= max_messages:
+            stats["truncated"] = True
+            break
+        batch.append({**message, "import_id": import_id, "seq": stats["parsed"]})
+        stats["parsed"] += 1
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+    return stats
+
+
+async def analyze_transcript_pack(texts: List[str], context: Optional[str]) -> List[dict]:
+    """Analyze consecutive messages in one packed call, falling back to one call per message."""
+    if len(texts) > 1:
+        results = await groq_scheduler.run(BATCH, analyze_texts_with_groq, texts, context)
+        if results is not None:
+            return [transform_groq_response_to_server_format(r, t) for r, t in zip(results, texts)]
+    analyses = []
+    for text in texts:
+        raw = await groq_scheduler.run(BATCH, analyze_text_with_groq, text, context)
+        analyses.append(transform_groq_response_to_server_format(raw, text))
+    return analyses
+
+
+async def run_import(messages: AsyncIterator[dict],
+                     analyze: Callable[[List[dict]], Awaitable[List[dict]]],
+                     store: Callable[[List[dict], dict], Awaitable[None]],
+                     concurrency: int = IMPORT_CONCURRENCY,
+                     pack_size: int = IMPORT_PACK_SIZE,
+                     batch_size: int = IMPORT_INSERT_BATCH,
+                     max_messages: int = IMPORT_MAX_MESSAGES) -> dict:
+    """
+    Pipeline parsed messages through analysis into storage.
+
+    At most `concurrency` packs of `pack_size` messages are analyzed at once;
+    reading waits for a free slot, so messages are consumed only as fast as they
+    are analyzed. Analyzed documents are handed to `store` in chat order, in batches
+    of `batch_size`, along with the running stats. A pack that finishes ahead of an
+    earlier one keeps its slot until that one is done, so memory is bounded by the
+    window, not the chat.
+    """
+    stats = {"parsed": 0, "analyzed": 0, "failed": 0, "truncated": False}
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+    finished: Dict[int, List[dict]] = {}
+    ready: List[dict] = []
+    submitted = 0
+    next_pack = 0
+
+    async def process(number: int, pack: List[dict]):
+        nonlocal next_pack
+        try:
+            finished[number] = await analyze(pack)
+        except Exception as e:
+            logger.warning(f"Transcript analysis failed for {len(pack)} messages: {e}")
+            stats["failed"] += len(pack)
+            finished[number] = []
+        while next_pack in finished:
+            ready.extend(finished.pop(next_pack))
+            next_pack += 1
+            slots.release()
+
+    async def flush(limit: int):
+        while len(ready) >= limit and ready:
+            batch = ready[:batch_size]
+            del ready[:batch_size]
+            stats["analyzed"] += len(batch)
+            await store(batch, stats)
+
+    async def submit(pack: List[dict]):
+        nonlocal submitted
+        await slots.acquire()
+        task = asyncio.create_task(process(submitted, pack))
+        submitted += 1
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        await flush(batch_size)
+
+    pack: List[dict] = []
+    try:
+        async for message in messages:
+            if stats["parsed"] >= max_messages:
+                stats["truncated"] = True
+                break
+            stats["parsed"] += 1
+            pack.append(message)
+            if len(pack) >= pack_size:
+                await submit(pack)
+                pack = []
+        if pack:
+            await submit(pack)
+        if tasks:
+            await asyncio.gather(*tasks)
+        await flush(1)
+    finally:
+        # Upload aborted or storage failed: don't leave analyses running
+        for task in tasks:
+            task.cancel()
+    return stats
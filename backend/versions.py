@@ -0,0 +1,103 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+VERSION_REFRESH_INTERVAL = float(os.environ.get("VERSION_REFRESH_INTERVAL", "1.0"))
+# Clock skew tolerated between processes when fetching recently bumped counters
+VERSION_REFRESH_OVERLAP = 5.0
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def user_key(resource: str, user_id: Optional[str]) -> str:
+    """Version key of one user's slice of a collection; anonymous data keeps the bare name."""
+    return f"{resource}:{user_id}" if user_id else resource
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag` (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+class VersionTracker:
+    """
+    Version counters for cached read endpoints, keyed by resource
+    ("analysis_results", "relationships", "relationship:<id>").
+
+    Write paths call `bump()`, which increments the shared counter in Mongo and
+    the local copy. Read paths build their ETag with `etag()`, which never leaves
+    memory, so a matching If-None-Match is answered before any query runs.
+    Counters bumped by other worker processes are picked up every
+    `refresh_interval` seconds, which bounds how long they can be answered with
+    a stale 304. `on_change`, if set, is called with each key found bumped that way.
+    """
+
+    def __init__(self, collection, refresh_interval: float = VERSION_REFRESH_INTERVAL,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self.versions: Dict[str, int] = {}
+        self._refreshed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("updated_at")
+
+    def etag(self, *keys: str) -> str:
+        return '"' + "-".join(str(self.versions.get(key, 0)) for key in keys) + '"'
+
+    async def bump(self, *keys: str):
+        await asyncio.gather(*(self._bump(key) for key in keys))
+
+    async def _bump(self, key: str):
+        try:
+            doc = await self.collection.find_one_and_update(
+                {"_id": key},
+                {"$inc": {"version": 1}, "$set": {"updated_at": time.time()}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            self.versions[key] = max(self.versions.get(key, 0), doc["version"])
+        except Exception as e:
+            # Still invalidate this process's ETags; other processes catch up on the next write
+            logger.warning(f"Could not bump version of {key}: {e}")
+            self.versions[key] = self.versions.get(key, 0) + 1
+
+    async def refresh(self):
+        started_at = time.time()
+        query = {"updated_at": {"$gte": self._refreshed_at - VERSION_REFRESH_OVERLAP}} if self._refreshed_at else {}
+        async for doc in self.collection.find(query):
+            if doc["version"] > self.versions.get(doc["_id"], 0):
+                self.versions[doc["_id"]] = doc["version"]
+                if self.on_change:
+                    self.on_change(doc["_id"])
+        self._refreshed_at = started_at
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Could not refresh resource versions: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,44 @@
+"""
+Launch the FastAPI backend for benchmarking.
+
+With `--mongo memory` the Motor client is swapped for mongomock-motor's in-memory
+client before the app is imported, so no MongoDB server is needed. Any other value
+is used as MONGO_URL.
+
+    python -m benchmarks.app_server --port 8801 --mongo memory
+"""
+import os
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the backend for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--mongo", default="memory", help="'memory' or a MongoDB URL")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.mongo == "memory":
+        if args.workers != 1:
+            parser.error("--mongo memory keeps data in-process and needs --workers 1")
+        # mongomock-motor is a benchmark-only dependency
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    else:
+        os.environ["MONGO_URL"] = args.mongo
+
+    import uvicorn
+    uvicorn.run(
+        "backend.server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level="warning",
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Local load test for the backend API.
+
+Starts the app (see benchmarks/app_server.py) against an in-memory or local Mongo
+and a fake Groq server, drives each endpoint at a fixed concurrency, and reports
+p50/p95/p99 latency and requests per second. Results are written as JSON, tagged
+with the git commit, so runs can be compared across commits:
+
+    python -m benchmarks.load_test --concurrency 32 --duration 10
+    python -m benchmarks.load_test --compare benchmarks/results/<earlier run>.json
+
+With --import-lines, transcripts of that many messages are imported back to back
+while every endpoint is measured, to check that interactive latency holds up
+while batch work competes for Groq. This needs a real MongoDB: the in-memory mock
+runs every query on the event loop, and its unique-index checks on the imported
+messages stall every request for seconds, so it would measure the mock instead:
+
+    python -m benchmarks.load_test --endpoints analyze --import-lines 2000 --mongo mongodb://localhost:27017
+
+Analyze requests are all distinct messages, and the backend started here runs with
+near-duplicate reuse off, so every analysis goes through Groq. Pass --reuse to
+measure with reuse on.
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from tests.fake_groq import FakeGroqServer, LatencyModel, LATENCY_DISTRIBUTIONS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+SAMPLE_MESSAGES = [
+    "I feel like you never listen to me when I'm trying to explain something important.",
+    "Thanks for helping me move last weekend, it meant a lot.",
+    "Whatever. Do what you want, you always do anyway.",
+    "Can we talk tonight about how the budget conversation went?",
+]
+
+
+class Endpoint:
+    """One benchmarked request; `body` builds a fresh JSON payload per request."""
+
+    def __init__(self, name: str, method: str, path: str, body: Optional[Callable[[int], dict]] = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+
+
+def analysis_request(i: int, relationship_id: str) -> dict:
+    # Numbered so no two requests are the same message
+    return {"text": f"{SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]} ({i})", "relationship_id": relationship_id}
+
+
+def build_endpoints(relationship_id: str) -> List[Endpoint]:
+    def message(i):
+        return analysis_request(i, relationship_id)
+
+    return [
+        Endpoint("health", "GET", "/api/health"),
+        Endpoint("analyze", "POST", "/api/analyze", message),
+        Endpoint("history", "GET", "/api/history"),
+        Endpoint("dashboard", "GET", "/api/dashboard"),
+        Endpoint("relationships", "GET", "/api/relationships"),
+        Endpoint("relationship_history", "GET", f"/api/relationships/{relationship_id}/history"),
+        Endpoint("growth_plan", "GET", "/api/growth-plan?user_id=bench-user"),
+        Endpoint("journal_entry", "POST", "/api/journal-entry", lambda i: {
+            "user_id": "bench-user", "content": SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)], "day": 1
+        }),
+    ]
+
+
+async def keep_importing(base_url: str, lines: int):
+    """Import a `lines`-message transcript into a fresh relationship, over and over, until cancelled."""
+    transcript = "".join(f"Alex: {SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]} ({i})\n" for i in range(lines))
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        response = await client.post("/api/relationships", json={"name": "Bench Import", "type": "Friend"})
+        response.raise_for_status()
+        relationship_id = response.json()["id"]
+        while True:
+            await client.post(f"/api/relationships/{relationship_id}/import", content=transcript.encode("utf-8"))
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+async def drive(client: httpx.AsyncClient, endpoint: Endpoint, concurrency: int,
+                duration: float, max_requests: Optional[int]) -> dict:
+    """Run `concurrency` closed-loop clients against one endpoint for `duration` seconds."""
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors, counter
+        while time.perf_counter() < deadline and (max_requests is None or counter < max_requests):
+            i = counter
+            counter += 1
+            kwargs = {"json": endpoint.body(i)} if endpoint.body else {}
+            started = time.perf_counter()
+            try:
+                response = await client.request(endpoint.method, endpoint.path, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Backend at {base_url} did not become ready within {timeout}s")
+
+
+async def run_benchmark(base_url: str, args) -> Dict[str, dict]:
+    await wait_until_ready(base_url)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        response = await client.post("/api/relationships", json={"name": "Bench Partner", "type": "Partner"})
+        response.raise_for_status()
+        relationship_id = response.json()["id"]
+        endpoints = build_endpoints(relationship_id)
+        if args.endpoints:
+            endpoints = [e for e in endpoints if e.name in args.endpoints]
+
+        # Seed some history so read endpoints have data to return
+        for i in range(args.seed):
+            await client.post("/api/analyze", json=analysis_request(i, relationship_id))
+
+        importer = asyncio.create_task(keep_importing(base_url, args.import_lines)) if args.import_lines else None
+        results = {}
+        try:
+            for endpoint in endpoints:
+                results[endpoint.name] = await drive(client, endpoint, args.concurrency, args.duration, args.requests)
+                print_row(endpoint.name, results[endpoint.name])
+        finally:
+            if importer:
+                importer.cancel()
+                await asyncio.gather(importer, return_exceptions=True)
+        return results
+
+
+def print_row(name: str, stats: dict):
+    print(f"{name:<22} {stats['requests']:>7} {stats['errors']:>6} {stats['rps']:>9.1f} "
+          f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+
+def print_comparison(current: Dict[str, dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange vs {baseline.get('commit') or baseline_path}:")
+    for name, stats in current.items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before[key]:
+                deltas.append(f"{key} {100.0 * (stats[key] - before[key]) / before[key]:+.1f}%")
+        print(f"  {name:<22} " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend locally")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    parser.add_argument("--requests", type=int, default=None, help="cap on requests per endpoint")
+    parser.add_argument("--endpoints", nargs="*", help="subset of endpoint names to run")
+    parser.add_argument("--seed", type=int, default=50, help="analyses to create before measuring")
+    parser.add_argument("--import-lines", type=int, default=0,
+                        help="keep importing a transcript of this many messages while measuring")
+    parser.add_argument("--mongo", default="memory", help="'memory' or a MongoDB URL")
+    parser.add_argument("--reuse", action="store_true",
+                        help="keep near-duplicate reuse on, so repeated messages skip Groq")
+    parser.add_argument("--groq-latency-ms", type=float, default=200.0)
+    parser.add_argument("--groq-latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--base-url", help="benchmark an already running backend instead of starting one")
+    parser.add_argument("--output", help="where to write JSON results")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+    if args.import_lines and args.mongo == "memory" and args.base_url is None:
+        parser.error("--import-lines needs a real MongoDB (--mongo URL); see the module docstring")
+
+    fake_groq = None
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        fake_groq = FakeGroqServer(
+            latency_model=LatencyModel(args.groq_latency_dist, args.groq_latency_ms)
+        ).start()
+        port = free_port()
+        env = {
+            **os.environ,
+            "GROQ_API_KEY": "fake-key",
+            "GROQ_BASE_URL": fake_groq.base_url,
+            "PYTHONPATH": REPO_ROOT,
+        }
+        if not args.reuse:
+            # An index that can hold nothing never finds a match
+            env["SIMILARITY_CACHE_SIZE"] = "0"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.app_server", "--port", str(port), "--mongo", args.mongo],
+            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+
+    print(f"{'endpoint':<22} {'reqs':>7} {'errors':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    try:
+        results = asyncio.run(run_benchmark(base_url, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        if fake_groq is not None:
+            fake_groq.stop()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mongo": "memory" if args.mongo == "memory" else "external",
+            "groq_latency_ms": args.groq_latency_ms if args.base_url is None else None,
+            "groq_latency_dist": args.groq_latency_dist if args.base_url is None else None,
+            "import_lines": args.import_lines,
+            "reuse": args.reuse if args.base_url is None else None,
+        },
+        "endpoints": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or uuid.uuid4().hex[:7]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Latency benchmark for /api/search queries against a large analysis history.
+
+Seeds a MongoDB database with synthetic analyses (only the missing ones, so
+repeated runs reuse the data), builds the same text index the backend does, and
+times each query shape through backend.search, reporting p50/p95/p99 in
+milliseconds:
+
+    python -m benchmarks.search --mongo mongodb://localhost:27017 --documents 1000000
+    python -m benchmarks.search --users 1 --queries 200
+
+Needs a real MongoDB: the in-memory mock used by the load test has no text search.
+The data goes to its own database (--database) and is left there for the next run.
+"""
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import timedelta
+from typing import Dict, List
+
+import motor.motor_asyncio
+
+from backend.database import utcnow
+from backend.export import export_query
+from backend.search import SEARCH_INDEX_NAME, ensure_search_index, run_search
+
+SEED_BATCH_SIZE = 5000
+
+WORDS = (
+    "listen talk work late dinner money budget weekend family friends sorry thanks tired busy "
+    "call text phone plans trip house chores kids parents school birthday gift movie night morning "
+    "stress worry trust promise forget remember help move honest feel hurt happy angry calm space"
+).split()
+# Rare enough to match a handful of documents per user
+RARE_WORDS = ["saxophone", "avalanche", "pelican", "origami", "zeppelin"]
+INTERPRETATIONS = [
+    "The speaker feels unheard and is asking for more attention.",
+    "An expression of gratitude that strengthens the connection.",
+    "Frustration is being expressed indirectly through sarcasm.",
+    "A calm request to revisit a difficult conversation.",
+]
+FLAG_TYPES = ["emotional_concern", "communication_pattern", "boundary_issue"]
+
+
+def synthetic_analysis(rng: random.Random, user_id: str, relationship_ids: List[str], now) -> dict:
+    words = rng.choices(WORDS, k=rng.randint(8, 20))
+    if rng.random() < 0.001:
+        words.append(rng.choice(RARE_WORDS))
+    flags = [{"type": rng.choice(FLAG_TYPES), "description": "synthetic"} for _ in range(rng.randint(0, 2))]
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "relationship_id": rng.choice(relationship_ids),
+        "text": " ".join(words),
+        "interpretation": rng.choice(INTERPRETATIONS),
+        "suggestions": [" ".join(rng.choices(WORDS, k=5)) for _ in range(2)],
+        "sentiment": rng.choice(["positive", "neutral", "negative"]),
+        "flags": flags,
+        "created_at": now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+    }
+
+
+async def seed(collection, documents: int, users: int):
+    existing = await collection.estimated_document_count()
+    missing = documents - existing
+    rng = random.Random(existing)
+    relationships = {f"user-{u}": [f"rel-{u}-{r}" for r in range(5)] for u in range(users)}
+    now = utcnow()
+    started = time.perf_counter()
+    while missing > 0:
+        batch = []
+        for _ in range(min(SEED_BATCH_SIZE, missing)):
+            user_id = f"user-{rng.randrange(users)}"
+            batch.append(synthetic_analysis(rng, user_id, relationships[user_id], now))
+        await collection.insert_many(batch, ordered=False)
+        missing -= len(batch)
+    if existing < documents:
+        print(f"seeded {documents - existing} analyses in {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    await ensure_search_index(collection)
+    await collection.create_index([("user_id", 1), ("created_at", -1)])
+    print(f"text index {SEARCH_INDEX_NAME} ready in {time.perf_counter() - started:.1f}s")
+
+
+def query_shapes(now) -> Dict[str, dict]:
+    """Search arguments per benchmarked shape, all for user-0."""
+    base = export_query(user_id="user-0")
+    return {
+        "rare term": {"query": base, "q": "saxophone"},
+        "common term": {"query": base, "q": "budget"},
+        "two terms": {"query": base, "q": "dinner trust"},
+        "phrase": {"query": base, "q": '"family dinner"'},
+        "recent first": {"query": base, "q": "budget", "sort": "recent"},
+        "relationship": {"query": export_query(relationship_id="rel-0-0", user_id="user-0"), "q": "budget"},
+        "last 30 days": {"query": export_query(since=now - timedelta(days=30), user_id="user-0"), "q": "budget"},
+        "flag type": {"query": base, "q": "budget", "flag_types": ["boundary_issue"]},
+        "projection": {"query": base, "q": "budget", "fields": ["text"]},
+    }
+
+
+async def time_shape(collection, args: dict, queries: int, pages: int) -> List[float]:
+    latencies = []
+    for _ in range(queries):
+        cursor = None
+        for _ in range(pages):
+            started = time.perf_counter()
+            _, cursor = await run_search(collection, cursor=cursor, **args)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not cursor:
+                break
+    return latencies
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def main_async(args):
+    client = motor.motor_asyncio.AsyncIOMotorClient(args.mongo)
+    collection = client[args.database].analysis_results
+    await seed(collection, args.documents, args.users)
+    user_documents = await collection.count_documents({"user_id": "user-0"})
+    print(f"{args.documents} analyses, {user_documents} for the searched user\n")
+    print(f"{'query':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, shape in query_shapes(utcnow()).items():
+        await time_shape(collection, shape, 2, 1)  # Warm the index into cache
+        latencies = sorted(await time_shape(collection, shape, args.queries, args.pages))
+        print(f"{name:<16}{statistics.median(latencies):>10.1f}"
+              f"{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analysis search latency")
+    parser.add_argument("--mongo", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="search_benchmark")
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10, help="analyses are spread evenly over this many users")
+    parser.add_argument("--queries", type=int, default=50, help="runs per query shape")
+    parser.add_argument("--pages", type=int, default=3, help="pages followed per run, via the cursor")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Cold-start benchmark for a backend worker.
+
+Measures time to first request: spawn a fresh `uvicorn backend.server:app` process
+(what each gunicorn worker runs), then poll /api/health until it answers. It also
+prints the slowest imports from `python -X importtime`, so you can see where
+startup time goes:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --importtime 25
+
+MongoDB does not need to be running. The client connects in the background and
+readiness (/api/ready) is not part of this measurement.
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from typing import List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(timeout: float = 30.0) -> float:
+    """Seconds from process spawn until GET /api/health returns 200."""
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, "JOB_WORKERS": os.environ.get("JOB_WORKERS", "0")}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/api/health"
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"backend exited with code {process.returncode} during startup")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"backend did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def slowest_imports(module: str = "backend.server", limit: int = 20) -> List[Tuple[int, int, str]]:
+    """(self_us, cumulative_us, name) for the slowest imports of `module`, by cumulative time."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env={**os.environ, "PYTHONPATH": REPO_ROOT},
+        capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, metavar="N", default=0,
+                        help="also list the N slowest imports of backend.server")
+    args = parser.parse_args()
+
+    timings = [time_to_first_request() for _ in range(args.runs)]
+    print(f"time to first request over {args.runs} runs: "
+          f"median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+
+    if args.importtime:
+        print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+        for self_us, cumulative_us, name in slowest_imports(limit=args.importtime):
+            print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Micro-benchmarks for the per-analysis post-processing path:
+
+    response cleaning -> json.loads -> transform_groq_response_to_server_format
+    -> Flag/AnalysisResult construction -> model_dump -> parse_json
+
+Each benchmark also asserts a per-call budget (microseconds) so a large CPU
+regression fails outright. Budgets are generous ceilings for a typical dev machine;
+scale them with BENCH_BUDGET_SCALE on slower hardware. For finer-grained review,
+compare against a saved run:
+
+    pytest benchmarks/test_postprocessing.py --benchmark-autosave
+    pytest benchmarks/test_postprocessing.py --benchmark-compare --benchmark-compare-fail=median:15%
+"""
+import os
+import json
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from backend.external_integrations.groq_client import (  # noqa: E402
+    clean_json_response,
+    transform_groq_response_to_server_format,
+)
+from backend.server import MessageInput, build_analysis_result, parse_json  # noqa: E402
+
+BUDGET_SCALE = float(os.environ.get("BENCH_BUDGET_SCALE", "1.0"))
+
+TYPICAL_RESPONSE = {
+    "sentiment": "negative",
+    "emotional_tone": "Frustrated and hurt, with an undertone of wanting to be understood",
+    "communication_style": "Direct but accusatory, leaning on generalizations",
+    "potential_triggers": ["never listen", "always", "important"],
+    "suggestions": [
+        "Use 'I' statements to describe how you feel",
+        "Name one specific moment instead of generalizing",
+        "Ask for what you need going forward",
+    ],
+    "confidence_score": 0.86,
+    "emotional_flags": ["frustration", "generalization"],
+    "relationship_insights": "Repeated generalizations can make the other person defensive",
+    "emotional_maturity_level": "Moderate: feelings are named but blame is externalized",
+}
+
+LARGE_RESPONSE = {
+    **TYPICAL_RESPONSE,
+    "potential_triggers": [f"trigger phrase number {i} that the model called out" for i in range(60)],
+    "suggestions": [f"Suggestion {i}: a full sentence of actionable communication advice." for i in range(40)],
+    "emotional_flags": [f"concerning pattern {i}" for i in range(30)],
+}
+
+PAYLOADS = {
+    "typical": TYPICAL_RESPONSE,
+    "large": LARGE_RESPONSE,
+}
+
+# Per-call budgets in microseconds, keyed by (stage, payload): about 3x the medians
+# measured when the suite was added, so only real regressions trip them
+BUDGETS_US = {
+    ("clean", "typical"): 8,
+    ("clean", "large"): 60,
+    ("json_loads", "typical"): 15,
+    ("json_loads", "large"): 50,
+    ("transform", "typical"): 10,
+    ("transform", "large"): 25,
+    ("build_result", "typical"): 60,
+    ("build_result", "large"): 250,
+    ("model_dump", "typical"): 25,
+    ("model_dump", "large"): 100,
+    ("parse_json", "typical"): 500,
+    ("parse_json", "large"): 3500,
+    ("end_to_end", "typical"): 700,
+    ("end_to_end", "large"): 4000,
+}
+
+MESSAGE = MessageInput(
+    text="I feel like you never listen to me when I'm trying to explain something important.",
+    context="This is a conversation between romantic partners.",
+    relationship_id="5f1c7a7e-8d0b-4a55-9d3c-2b6f2f7c1a10",
+)
+
+
+def fenced(payload: dict) -> str:
+    return f"```json\n{json.dumps(payload)}\n```"
+
+
+def check_budget(benchmark, stage: str, payload: str):
+    if benchmark.stats is None:
+        return  # --benchmark-disable: the function ran once, untimed
+    budget_s = BUDGETS_US[(stage, payload)] * BUDGET_SCALE / 1e6
+    median = benchmark.stats.stats.median
+    assert median <= budget_s, (
+        f"{stage}[{payload}] median {median * 1e6:.1f}us exceeds budget {budget_s * 1e6:.1f}us"
+    )
+
+
+def post_process(content: str, message: MessageInput) -> dict:
+    """The full CPU path for one analysis, from raw model output to the stored document."""
+    parsed = json.loads(clean_json_response(content))
+    analysis_data = transform_groq_response_to_server_format(parsed, message.text)
+    result = build_analysis_result(message, analysis_data, "Jordan")
+    document = result.model_dump()
+    return parse_json(document)
+
+
+@pytest.fixture(params=list(PAYLOADS))
+def payload(request):
+    return request.param
+
+
+def test_clean(benchmark, payload):
+    content = fenced(PAYLOADS[payload])
+    benchmark(clean_json_response, content)
+    check_budget(benchmark, "clean", payload)
+
+
+def test_json_loads(benchmark, payload):
+    content = json.dumps(PAYLOADS[payload])
+    benchmark(json.loads, content)
+    check_budget(benchmark, "json_loads", payload)
+
+
+def test_transform(benchmark, payload):
+    benchmark(transform_groq_response_to_server_format, PAYLOADS[payload], MESSAGE.text)
+    check_budget(benchmark, "transform", payload)
+
+
+def test_build_result(benchmark, payload):
+    analysis_data = transform_groq_response_to_server_format(PAYLOADS[payload], MESSAGE.text)
+    benchmark(build_analysis_result, MESSAGE, analysis_data, "Jordan")
+    check_budget(benchmark, "build_result", payload)
+
+
+def test_model_dump(benchmark, payload):
+    analysis_data = transform_groq_response_to_server_format(PAYLOADS[payload], MESSAGE.text)
+    result = build_analysis_result(MESSAGE, analysis_data, "Jordan")
+    benchmark(result.model_dump)
+    check_budget(benchmark, "model_dump", payload)
+
+
+def test_parse_json(benchmark, payload):
+    analysis_data = transform_groq_response_to_server_format(PAYLOADS[payload], MESSAGE.text)
+    document = build_analysis_result(MESSAGE, analysis_data, "Jordan").model_dump()
+    benchmark(parse_json, [document])
+    check_budget(benchmark, "parse_json", payload)
+
+
+def test_end_to_end(benchmark, payload):
+    content = fenced(PAYLOADS[payload])
+    result = benchmark(post_process, content, MESSAGE)
+    assert result["sentiment"] == "negative"
+    check_budget(benchmark, "end_to_end", payload)
@@ -0,0 +1,36 @@
+"""
+Cold-start budget: a freshly spawned worker must answer its first request within
+a second. Scale the budget with BENCH_BUDGET_SCALE on slower hardware.
+
+    pytest benchmarks/test_startup.py
+"""
+import os
+import sys
+import statistics
+import subprocess
+
+from benchmarks.startup import REPO_ROOT, time_to_first_request
+
+BUDGET_SCALE = float(os.environ.get("BENCH_BUDGET_SCALE", "1.0"))
+STARTUP_BUDGET_S = 1.0
+RUNS = 3
+
+
+def test_time_to_first_request():
+    median = statistics.median(time_to_first_request() for _ in range(RUNS))
+    budget = STARTUP_BUDGET_S * BUDGET_SCALE
+    assert median <= budget, f"median time to first request {median:.2f}s exceeds budget {budget:.2f}s"
+
+
+def test_heavy_sdks_not_imported_at_startup():
+    # Motor is imported by the lifespan hook and groq on the first analysis, not at import
+    check = (
+        "import sys, backend.server; "
+        "loaded = [m for m in ('motor', 'groq') if type(sys.modules.get(m)).__name__ == 'module']; "
+        "print(','.join(loaded))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", check], cwd=REPO_ROOT, env={**os.environ, "PYTHONPATH": REPO_ROOT},
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert output == ""
@@ -2,27 +2,54 @@
 set -e
 
 # Start the FastAPI backend
-cd /backend || { echo "Backend directory not found"; exit 1; }
+[ -d /backend ] || { echo "Backend directory not found"; exit 1; }
+
+# The app is imported as the `backend` package, so run from its parent directory
+cd /
 
 echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+# gunicorn with uvicorn workers, one per core unless WEB_CONCURRENCY is set
+gunicorn -c /backend/gunicorn.conf.py backend.server:app &
 BACKEND_PID=$!
 
-echo "Waiting for backend to start..."
-sleep 30
+# Data migrations run once per deploy, beside the backend (see backend/migrations.py).
+# They're batched to run under traffic, so readiness doesn't wait for them.
+echo "Running data migrations in the background"
+(
+    if python -m backend.migrations; then
+        echo "Data migrations finished"
+    else
+        echo "Data migrations failed (exit $?), see the traceback above; they resume on the next start" >&2
+    fi
+) &
+MIGRATIONS_PID=$!
 
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
-fi
+# Poll the readiness endpoint (it pings MongoDB) instead of sleeping a fixed time
+READY_URL="${READY_URL:-http://127.0.0.1:8001/api/ready}"
+READY_TIMEOUT="${READY_TIMEOUT:-120}"
+echo "Waiting for backend to become ready at $READY_URL..."
+waited=0
+until wget -q -T 2 -O /dev/null "$READY_URL" 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ "$waited" -ge "$((READY_TIMEOUT * 4))" ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s, exiting"
+        kill $BACKEND_PID
+        exit 1
+    fi
+    sleep 0.25
+    waited=$((waited + 1))
+done
+echo "Backend ready"
 
 # Start Nginx
 nginx -g 'daemon off;' &
 NGINX_PID=$!
 
 # Handle termination signals
-trap 'kill $BACKEND_PID $NGINX_PID; exit 0' SIGTERM SIGINT
+trap 'kill $BACKEND_PID $NGINX_PID $MIGRATIONS_PID 2>/dev/null; exit 0' SIGTERM SIGINT
 
 # Check if processes are still running
 while kill -0 $BACKEND_PID 2>/dev/null && kill -0 $NGINX_PID 2>/dev/null; do
@@ -1,4 +1,4 @@
-import React, { createContext, useState, useEffect, useContext } from 'react';
+import React, { createContext, useState, useEffect, useContext, useRef } from 'react';
 import axios from 'axios';
 
 // Create context
@@ -17,6 +17,8 @@ export const AppProvider = ({ children }) => {
   const [growthPlan, setGrowthPlan] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
+  // True while the server push channel is open; the dashboard then arrives as events
+  const pushConnected = useRef(false);
 
   // Fetch dashboard data
   const fetchDashboardData = async () => {
@@ -48,6 +50,16 @@ export const AppProvider = ({ children }) => {
     }
   };
 
+  // Fetch the relationship list
+  const fetchRelationships = async () => {
+    try {
+      const response = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/relationships`);
+      setRelationships(response.data || []);
+    } catch (err) {
+      console.error('Failed to fetch relationships:', err);
+    }
+  };
+
   // Analyze message
   const analyzeMessage = async (text, context = null, relationshipId = null) => {
     try {
@@ -61,10 +73,14 @@ export const AppProvider = ({ children }) => {
       });
       
       // Update local history
-      setAnalysisHistory(prev => [response.data, ...prev]);
+      setAnalysisHistory(prev =>
+        prev.some(item => item.id === response.data.id) ? prev : [response.data, ...prev]
+      );
       
-      // Refresh dashboard data to reflect the new analysis
-      fetchDashboardData();
+      // Refresh dashboard data to reflect the new analysis, unless the server pushes it
+      if (!pushConnected.current) {
+        fetchDashboardData();
+      }
       
       return response.data;
     } catch (err) {
@@ -147,13 +163,64 @@ export const AppProvider = ({ children }) => {
     });
   }, []);
 
-  // Refresh data periodically or on specific events
+  // Receive dashboard, history and relationship changes pushed by the server.
+  // Falls back to polling only when the browser has no EventSource.
   useEffect(() => {
-    const interval = setInterval(() => {
-      fetchDashboardData();
-    }, 300000); // Refresh every 5 minutes
-    
-    return () => clearInterval(interval);
+    if (typeof EventSource === 'undefined') {
+      const interval = setInterval(() => {
+        fetchDashboardData();
+      }, 300000); // Refresh every 5 minutes
+
+      return () => clearInterval(interval);
+    }
+
+    const source = new EventSource(`${process.env.REACT_APP_BACKEND_URL}/api/events`);
+
+    source.addEventListener('ready', () => {
+      pushConnected.current = true;
+    });
+
+    source.addEventListener('dashboard', (event) => {
+      setDashboardData(JSON.parse(event.data).dashboard);
+    });
+
+    source.addEventListener('analysis', (event) => {
+      const { analysis } = JSON.parse(event.data);
+      setAnalysisHistory(prev =>
+        prev.some(item => item.id === analysis.id) ? prev : [analysis, ...prev]
+      );
+    });
+
+    source.addEventListener('relationship', (event) => {
+      const { op, relationship } = JSON.parse(event.data);
+      setRelationships(prev => {
+        const others = prev.filter(item => item.id !== relationship.id);
+        if (op === 'delete') {
+          return others;
+        }
+        const existing = prev.find(item => item.id === relationship.id);
+        return existing
+          ? prev.map(item => (item.id === relationship.id ? { ...item, ...relationship } : item))
+          : [relationship, ...others];
+      });
+    });
+
+    source.addEventListener('resync', (event) => {
+      const { resource } = JSON.parse(event.data);
+      if (resource === 'analysis_results') {
+        fetchDashboardData();
+        fetchAnalysisHistory();
+      } else if (resource === 'relationships') {
+        fetchRelationships();
+      }
+    });
+
+    source.onerror = () => {
+      // EventSource reconnects by itself; the dashboard is fetched after actions meanwhile
+      pushConnected.current = false;
+    };
+
+    return () => source.close();
   }, []);
 
   // Value object to be provided to consumers
@@ -169,6 +236,7 @@ export const AppProvider = ({ children }) => {
     analyzeMessage,
     fetchDashboardData,
     fetchAnalysisHistory,
+    fetchRelationships,
     setRelationships
   };
 
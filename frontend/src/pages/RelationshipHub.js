@@ -43,7 +43,7 @@ const RelationshipHub = () => {
     }
   };
 
-  // Fetch relationship history when a relationship is selected
+  // Fetch the full relationship history when it is opened
   const fetchRelationshipHistory = async (relationshipId) => {
     if (!relationshipId) return;
     
@@ -173,10 +173,12 @@ const RelationshipHub = () => {
       
       setQuickMessage('');
       
-      // Refresh relationship history
-      await fetchRelationshipHistory(selectedRelationship.id);
+      // Refresh the full history if it's open
+      if (relationshipHistory) {
+        await fetchRelationshipHistory(selectedRelationship.id);
+      }
       
-      // Refresh relationships list to get updated health score, etc.
+      // Refresh relationships list to get updated health score, stats, etc.
       await fetchRelationships();
     } catch (err) {
       console.error('Quick analysis error:', err);
@@ -190,14 +192,16 @@ const RelationshipHub = () => {
     fetchRelationships();
   }, []);
   
-  // Load relationship history when a relationship is selected
+  // The summary comes from the list's stats; the full history is only fetched when opened
+  const selectedId = selectedRelationship ? selectedRelationship.id : null;
   useEffect(() => {
-    if (selectedRelationship) {
-      fetchRelationshipHistory(selectedRelationship.id);
-    } else {
-      setRelationshipHistory(null);
-    }
-  }, [selectedRelationship]);
+    setRelationshipHistory(null);
+  }, [selectedId]);
+  
+  // Read stats from the list, which is kept current as analyses arrive
+  const selectedStats = selectedRelationship
+    ? (relationships.find(rel => rel.id === selectedId) || selectedRelationship).stats
+    : null;
   
   // Colors for charts
   const COLORS = ['#8884d8', '#82ca9d', '#ffc658', '#ff8042', '#0088FE', '#00C49F'];
@@ -262,7 +266,11 @@ const RelationshipHub = () => {
                     <div className="flex justify-between items-center">
                       <div>
                         <h3 className="font-medium text-gray-800">{relationship.name}</h3>
-                        <p className="text-xs text-gray-500">{relationship.type}</p>
+                        <p className="text-xs text-gray-500">
+                          {relationship.type}
+                          {relationship.stats && relationship.stats.analysis_count > 0 &&
+                            ` · ${relationship.stats.analysis_count} analyses`}
+                        </p>
                       </div>
                       <div className={`w-10 h-10 rounded-full flex items-center justify-center font-medium text-white ${
                         relationship.health_score > 75 
@@ -492,234 +500,260 @@ const RelationshipHub = () => {
                 </div>
               </div>
               
+              {/* Summary Stats */}
+              <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-8">
+                <div className="bg-indigo-50 p-4 rounded-lg">
+                  <h3 className="text-sm font-medium text-gray-700 mb-1">Last Contact</h3>
+                  <p className="text-lg font-semibold text-indigo-700">
+                    {new Date(selectedRelationship.last_contact).toLocaleDateString()}
+                  </p>
+                </div>
+                <div className="bg-purple-50 p-4 rounded-lg">
+                  <h3 className="text-sm font-medium text-gray-700 mb-1">Current Sentiment</h3>
+                  <p className="text-lg font-semibold text-purple-700 capitalize">
+                    {selectedRelationship.sentiment}
+                  </p>
+                </div>
+                <div className="bg-blue-50 p-4 rounded-lg">
+                  <h3 className="text-sm font-medium text-gray-700 mb-1">Interactions Analyzed</h3>
+                  <p className="text-lg font-semibold text-blue-700">
+                    {selectedStats?.analysis_count || 0}
+                  </p>
+                </div>
+              </div>
+              
+              {/* Health sparkline and top flags, from the list's stats */}
+              {selectedStats && (selectedStats.health_trend.length > 1 || selectedStats.top_flags.length > 0) && (
+                <div className="mb-8">
+                  {selectedStats.health_trend.length > 1 && (
+                    <div className="h-16 mb-3">
+                      <ResponsiveContainer width="100%" height="100%">
+                        <LineChart data={selectedStats.health_trend.map((score, index) => ({ index, score }))}>
+                          <YAxis domain={[0, 100]} hide />
+                          <Line type="monotone" dataKey="score" stroke="#8884d8" dot={false} />
+                        </LineChart>
+                      </ResponsiveContainer>
+                    </div>
+                  )}
+                  {selectedStats.top_flags.length > 0 && (
+                    <div className="flex flex-wrap gap-2">
+                      {selectedStats.top_flags.map(flag => (
+                        <span key={flag.type} className="px-2 py-1 bg-red-100 text-red-800 text-xs rounded-full">
+                          {flag.type} · {flag.count}
+                        </span>
+                      ))}
+                    </div>
+                  )}
+                </div>
+              )}
+              
               {isLoadingHistory ? (
-                <div className="flex justify-center items-center py-8">
+                <div className="flex justify-center items-center py-8 mb-8">
                   <div className="animate-spin rounded-full h-8 w-8 border-t-2 border-b-2 border-indigo-500"></div>
                 </div>
-              ) : (
+              ) : relationshipHistory ? (
                 <>
-                  {/* Summary Stats */}
-                  <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-8">
-                    <div className="bg-indigo-50 p-4 rounded-lg">
-                      <h3 className="text-sm font-medium text-gray-700 mb-1">Last Contact</h3>
-                      <p className="text-lg font-semibold text-indigo-700">
-                        {new Date(selectedRelationship.last_contact).toLocaleDateString()}
-                      </p>
-                    </div>
-                    <div className="bg-purple-50 p-4 rounded-lg">
-                      <h3 className="text-sm font-medium text-gray-700 mb-1">Current Sentiment</h3>
-                      <p className="text-lg font-semibold text-purple-700 capitalize">
-                        {selectedRelationship.sentiment}
-                      </p>
-                    </div>
-                    <div className="bg-blue-50 p-4 rounded-lg">
-                      <h3 className="text-sm font-medium text-gray-700 mb-1">Interactions Analyzed</h3>
-                      <p className="text-lg font-semibold text-blue-700">
-                        {relationshipHistory?.analyses?.length || 0}
-                      </p>
+                  {/* Health Trend Chart */}
+                  {relationshipHistory.health_trend.length > 0 && (
+                    <div className="mb-8">
+                      <h3 className="text-lg font-semibold text-gray-800 mb-4">Relationship Health Trend</h3>
+                      <div className="h-64">
+                        <ResponsiveContainer width="100%" height="100%">
+                          <LineChart
+                            data={relationshipHistory.health_trend}
+                            margin={{ top: 5, right: 30, left: 20, bottom: 5 }}
+                          >
+                            <CartesianGrid strokeDasharray="3 3" />
+                            <XAxis dataKey="date" />
+                            <YAxis domain={[0, 100]} />
+                            <Tooltip />
+                            <Line 
+                              type="monotone" 
+                              dataKey="score" 
+                              stroke="#8884d8" 
+                              activeDot={{ r: 8 }}
+                            />
+                          </LineChart>
+                        </ResponsiveContainer>
+                      </div>
                     </div>
-                  </div>
+                  )}
                   
-                  {relationshipHistory ? (
-                    <>
-                      {/* Health Trend Chart */}
-                      {relationshipHistory.health_trend.length > 0 && (
-                        <div className="mb-8">
-                          <h3 className="text-lg font-semibold text-gray-800 mb-4">Relationship Health Trend</h3>
-                          <div className="h-64">
-                            <ResponsiveContainer width="100%" height="100%">
-                              <LineChart
-                                data={relationshipHistory.health_trend}
-                                margin={{ top: 5, right: 30, left: 20, bottom: 5 }}
+                  {/* Sentiment and Flag Distribution */}
+                  <div className="grid grid-cols-1 md:grid-cols-2 gap-8 mb-8">
+                    {/* Sentiment Distribution */}
+                    <div>
+                      <h3 className="text-lg font-semibold text-gray-800 mb-4">Sentiment Distribution</h3>
+                      {Object.values(relationshipHistory.sentiment_counts).some(count => count > 0) ? (
+                        <div className="h-64">
+                          <ResponsiveContainer width="100%" height="100%">
+                            <PieChart>
+                              <Pie
+                                data={Object.entries(relationshipHistory.sentiment_counts).map(([key, value]) => ({
+                                  name: key.charAt(0).toUpperCase() + key.slice(1),
+                                  value
+                                }))}
+                                cx="50%"
+                                cy="50%"
+                                labelLine={false}
+                                outerRadius={80}
+                                fill="#8884d8"
+                                dataKey="value"
                               >
-                                <CartesianGrid strokeDasharray="3 3" />
-                                <XAxis dataKey="date" />
-                                <YAxis domain={[0, 100]} />
-                                <Tooltip />
-                                <Line 
-                                  type="monotone" 
-                                  dataKey="score" 
-                                  stroke="#8884d8" 
-                                  activeDot={{ r: 8 }}
-                                />
-                              </LineChart>
-                            </ResponsiveContainer>
-                          </div>
+                                {Object.keys(relationshipHistory.sentiment_counts).map((entry, index) => (
+                                  <Cell key={`cell-${index}`} fill={getSentimentColor(entry)} />
+                                ))}
+                              </Pie>
+                              <Tooltip />
+                              <Legend />
+                            </PieChart>
+                          </ResponsiveContainer>
+                        </div>
+                      ) : (
+                        <div className="bg-gray-50 rounded-lg p-4 text-center text-gray-500">
+                          No sentiment data available yet
                         </div>
                       )}
-                      
-                      {/* Sentiment and Flag Distribution */}
-                      <div className="grid grid-cols-1 md:grid-cols-2 gap-8 mb-8">
-                        {/* Sentiment Distribution */}
-                        <div>
-                          <h3 className="text-lg font-semibold text-gray-800 mb-4">Sentiment Distribution</h3>
-                          {Object.values(relationshipHistory.sentiment_counts).some(count => count > 0) ? (
-                            <div className="h-64">
-                              <ResponsiveContainer width="100%" height="100%">
-                                <PieChart>
-                                  <Pie
-                                    data={Object.entries(relationshipHistory.sentiment_counts).map(([key, value]) => ({
-                                      name: key.charAt(0).toUpperCase() + key.slice(1),
-                                      value
-                                    }))}
-                                    cx="50%"
-                                    cy="50%"
-                                    labelLine={false}
-                                    outerRadius={80}
-                                    fill="#8884d8"
-                                    dataKey="value"
-                                  >
-                                    {Object.keys(relationshipHistory.sentiment_counts).map((entry, index) => (
-                                      <Cell key={`cell-${index}`} fill={getSentimentColor(entry)} />
-                                    ))}
-                                  </Pie>
-                                  <Tooltip />
-                                  <Legend />
-                                </PieChart>
-                              </ResponsiveContainer>
-                            </div>
-                          ) : (
-                            <div className="bg-gray-50 rounded-lg p-4 text-center text-gray-500">
-                              No sentiment data available yet
-                            </div>
-                          )}
+                    </div>
+                    
+                    {/* Flag Distribution */}
+                    <div>
+                      <h3 className="text-lg font-semibold text-gray-800 mb-4">Flag Distribution</h3>
+                      {Object.keys(relationshipHistory.flag_types).length > 0 ? (
+                        <div className="h-64">
+                          <ResponsiveContainer width="100%" height="100%">
+                            <BarChart
+                              data={Object.entries(relationshipHistory.flag_types).map(([key, value]) => ({
+                                name: key,
+                                count: value
+                              }))}
+                              margin={{ top: 5, right: 30, left: 20, bottom: 50 }}
+                            >
+                              <CartesianGrid strokeDasharray="3 3" />
+                              <XAxis 
+                                dataKey="name" 
+                                angle={-45} 
+                                textAnchor="end"
+                                height={60}
+                                tick={{ fontSize: 12 }}
+                              />
+                              <YAxis />
+                              <Tooltip />
+                              <Bar dataKey="count" fill="#f87171" />
+                            </BarChart>
+                          </ResponsiveContainer>
                         </div>
-                        
-                        {/* Flag Distribution */}
-                        <div>
-                          <h3 className="text-lg font-semibold text-gray-800 mb-4">Flag Distribution</h3>
-                          {Object.keys(relationshipHistory.flag_types).length > 0 ? (
-                            <div className="h-64">
-                              <ResponsiveContainer width="100%" height="100%">
-                                <BarChart
-                                  data={Object.entries(relationshipHistory.flag_types).map(([key, value]) => ({
-                                    name: key,
-                                    count: value
-                                  }))}
-                                  margin={{ top: 5, right: 30, left: 20, bottom: 50 }}
-                                >
-                                  <CartesianGrid strokeDasharray="3 3" />
-                                  <XAxis 
-                                    dataKey="name" 
-                                    angle={-45} 
-                                    textAnchor="end"
-                                    height={60}
-                                    tick={{ fontSize: 12 }}
-                                  />
-                                  <YAxis />
-                                  <Tooltip />
-                                  <Bar dataKey="count" fill="#f87171" />
-                                </BarChart>
-                              </ResponsiveContainer>
-                            </div>
-                          ) : (
-                            <div className="bg-gray-50 rounded-lg p-4 text-center text-gray-500">
-                              No flag data available yet
-                            </div>
-                          )}
+                      ) : (
+                        <div className="bg-gray-50 rounded-lg p-4 text-center text-gray-500">
+                          No flag data available yet
                         </div>
-                      </div>
-                      
-                      {/* Analysis History */}
-                      <div className="mb-8">
-                        <h3 className="text-lg font-semibold text-gray-800 mb-4">Recent Analyses</h3>
-                        {relationshipHistory.analyses.length > 0 ? (
-                          <div className="space-y-4 max-h-[400px] overflow-y-auto pr-2">
-                            {relationshipHistory.analyses.slice(0, 5).map((analysis, index) => (
-                              <div key={index} className="bg-gray-50 p-4 rounded-lg">
-                                <div className="flex justify-between items-start mb-2">
-                                  <span className="text-sm text-gray-500">
-                                    {new Date(analysis.created_at).toLocaleString()}
-                                  </span>
-                                  <span className={`px-2 py-1 text-xs font-medium rounded-full ${
-                                    analysis.sentiment === 'positive' ? 'bg-green-100 text-green-800' :
-                                    analysis.sentiment === 'neutral' ? 'bg-blue-100 text-blue-800' :
-                                    'bg-red-100 text-red-800'
-                                  }`}>
-                                    {analysis.sentiment.charAt(0).toUpperCase() + analysis.sentiment.slice(1)}
-                                  </span>
-                                </div>
-                                <p className="text-gray-800 mb-3">{analysis.text}</p>
-                                {analysis.flags && analysis.flags.length > 0 ? (
-                                  <div className="flex flex-wrap gap-2">
-                                    {analysis.flags.map((flag, fidx) => (
-                                      <span key={fidx} className="px-2 py-1 bg-red-100 text-red-800 text-xs rounded-full">
-                                        {flag.type}
-                                      </span>
-                                    ))}
-                                  </div>
-                                ) : (
-                                  <span className="px-2 py-1 bg-green-100 text-green-800 text-xs rounded-full">
-                                    No flags detected
+                      )}
+                    </div>
+                  </div>
+                  
+                  {/* Analysis History */}
+                  <div className="mb-8">
+                    <h3 className="text-lg font-semibold text-gray-800 mb-4">Recent Analyses</h3>
+                    {relationshipHistory.analyses.length > 0 ? (
+                      <div className="space-y-4 max-h-[400px] overflow-y-auto pr-2">
+                        {relationshipHistory.analyses.slice(0, 5).map((analysis, index) => (
+                          <div key={index} className="bg-gray-50 p-4 rounded-lg">
+                            <div className="flex justify-between items-start mb-2">
+                              <span className="text-sm text-gray-500">
+                                {new Date(analysis.created_at).toLocaleString()}
+                              </span>
+                              <span className={`px-2 py-1 text-xs font-medium rounded-full ${
+                                analysis.sentiment === 'positive' ? 'bg-green-100 text-green-800' :
+                                analysis.sentiment === 'neutral' ? 'bg-blue-100 text-blue-800' :
+                                'bg-red-100 text-red-800'
+                              }`}>
+                                {analysis.sentiment.charAt(0).toUpperCase() + analysis.sentiment.slice(1)}
+                              </span>
+                            </div>
+                            <p className="text-gray-800 mb-3">{analysis.text}</p>
+                            {analysis.flags && analysis.flags.length > 0 ? (
+                              <div className="flex flex-wrap gap-2">
+                                {analysis.flags.map((flag, fidx) => (
+                                  <span key={fidx} className="px-2 py-1 bg-red-100 text-red-800 text-xs rounded-full">
+                                    {flag.type}
                                   </span>
-                                )}
+                                ))}
                               </div>
-                            ))}
-                          </div>
-                        ) : (
-                          <div className="bg-gray-50 p-4 rounded-lg text-center">
-                            <p className="text-gray-600">No analysis history yet</p>
+                            ) : (
+                              <span className="px-2 py-1 bg-green-100 text-green-800 text-xs rounded-full">
+                                No flags detected
+                              </span>
+                            )}
                           </div>
-                        )}
-                      </div>
-                    </>
-                  ) : (
-                    <div className="mb-8 bg-gray-50 p-6 rounded-lg text-center">
-                      <p className="text-gray-600">No history data available for this relationship yet</p>
-                    </div>
-                  )}
-                  
-                  {/* Faith-Based Insight */}
-                  {faithModeEnabled && (
-                    <div className="mb-8">
-                      <h3 className="text-lg font-semibold text-gray-800 mb-4">Faith-Based Insight</h3>
-                      <div className="bg-indigo-50 p-4 rounded-lg border border-indigo-100">
-                        <p className="text-gray-700">
-                          {getFaithContent('reframe', { theme: 'relationship' }) || 
-                           "Your faith tradition offers wisdom about relationships and how to nurture them with compassion and understanding."}
-                        </p>
+                        ))}
                       </div>
-                    </div>
-                  )}
-                  
-                  {/* Quick Analysis Form */}
-                  <div>
-                    <h3 className="text-lg font-semibold text-gray-800 mb-4">Quick Message Analysis</h3>
-                    <form onSubmit={handleQuickAnalysis}>
-                      <div className="mb-4">
-                        <textarea
-                          rows="4"
-                          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-indigo-500"
-                          placeholder={`Paste a message from ${selectedRelationship.name} to analyze...`}
-                          value={quickMessage}
-                          onChange={(e) => setQuickMessage(e.target.value)}
-                          required
-                          disabled={isAnalyzing}
-                        ></textarea>
+                    ) : (
+                      <div className="bg-gray-50 p-4 rounded-lg text-center">
+                        <p className="text-gray-600">No analysis history yet</p>
                       </div>
-                      <button
-                        type="submit"
-                        disabled={isAnalyzing || !quickMessage.trim()}
-                        className={`w-full py-3 px-4 rounded-md font-medium text-white transition-colors ${
-                          isAnalyzing || !quickMessage.trim()
-                            ? 'bg-indigo-400 cursor-not-allowed'
-                            : 'bg-indigo-600 hover:bg-indigo-700'
-                        }`}
-                      >
-                        {isAnalyzing ? (
-                          <span className="flex items-center justify-center">
-                            <svg className="animate-spin -ml-1 mr-2 h-4 w-4 text-white" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
-                              <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"></circle>
-                              <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path>
-                            </svg>
-                            Analyzing...
-                          </span>
-                        ) : 'Analyze Message'}
-                      </button>
-                    </form>
+                    )}
                   </div>
                 </>
+              ) : (
+                <div className="mb-8 text-center">
+                  <button
+                    onClick={() => fetchRelationshipHistory(selectedRelationship.id)}
+                    className="text-sm bg-gray-100 hover:bg-gray-200 text-gray-700 px-4 py-2 rounded-md transition-colors"
+                  >
+                    View full history
+                  </button>
+                </div>
+              )}
+              
+              {/* Faith-Based Insight */}
+              {faithModeEnabled && (
+                <div className="mb-8">
+                  <h3 className="text-lg font-semibold text-gray-800 mb-4">Faith-Based Insight</h3>
+                  <div className="bg-indigo-50 p-4 rounded-lg border border-indigo-100">
+                    <p className="text-gray-700">
+                      {getFaithContent('reframe', { theme: 'relationship' }) || 
+                       "Your faith tradition offers wisdom about relationships and how to nurture them with compassion and understanding."}
+                    </p>
+                  </div>
+                </div>
               )}
+              
+              {/* Quick Analysis Form */}
+              <div>
+                <h3 className="text-lg font-semibold text-gray-800 mb-4">Quick Message Analysis</h3>
+                <form onSubmit={handleQuickAnalysis}>
+                  <div className="mb-4">
+                    <textarea
+                      rows="4"
+                      className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-indigo-500"
+                      placeholder={`Paste a message from ${selectedRelationship.name} to analyze...`}
+                      value={quickMessage}
+                      onChange={(e) => setQuickMessage(e.target.value)}
+                      required
+                      disabled={isAnalyzing}
+                    ></textarea>
+                  </div>
+                  <button
+                    type="submit"
+                    disabled={isAnalyzing || !quickMessage.trim()}
+                    className={`w-full py-3 px-4 rounded-md font-medium text-white transition-colors ${
+                      isAnalyzing || !quickMessage.trim()
+                        ? 'bg-indigo-400 cursor-not-allowed'
+                        : 'bg-indigo-600 hover:bg-indigo-700'
+                    }`}
+                  >
+                    {isAnalyzing ? (
+                      <span className="flex items-center justify-center">
+                        <svg className="animate-spin -ml-1 mr-2 h-4 w-4 text-white" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
+                          <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"></circle>
+                          <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path>
+                        </svg>
+                        Analyzing...
+                      </span>
+                    ) : 'Analyze Message'}
+                  </button>
+                </form>
+              </div>
             </div>
           ) : (
             <div className="bg-white rounded-xl shadow-md p-8 h-full flex flex-col items-center justify-center text-center">
@@ -0,0 +1,17 @@
+import pytest
+
+from tests.fake_groq import FakeGroqServer
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    """
+    A running FakeGroqServer that the Groq client is pointed at via GROQ_BASE_URL.
+
+    Set `fake_groq.script` to the behaviors the next requests should get. Errors
+    skip the SDK's own retries and advertise a 1ms retry-after, so tests stay fast.
+    """
+    with FakeGroqServer(retry_after=0.001, sdk_retries=False, seed=0) as server:
+        monkeypatch.setenv("GROQ_BASE_URL", server.base_url)
+        monkeypatch.setenv("GROQ_API_KEY", "fake-key")
+        yield server
@@ -0,0 +1,354 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Serves POST /openai/v1/chat/completions with canned emotional-intelligence
+analyses, so the backend can be exercised without network access or an API key.
+Latency follows a configurable distribution, and faults can be injected either
+from a fixed script (deterministic, for tests) or at random rates (for load
+tests). Point `groq.Groq` / `groq.AsyncGroq` at it with `base_url=server.base_url`,
+or set GROQ_BASE_URL.
+
+Behaviors:
+    ok              valid JSON analysis
+    fenced          valid JSON inside a ```json markdown fence
+    prose           valid JSON surrounded by explanatory text
+    missing_fields  valid JSON lacking required analysis fields
+    malformed       JSON with a syntax error
+    truncated       JSON cut off mid-object, finish_reason "length"
+    rate_limit      429 with retry-after / retry-after-ms headers
+    server_error    503 (random ones start a burst of `server_error_burst`)
+    bad_request     400
+    reset           connection closed with a TCP reset, no response
+
+    python -m tests.fake_groq --port 8765 --latency-dist lognormal --latency-ms 400 \\
+        --rate-limit-rate 0.05 --server-error-rate 0.02 --server-error-burst 5
+    python -m tests.fake_groq --script rate_limit,ok,fenced
+"""
+import re
+import json
+import math
+import time
+import uuid
+import random
+import socket
+import struct
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+CHAT_COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+BEHAVIORS = (
+    "ok", "fenced", "prose", "missing_fields", "malformed", "truncated",
+    "rate_limit", "server_error", "bad_request", "reset",
+)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+CANNED_ANALYSIS = {
+    "sentiment": "negative",
+    "emotional_tone": "Frustrated and hurt, with an undertone of wanting to be understood",
+    "communication_style": "Direct but accusatory, leaning on generalizations",
+    "potential_triggers": ["never listen", "always", "important"],
+    "suggestions": [
+        "Use 'I' statements to describe how you feel",
+        "Name one specific moment instead of generalizing",
+        "Ask for what you need going forward",
+    ],
+    "confidence_score": 0.86,
+    "emotional_flags": ["frustration", "generalization"],
+    "relationship_insights": "Repeated generalizations can make the other person defensive",
+    "emotional_maturity_level": "Moderate: feelings are named but blame is externalized",
+}
+
+_PACKED_COUNT = re.compile(r"Analyze each of the following (\d+) messages")
+_SUMMARY_PROMPT = "Update the running summary of a conversation"
+
+CANNED_SUMMARY = "They keep returning to feeling unheard; one apologized and promised to call more often."
+
+
+def completion_body(content: str, model: str, prompt_chars: int, finish_reason: str = "stop") -> dict:
+    """An OpenAI-compatible chat.completion object wrapping `content`."""
+    prompt_tokens = max(1, prompt_chars // 4)
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def analysis_content(prompt: str, behavior: str = "ok") -> str:
+    """Model output for `behavior`: one analysis, a `results` list for packed prompts, or a summary."""
+    match = _PACKED_COUNT.search(prompt)
+    if _SUMMARY_PROMPT in prompt:
+        body = json.dumps({"summary": CANNED_SUMMARY})
+    elif match:
+        body = json.dumps({"results": [CANNED_ANALYSIS] * int(match.group(1))})
+    elif behavior == "missing_fields":
+        body = json.dumps({"sentiment": CANNED_ANALYSIS["sentiment"]})
+    else:
+        body = json.dumps(CANNED_ANALYSIS)
+
+    if behavior == "fenced":
+        return f"```json\n{body}\n```"
+    if behavior == "prose":
+        return f"Here is the analysis you asked for:\n{body}\nLet me know if you need more detail."
+    if behavior == "malformed":
+        return body.replace('":', '"', 1)
+    if behavior == "truncated":
+        return body[: len(body) // 2]
+    return body
+
+
+class LatencyModel:
+    """
+    Samples response delays in seconds.
+
+    `mean_ms` is the mean (median for lognormal). `jitter_ms` is the half-width for
+    uniform and the standard deviation for normal; `sigma` shapes the lognormal tail.
+    """
+
+    def __init__(self, distribution: str = "fixed", mean_ms: float = 0.0, jitter_ms: float = 0.0,
+                 sigma: float = 0.5, rng: Optional[random.Random] = None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.sigma = sigma
+        self.rng = rng or random.Random()
+
+    def sample(self) -> float:
+        if self.mean_ms <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            ms = self.rng.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+        elif self.distribution == "normal":
+            ms = self.rng.gauss(self.mean_ms, self.jitter_ms)
+        elif self.distribution == "lognormal":
+            ms = self.rng.lognormvariate(math.log(self.mean_ms), self.sigma)
+        elif self.distribution == "exponential":
+            ms = self.rng.expovariate(1.0 / self.mean_ms)
+        else:
+            ms = self.mean_ms
+        return max(0.0, ms) / 1000.0
+
+
+class FakeGroqServer:
+    """
+    Threaded HTTP server answering chat completions.
+
+    Each request's behavior comes from `script` while it lasts (one entry per
+    request, in order), then from the random fault rates, and otherwise "ok".
+    With `sdk_retries=False`, error responses carry `x-should-retry: false` so the
+    Groq SDK's own retries don't consume script entries.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 latency_model: Optional[LatencyModel] = None, script: Optional[List[str]] = None,
+                 rate_limit_rate: float = 0.0, server_error_rate: float = 0.0, server_error_burst: int = 1,
+                 reset_rate: float = 0.0, malformed_rate: float = 0.0, fenced_rate: float = 0.0,
+                 truncated_rate: float = 0.0, retry_after: float = 1.0, sdk_retries: bool = True,
+                 seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.latency_model = latency_model or LatencyModel("fixed", latency * 1000.0, rng=self.rng)
+        for behavior in script or []:
+            if behavior not in BEHAVIORS:
+                raise ValueError(f"Unknown behavior '{behavior}'")
+        self.script = list(script or [])
+        self.rates = [
+            ("rate_limit", rate_limit_rate),
+            ("server_error", server_error_rate),
+            ("reset", reset_rate),
+            ("malformed", malformed_rate),
+            ("fenced", fenced_rate),
+            ("truncated", truncated_rate),
+        ]
+        self.server_error_burst = max(1, server_error_burst)
+        self.retry_after = retry_after
+        self.sdk_retries = sdk_retries
+        self.served: List[str] = []
+        self._burst_remaining = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests_served(self) -> int:
+        return len(self.served)
+
+    def start(self) -> "FakeGroqServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread = None
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def next_behavior(self) -> str:
+        with self._lock:
+            if self.script:
+                behavior = self.script.pop(0)
+            elif self._burst_remaining > 0:
+                self._burst_remaining -= 1
+                behavior = "server_error"
+            else:
+                behavior = "ok"
+                draw = self.rng.random()
+                for name, rate in self.rates:
+                    if draw < rate:
+                        behavior = name
+                        break
+                    draw -= rate
+                if behavior == "server_error":
+                    self._burst_remaining = self.server_error_burst - 1
+            self.served.append(behavior)
+            return behavior
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: Optional[dict] = None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_error(self, status: int, error_type: str, message: str, headers: Optional[dict] = None):
+                headers = dict(headers or {})
+                if not server.sdk_retries:
+                    headers["x-should-retry"] = "false"
+                self._send_json(status, {"error": {"message": message, "type": error_type}}, headers)
+
+            def _reset(self):
+                # SO_LINGER with a zero timeout makes close() send RST instead of FIN
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                self.connection.close()
+                self.close_connection = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != CHAT_COMPLETIONS_PATH:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                behavior = server.next_behavior()
+                delay = server.latency_model.sample()
+                if delay:
+                    time.sleep(delay)
+
+                if behavior == "reset":
+                    self._reset()
+                elif behavior == "rate_limit":
+                    self._send_error(429, "rate_limit_exceeded", "Rate limit reached, please retry", {
+                        "retry-after": str(max(1, math.ceil(server.retry_after))),
+                        "retry-after-ms": str(int(server.retry_after * 1000)),
+                    })
+                elif behavior == "server_error":
+                    self._send_error(503, "service_unavailable", "Service temporarily unavailable", {
+                        "retry-after-ms": str(int(server.retry_after * 1000)),
+                    })
+                elif behavior == "bad_request":
+                    self._send_error(400, "invalid_request_error", "Invalid request")
+                else:
+                    prompt = "\n".join(m.get("content") or "" for m in request.get("messages", []))
+                    finish_reason = "length" if behavior == "truncated" else "stop"
+                    self._send_json(200, completion_body(
+                        analysis_content(prompt, behavior), request.get("model", "fake-model"),
+                        len(prompt), finish_reason
+                    ))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Groq API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean (median for lognormal)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--script", default="", help="comma-separated behaviors for the first requests")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-burst", type=int, default=1)
+    parser.add_argument("--reset-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--fenced-rate", type=float, default=0.0)
+    parser.add_argument("--truncated-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds advertised on 429/503")
+    parser.add_argument("--no-sdk-retries", action="store_true", help="send x-should-retry: false on errors")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    server = FakeGroqServer(
+        args.host, args.port,
+        latency_model=LatencyModel(args.latency_dist, args.latency_ms, args.latency_jitter_ms,
+                                   args.latency_sigma, rng=rng),
+        script=[b.strip() for b in args.script.split(",") if b.strip()],
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        server_error_burst=args.server_error_burst,
+        reset_rate=args.reset_rate,
+        malformed_rate=args.malformed_rate,
+        fenced_rate=args.fenced_rate,
+        truncated_rate=args.truncated_rate,
+        retry_after=args.retry_after,
+        sdk_retries=not args.no_sdk_retries,
+        seed=args.seed,
+    )
+    print(f"Fake Groq listening on {server.base_url} (set GROQ_BASE_URL to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import patch
+
+from backend.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_get_returns_cached_value(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", {"x": 1})
+        self.assertEqual(cache.get("a"), {"x": 1})
+        self.assertIsNone(cache.get("missing"))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(len(cache), 2)
+
+    @patch('backend.cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get("a"))
+
+    def test_invalidate(self):
+        cache = TTLCache()
+        cache.set(None, "anonymous plan")
+        cache.invalidate(None)
+        self.assertIsNone(cache.get(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
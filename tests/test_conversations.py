@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.conversations import ConversationMemory, render_history
+
+
+def conversation(turns, summary="", summarized_through=0):
+    return {
+        "_id": "c1",
+        "relationship_id": "r1",
+        "summary": summary,
+        "summarized_through": summarized_through,
+        "recent": [{"seq": seq, "text": f"turn {seq}"} for seq in turns],
+    }
+
+
+class TestRenderHistory(unittest.TestCase):
+
+    def test_summary_and_latest_turns(self):
+        history = render_history(conversation([3, 4, 5], summary="They argued about chores."), max_turns=2)
+        self.assertEqual(history, "Summary of the conversation so far: They argued about chores.\n\n"
+                                  "Most recent messages:\nturn 4\nturn 5")
+
+    def test_new_conversation_has_no_history(self):
+        self.assertIsNone(render_history(None, max_turns=4))
+        self.assertIsNone(render_history(conversation([]), max_turns=4))
+
+
+class TestFold(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = MagicMock()
+        self.collection.update_one = AsyncMock()
+        self.memory = ConversationMemory(self.collection, recent_turns=2)
+
+    @patch('backend.conversations.summarize_conversation_with_groq')
+    def test_folds_only_turns_beyond_the_window(self, mock_summarize):
+        mock_summarize.return_value = "new summary"
+        asyncio.run(self.memory.fold(conversation([3, 4, 5, 6], summary="old", summarized_through=2)))
+
+        mock_summarize.assert_called_once_with("old", ["turn 3", "turn 4"], self.memory.summary_words)
+        match, update = self.collection.update_one.call_args.args
+        self.assertEqual(match, {"_id": "c1", "summarized_through": 2})
+        self.assertEqual(update["$set"], {"summary": "new summary", "summarized_through": 4})
+        self.assertEqual(update["$pull"], {"recent": {"seq": {"$lte": 4}}})
+
+    @patch('backend.conversations.summarize_conversation_with_groq')
+    def test_short_conversations_are_not_summarized(self, mock_summarize):
+        asyncio.run(self.memory.fold(conversation([1, 2, 3])))
+        mock_summarize.assert_not_called()
+
+    @patch('backend.conversations.summarize_conversation_with_groq')
+    def test_failed_fold_keeps_turns(self, mock_summarize):
+        mock_summarize.side_effect = RuntimeError("groq down")
+        asyncio.run(self.memory.fold(conversation([1, 2, 3, 4])))
+        self.collection.update_one.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.events import EventBus, ChangeFeed, format_sse
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_publish_fans_out(self):
+        bus = EventBus()
+        first, second = bus.subscribe(), bus.subscribe()
+        bus.publish({"type": "dashboard"})
+        self.assertEqual(drain(first), [{"type": "dashboard"}])
+        self.assertEqual(drain(second), [{"type": "dashboard"}])
+        bus.unsubscribe(first)
+        self.assertEqual(len(bus.subscribers), 1)
+
+    def test_slow_subscriber_gets_resync(self):
+        bus = EventBus(queue_size=2)
+        queue = bus.subscribe()
+        for _ in range(3):
+            bus.publish({"type": "analysis"})
+        self.assertEqual([e["type"] for e in drain(queue)], ["resync", "resync"])
+
+    def test_user_scoped_events_reach_only_that_user(self):
+        bus = EventBus()
+        alice, bob = bus.subscribe("alice"), bus.subscribe("bob")
+        bus.publish({"type": "dashboard", "user_id": "alice"})
+        bus.publish({"type": "ready"})
+        self.assertEqual(drain(alice), [{"type": "dashboard", "user_id": "alice"}, {"type": "ready"}])
+        self.assertEqual(drain(bob), [{"type": "ready"}])
+
+    def test_format_sse(self):
+        self.assertEqual(format_sse({"type": "ready"}), 'event: ready\ndata: {"type": "ready"}\n\n')
+
+
+class TestChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = EventBus()
+        self.dashboard = AsyncMock(return_value={"health_score": 80})
+        self.feed = ChangeFeed(MagicMock(), self.bus, self.dashboard)
+
+    @patch('backend.events.DASHBOARD_DEBOUNCE', 0)
+    def test_local_writes_publish_events_and_one_dashboard(self):
+        async def run():
+            queue = self.bus.subscribe()
+            self.feed.notify("analysis_results", "insert", {"id": "a1"})
+            self.feed.notify("analysis_results", "insert", {"id": "a2"})
+            await self.feed._dashboard_task
+            return drain(queue)
+
+        events = asyncio.run(run())
+        self.assertEqual([e["type"] for e in events], ["analysis", "analysis", "dashboard"])
+        self.dashboard.assert_awaited_once_with(None)
+
+    @patch('backend.events.DASHBOARD_DEBOUNCE', 0)
+    def test_dashboard_only_recomputed_for_listening_writer(self):
+        async def run():
+            queue = self.bus.subscribe("alice")
+            self.feed.notify("analysis_results", "insert", {"id": "a1", "user_id": "bob"})
+            self.feed.notify("analysis_results", "insert", {"id": "a2", "user_id": "alice"})
+            await self.feed._dashboard_task
+            return drain(queue)
+
+        events = asyncio.run(run())
+        self.assertEqual([e["type"] for e in events], ["analysis", "dashboard"])
+        self.assertEqual(events[1]["user_id"], "alice")
+        self.dashboard.assert_awaited_once_with("alice")
+
+    def test_version_change_keys_carry_the_user(self):
+        alice, anonymous = self.bus.subscribe("alice"), self.bus.subscribe()
+        self.feed.on_version_change("relationships:alice")
+        self.assertEqual(drain(alice), [{"type": "resync", "resource": "relationships", "user_id": "alice"}])
+        self.assertEqual(drain(anonymous), [])
+
+    def test_nothing_published_without_listeners(self):
+        async def run():
+            self.feed.notify("analysis_results", "insert", {"id": "a1"})
+            return self.feed._dashboard_task
+
+        self.assertIsNone(asyncio.run(run()))
+        self.dashboard.assert_not_awaited()
+
+    def test_change_stream_mode_ignores_local_notifications(self):
+        queue = self.bus.subscribe()
+        self.feed.mode = "change_stream"
+        self.feed.notify("relationships", "upsert", {"id": "r1"})
+        self.feed.on_version_change("relationships")
+        self.assertEqual(drain(queue), [])
+
+    def test_change_documents_map_to_events(self):
+        queue = self.bus.subscribe()
+        self.feed._handle_change({
+            "ns": {"coll": "relationships"}, "operationType": "update",
+            "fullDocument": {
+                "_id": "oid", "id": "r1", "user_id": None, "name": "Sam", "sentiment": "neutral",
+                "flag_history": [{"flags": ["Blame"]}], "health": {"score": 70.0, "samples": 1},
+                "stats": {"analysis_count": 1, "flag_counts": {"Blame": 1}, "health_trend": [70]},
+            },
+        })
+        self.feed._handle_change({"ns": {"coll": "relationships"}, "operationType": "delete"})
+        events = drain(queue)
+        self.assertEqual(events[0], {
+            "type": "relationship", "op": "upsert", "user_id": None,
+            "relationship": {
+                "id": "r1", "user_id": None, "name": "Sam", "sentiment": "neutral",
+                "stats": {"analysis_count": 1, "last_sentiment": "neutral",
+                          "top_flags": [{"type": "Blame", "count": 1}], "health_trend": [70]},
+            },
+        })
+        self.assertEqual(events[1], {"type": "resync", "resource": "relationships"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import csv
+import gzip
+import json
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from backend.export import CSV_COLUMNS, export_query, parse_date_filter, stream_export
+
+
+class AsyncCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+
+def analysis(i):
+    return {
+        "id": str(i),
+        "text": f"message {i}",
+        "sentiment": "neutral",
+        "created_at": f"2026-10-0{i + 1}T12:00:00",
+        "flags": [{"type": "emotional_concern", "description": "tense"}],
+        "suggestions": ["breathe", "ask"],
+    }
+
+
+def collect(cursor, *args):
+    async def run():
+        return [chunk async for chunk in stream_export(cursor, *args)]
+    return asyncio.run(run())
+
+
+class TestExport(unittest.TestCase):
+
+    def test_export_query(self):
+        query = export_query(datetime(2026, 10, 1), datetime(2026, 10, 8), "r1", "u1")
+        self.assertEqual(query, {
+            "user_id": "u1",
+            "relationship_id": "r1",
+            "created_at": {"$gte": datetime(2026, 10, 1), "$lt": datetime(2026, 10, 8)},
+        })
+        self.assertEqual(export_query(), {"user_id": None})
+
+    def test_parse_date_filter_rejects_garbage(self):
+        self.assertIsNone(parse_date_filter(None, "since"))
+        with self.assertRaises(ValueError):
+            parse_date_filter("last week", "since")
+
+    def test_ndjson(self):
+        chunks = collect(AsyncCursor([analysis(0), analysis(1)]), "ndjson")
+        lines = b"".join(chunks).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], ["0", "1"])
+
+    def test_csv_flattens_lists(self):
+        chunks = collect(AsyncCursor([analysis(0)]), "csv")
+        rows = list(csv.reader(b"".join(chunks).decode().splitlines()))
+        self.assertEqual(rows[0], CSV_COLUMNS)
+        record = dict(zip(CSV_COLUMNS, rows[1]))
+        self.assertEqual(record["flags"], "emotional_concern: tense")
+        self.assertEqual(record["suggestions"], "breathe; ask")
+
+    @patch('backend.export.EXPORT_CHUNK_BYTES', 100)
+    def test_gzip_streams_in_chunks(self):
+        chunks = collect(AsyncCursor([analysis(i) for i in range(5)]), "ndjson", True)
+        self.assertGreater(len(chunks), 1)
+        lines = gzip.decompress(b"".join(chunks)).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
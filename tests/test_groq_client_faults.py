@@ -0,0 +1,120 @@
+import os
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import groq
+from fastapi import HTTPException
+
+from backend.external_integrations.groq_client import analyze_text_with_groq
+from tests.fake_groq import FakeGroqServer, LatencyModel
+
+
+class TestAnalyzeAgainstFakeGroq(unittest.TestCase):
+    """Drives analyze_text_with_groq's branches through real HTTP against the fake server."""
+
+    def setUp(self):
+        self.server = FakeGroqServer(retry_after=0.001, sdk_retries=False, seed=0).start()
+        self.env = patch.dict(os.environ, {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": self.server.base_url})
+        self.env.start()
+        # Skip the client's own backoff sleeps between attempts
+        self.sleep = patch('backend.external_integrations.groq_client.time.sleep')
+        self.sleep.start()
+
+    def tearDown(self):
+        self.sleep.stop()
+        self.env.stop()
+        self.server.stop()
+
+    def analyze(self, *script):
+        self.server.script = list(script)
+        return analyze_text_with_groq("You never listen to me.")
+
+    def test_valid_response(self):
+        result = self.analyze("ok")
+        self.assertEqual(result["sentiment"], "negative")
+        self.assertEqual(self.server.served, ["ok"])
+
+    def test_fenced_response_is_cleaned(self):
+        result = self.analyze("fenced")
+        self.assertEqual(result["sentiment"], "negative")
+        self.assertEqual(self.server.served, ["fenced"])
+
+    def test_json_wrapped_in_prose_is_extracted(self):
+        result = self.analyze("prose")
+        self.assertIn("interpretation", result)
+        self.assertEqual(self.server.served, ["prose"])
+
+    def test_truncated_response_is_retried(self):
+        result = self.analyze("truncated", "ok")
+        self.assertEqual(result["sentiment"], "negative")
+        self.assertEqual(self.server.served, ["truncated", "ok"])
+
+    def test_persistently_malformed_response_falls_back(self):
+        result = self.analyze("malformed", "malformed", "malformed")
+        self.assertIn("analysis_failed", result["emotional_flags"])
+        self.assertEqual(len(self.server.served), 3)
+
+    def test_rate_limit_is_surfaced_as_429(self):
+        with self.assertRaises(HTTPException) as context:
+            self.analyze("rate_limit")
+        self.assertEqual(context.exception.status_code, 429)
+
+    def test_server_error_burst_is_retried(self):
+        result = self.analyze("server_error", "server_error", "ok")
+        self.assertEqual(result["sentiment"], "negative")
+
+    def test_persistent_server_errors_give_503(self):
+        with self.assertRaises(HTTPException) as context:
+            self.analyze("server_error", "server_error", "server_error")
+        self.assertEqual(context.exception.status_code, 503)
+
+    def test_bad_request_gives_400(self):
+        with self.assertRaises(HTTPException) as context:
+            self.analyze("bad_request")
+        self.assertEqual(context.exception.status_code, 400)
+
+
+class TestFakeGroqServer(unittest.TestCase):
+
+    def test_connection_reset(self):
+        with FakeGroqServer(script=["reset"]) as server:
+            client = groq.Groq(api_key="fake-key", base_url=server.base_url, max_retries=0)
+            with self.assertRaises(groq.APIConnectionError):
+                client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], model="m")
+
+    def test_async_client(self):
+        async def call(base_url):
+            client = groq.AsyncGroq(api_key="fake-key", base_url=base_url)
+            return await client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], model="m")
+
+        with FakeGroqServer() as server:
+            completion = asyncio.run(call(server.base_url))
+        self.assertEqual(completion.choices[0].finish_reason, "stop")
+        self.assertGreater(completion.usage.total_tokens, 0)
+
+    def test_server_error_bursts(self):
+        server = FakeGroqServer(server_error_rate=1.0, server_error_burst=3, seed=1)
+        first = server.next_behavior()
+        # Once a burst starts it runs its full length regardless of the rates
+        server.rates = []
+        burst = [server.next_behavior() for _ in range(3)]
+        server.stop()
+        self.assertEqual([first] + burst, ["server_error"] * 3 + ["ok"])
+
+    def test_latency_distributions_are_seeded(self):
+        import random
+        samples = [LatencyModel("lognormal", 300, rng=random.Random(7)).sample() for _ in range(2)]
+        self.assertEqual(samples[0], samples[1])
+        self.assertGreater(samples[0], 0)
+
+
+def test_fake_groq_fixture(fake_groq):
+    fake_groq.script = ["fenced"]
+    result = analyze_text_with_groq("Thanks for today.")
+    assert result["sentiment"] == "negative"
+    assert fake_groq.served == ["fenced"]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.health import (
+    HEALTH_ALPHA,
+    HEALTH_BASELINE,
+    HEALTH_UPDATE_ATTEMPTS,
+    analysis_score,
+    apply_scores,
+    flag_severity,
+    update_health,
+)
+
+NOW = datetime(2026, 10, 1, 12)
+
+
+class TestAnalysisScore(unittest.TestCase):
+
+    def test_sentiment_and_flag_severity(self):
+        self.assertEqual(analysis_score("positive", []), 90.0)
+        self.assertEqual(analysis_score("negative", [{"type": "emotional_concern", "description": "frustration"}]), 32.0)
+        self.assertEqual(flag_severity({"type": "emotional_concern", "description": "Manipulation"}), 3)
+        # Penalties are capped so one analysis can't zero the score on its own
+        self.assertEqual(analysis_score("neutral", [{"description": "threat"}] * 5), 30.0)
+
+
+class TestUpdateHealth(unittest.TestCase):
+
+    def test_first_analysis_moves_from_baseline(self):
+        state = update_health(None, 40.0, NOW)
+        self.assertAlmostEqual(state["score"], HEALTH_BASELINE + HEALTH_ALPHA * (40.0 - HEALTH_BASELINE))
+        self.assertEqual(state["samples"], 1)
+
+    def test_older_evidence_decays(self):
+        state = {"score": 80.0, "samples": 10, "updated_at": NOW}
+        soon = update_health(state, 40.0, NOW + timedelta(minutes=1))
+        later = update_health(state, 40.0, NOW + timedelta(days=30))
+        self.assertLess(later["score"], soon["score"])
+        self.assertEqual(later["updated_at"], NOW + timedelta(days=30))
+
+
+class TestApplyScores(unittest.TestCase):
+
+    def test_retries_when_another_writer_got_there_first(self):
+        collection = MagicMock()
+        collection.find_one = AsyncMock(return_value={"health": {"score": 60.0, "samples": 3, "updated_at": NOW}})
+        collection.update_one = AsyncMock(side_effect=[
+            MagicMock(matched_count=0, upserted_id=None), MagicMock(matched_count=1),
+        ])
+        stale = {"health": {"score": 80.0, "samples": 2, "updated_at": NOW}}
+
+        _, snapshots = asyncio.run(apply_scores(
+            collection, {"id": "r1"}, [(70.0, NOW)], current=stale, update={"$set": {"sentiment": "neutral"}}
+        ))
+
+        first_guard = collection.update_one.call_args_list[0].args[0]
+        retry_guard, retry_update = collection.update_one.call_args_list[1].args
+        self.assertEqual(first_guard, {"id": "r1", "health.samples": 2})
+        self.assertEqual(retry_guard, {"id": "r1", "health.samples": 3})
+        self.assertEqual(retry_update["$set"]["sentiment"], "neutral")
+        self.assertEqual(retry_update["$set"]["health"]["samples"], 4)
+        self.assertEqual(snapshots, [62])
+
+    def test_other_changes_survive_when_every_attempt_conflicts(self):
+        collection = MagicMock()
+        collection.find_one = AsyncMock(return_value={"health": {"score": 60.0, "samples": 3, "updated_at": NOW}})
+        collection.update_one = AsyncMock(return_value=MagicMock(matched_count=0, upserted_id=None))
+        collection.find_one_and_update = AsyncMock(return_value={"id": "r1"})
+        entry = {"flags": ["Blame"], "sentiment": "negative"}
+
+        updated, snapshots = asyncio.run(apply_scores(
+            collection, {"id": "r1"}, [(70.0, NOW)],
+            update=lambda snapshots: {"$push": {"flag_history": entry}, "$set": {"trend": snapshots}},
+        ))
+
+        self.assertEqual(collection.update_one.call_count, HEALTH_UPDATE_ATTEMPTS)
+        match, changes = collection.find_one_and_update.call_args.args
+        self.assertEqual(match, {"id": "r1"})
+        self.assertEqual(changes, {"$push": {"flag_history": entry}, "$set": {"trend": []}})
+        self.assertEqual((updated, snapshots), ({"id": "r1"}, []))
+
+    def test_missing_document_is_not_created_without_upsert(self):
+        collection = MagicMock()
+        collection.find_one = AsyncMock(return_value=None)
+        collection.update_one = AsyncMock()
+        self.assertEqual(asyncio.run(apply_scores(collection, {"id": "gone"}, [(70.0, NOW)])), (None, []))
+        collection.update_one.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import unittest
+from datetime import timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.database import utcnow
+from backend.idempotency import (
+    PENDING, IdempotencyKeyInProgress, IdempotencyKeyReused, IdempotencyStore, request_fingerprint,
+)
+
+
+class FakeCollection:
+    """Just enough of a Motor collection: documents by _id, matched on all filter fields."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def _match(self, match):
+        doc = self.docs.get(match["_id"])
+        if doc and all(doc.get(field) == value for field, value in match.items()):
+            return doc
+        return None
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate _id")
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def find_one(self, match):
+        doc = self._match(match)
+        return dict(doc) if doc else None
+
+    async def update_one(self, match, update):
+        doc = self._match(match)
+        if doc:
+            doc.update(update["$set"])
+
+    async def delete_one(self, match):
+        if self._match(match):
+            del self.docs[match["_id"]]
+
+
+class TestIdempotencyStore(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = FakeCollection()
+        self.store = IdempotencyStore(self.collection, max_wait=1, poll_interval=0.01)
+        self.calls = 0
+
+    async def produce(self, delay=0):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return {"id": f"result {self.calls}"}
+
+    def test_retry_gets_the_stored_response(self):
+        async def scenario():
+            first = await self.store.run("/api/analyze:u1", "k1", "f1", self.produce)
+            second = await self.store.run("/api/analyze:u1", "k1", "f1", self.produce)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, ({"id": "result 1"}, False))
+        self.assertEqual(second, ({"id": "result 1"}, True))
+        self.assertEqual(self.calls, 1)
+
+    def test_concurrent_duplicate_waits_for_the_original(self):
+        async def scenario():
+            return await asyncio.gather(
+                self.store.run("/api/analyze:u1", "k1", "f1", lambda: self.produce(0.05)),
+                self.store.run("/api/analyze:u1", "k1", "f1", lambda: self.produce(0.05)),
+            )
+
+        (first, replayed_first), (second, replayed_second) = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual((replayed_first, replayed_second), (False, True))
+        self.assertEqual(self.calls, 1)
+
+    def test_duplicate_still_running_after_the_wait_is_a_conflict(self):
+        self.store.max_wait = 0.05
+
+        async def scenario():
+            return await asyncio.gather(
+                self.store.run("/api/analyze:u1", "k1", "f1", lambda: self.produce(0.2)),
+                self.store.run("/api/analyze:u1", "k1", "f1", self.produce),
+                return_exceptions=True,
+            )
+
+        original, duplicate = asyncio.run(scenario())
+        self.assertEqual(original, ({"id": "result 1"}, False))
+        self.assertIsInstance(duplicate, IdempotencyKeyInProgress)
+
+    def test_key_reused_for_another_request(self):
+        async def scenario():
+            for body in (b'{"text": "a"}', b'{"text": "b"}'):
+                await self.store.run("/api/analyze:u1", "k1", request_fingerprint("/api/analyze", body), self.produce)
+
+        with self.assertRaises(IdempotencyKeyReused):
+            asyncio.run(scenario())
+
+    def test_failed_request_releases_its_key(self):
+        async def fail():
+            raise RuntimeError("Groq unavailable")
+
+        async def scenario():
+            with self.assertRaises(RuntimeError):
+                await self.store.run("/api/analyze:u1", "k1", "f1", fail)
+            return await self.store.run("/api/analyze:u1", "k1", "f1", self.produce)
+
+        self.assertEqual(asyncio.run(scenario()), ({"id": "result 1"}, False))
+
+    def test_responses_not_kept_release_the_key(self):
+        async def scenario():
+            first = await self.store.run("/api/analyze:u1", "k1", "f1", self.produce, keep=lambda response: False)
+            second = await self.store.run("/api/analyze:u1", "k1", "f1", self.produce)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, ({"id": "result 1"}, False))
+        self.assertEqual(second, ({"id": "result 2"}, False))
+
+    def test_abandoned_key_is_taken_over(self):
+        self.collection.docs["/api/analyze:u1:k1"] = {
+            "_id": "/api/analyze:u1:k1", "fingerprint": "f1", "status": PENDING, "owner": "crashed",
+            "created_at": utcnow() - timedelta(seconds=self.store.lease + 1),
+            "lease_until": utcnow() - timedelta(seconds=1),
+        }
+        result = asyncio.run(self.store.run("/api/analyze:u1", "k1", "f1", self.produce))
+        self.assertEqual(result, ({"id": "result 1"}, False))
+
+    def test_long_running_original_keeps_its_key(self):
+        self.store.lease = 0.05  # Renewed every ~17ms
+        other_worker = IdempotencyStore(self.collection, lease=0.05, max_wait=1, poll_interval=0.01)
+
+        async def scenario():
+            original = asyncio.create_task(self.store.run("/api/analyze:u1", "k1", "f1", lambda: self.produce(0.2)))
+            await asyncio.sleep(0.1)  # Past the first lease
+            retry = await other_worker.run("/api/analyze:u1", "k1", "f1", self.produce)
+            return await original, retry
+
+        original, retry = asyncio.run(scenario())
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(retry, ({"id": "result 1"}, True))
+        self.assertEqual(original, ({"id": "result 1"}, False))
+
+    def test_fingerprint_covers_path_and_body(self):
+        fingerprint = request_fingerprint("/api/relationships/r1/analyze", b'{"text": "a"}')
+        self.assertEqual(fingerprint, request_fingerprint("/api/relationships/r1/analyze", b'{"text": "a"}'))
+        self.assertNotEqual(fingerprint, request_fingerprint("/api/relationships/r2/analyze", b'{"text": "a"}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.jobs import (
+    JobQueue,
+    WorkerPool,
+    PermanentJobError,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_FAILED,
+)
+
+
+def make_job(**overrides):
+    job = {
+        "id": "job-1",
+        "kind": "analyze",
+        "payload": {},
+        "attempts": 1,
+        "max_attempts": 3,
+        "worker_id": "w-1",
+    }
+    job.update(overrides)
+    return job
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = MagicMock()
+        self.collection.update_one = AsyncMock()
+        self.queue = JobQueue(self.collection, visibility_timeout=10, max_attempts=3)
+
+    def _last_set(self):
+        args, _ = self.collection.update_one.call_args
+        return args[1]["$set"]
+
+    def test_expired_lease_is_reclaimed_only_while_attempts_remain(self):
+        self.collection.update_many = AsyncMock()
+        self.collection.find_one_and_update = AsyncMock(return_value=None)
+        asyncio.run(self.queue.claim("w-2"))
+
+        expired_match, expired_update = self.collection.update_many.call_args.args
+        self.assertEqual(expired_match["status"], JOB_RUNNING)
+        self.assertEqual(expired_match["$expr"], {"$gte": ["$attempts", "$max_attempts"]})
+        self.assertEqual(expired_update["$set"]["status"], JOB_FAILED)
+        reclaim = self.collection.find_one_and_update.call_args.args[0]["$or"][1]
+        self.assertEqual(reclaim["$expr"], {"$lt": ["$attempts", "$max_attempts"]})
+
+    def test_jobs_are_only_visible_to_their_user(self):
+        self.collection.insert_one = AsyncMock()
+        self.collection.find_one = AsyncMock(return_value=None)
+        job = asyncio.run(self.queue.enqueue("analyze", {"messages": []}, user_id="u1"))
+        self.assertEqual(self.collection.insert_one.call_args.args[0]["user_id"], "u1")
+
+        asyncio.run(self.queue.get(job["id"], "u2"))
+        self.assertEqual(self.collection.find_one.call_args.args[0], {"id": job["id"], "user_id": "u2"})
+
+    def test_fail_requeues_while_attempts_remain(self):
+        asyncio.run(self.queue.fail(make_job(attempts=1), "boom"))
+        update = self._last_set()
+        self.assertEqual(update["status"], JOB_QUEUED)
+        self.assertIn("available_at", update)
+
+    def test_fail_marks_failed_when_attempts_exhausted(self):
+        asyncio.run(self.queue.fail(make_job(attempts=3), "boom"))
+        self.assertEqual(self._last_set()["status"], JOB_FAILED)
+
+    def test_permanent_failure_skips_retries(self):
+        asyncio.run(self.queue.fail(make_job(attempts=1), "bad request", permanent=True))
+        self.assertEqual(self._last_set()["status"], JOB_FAILED)
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = MagicMock()
+        self.queue.visibility_timeout = 10
+        self.queue.complete = AsyncMock()
+        self.queue.fail = AsyncMock()
+        self.queue.extend_lease = AsyncMock(return_value=True)
+
+    def test_successful_job_is_completed(self):
+        handler = AsyncMock(return_value=["ok"])
+        pool = WorkerPool(self.queue, {"analyze": handler}, concurrency=1)
+        job = make_job()
+        asyncio.run(pool._execute(job))
+        self.queue.complete.assert_awaited_once_with(job, ["ok"])
+        self.queue.fail.assert_not_awaited()
+
+    def test_transient_error_is_retried(self):
+        handler = AsyncMock(side_effect=RuntimeError("timeout"))
+        pool = WorkerPool(self.queue, {"analyze": handler}, concurrency=1)
+        job = make_job()
+        asyncio.run(pool._execute(job))
+        self.queue.fail.assert_awaited_once_with(job, "timeout")
+
+    def test_permanent_error_is_not_retried(self):
+        handler = AsyncMock(side_effect=PermanentJobError("invalid"))
+        pool = WorkerPool(self.queue, {"analyze": handler}, concurrency=1)
+        job = make_job()
+        asyncio.run(pool._execute(job))
+        self.queue.fail.assert_awaited_once_with(job, "invalid", permanent=True)
+
+    def test_lost_lease_stops_the_handler(self):
+        self.queue.visibility_timeout = 0.02
+        self.queue.extend_lease = AsyncMock(return_value=False)
+        stopped = asyncio.Event()
+
+        async def handler(job, queue):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        pool = WorkerPool(self.queue, {"analyze": handler}, concurrency=1)
+        asyncio.run(asyncio.wait_for(pool._execute(make_job()), timeout=1))
+        self.assertTrue(stopped.is_set())
+        self.queue.complete.assert_not_awaited()
+        self.queue.fail.assert_not_awaited()
+
+    def test_unknown_kind_fails_permanently(self):
+        pool = WorkerPool(self.queue, {}, concurrency=1)
+        asyncio.run(pool._execute(make_job(kind="mystery")))
+        _, kwargs = self.queue.fail.call_args
+        self.assertTrue(kwargs["permanent"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from backend.journal_pipeline import JOURNAL_MAX_ATTEMPTS, JournalPipeline, pack_entries
+
+
+def entry(entry_id, content):
+    return {"id": entry_id, "user_id": "u1", "content": content}
+
+
+class TestPackEntries(unittest.TestCase):
+
+    def test_short_entries_are_packed(self):
+        entries = [entry(str(i), "short") for i in range(7)]
+        groups = pack_entries(entries, max_chars=100, pack_size=5)
+        self.assertEqual([len(g) for g in groups], [5, 2])
+
+    def test_long_entries_go_alone(self):
+        entries = [entry("a", "short"), entry("b", "x" * 200), entry("c", "short")]
+        groups = pack_entries(entries, max_chars=100, pack_size=5)
+        self.assertEqual([[e["id"] for e in g] for g in groups], [["b"], ["a", "c"]])
+
+
+class TestAnalyzeGroup(unittest.TestCase):
+
+    def setUp(self):
+        self.raw = {"sentiment": "neutral", "emotional_tone": "calm", "emotional_flags": []}
+
+    @patch('backend.journal_pipeline.analyze_text_with_groq')
+    @patch('backend.journal_pipeline.analyze_texts_with_groq')
+    def test_packed_group_uses_one_call(self, mock_batch, mock_single):
+        mock_batch.return_value = [self.raw, self.raw]
+        pipeline = JournalPipeline(MagicMock())
+        results = asyncio.run(pipeline._analyze_group([entry("a", "one"), entry("b", "two")]))
+        self.assertEqual(len(results), 2)
+        self.assertIn("interpretation", results[0])
+        mock_single.assert_not_called()
+        self.assertEqual(pipeline.stats["groq_calls"], 1)
+
+    @patch('backend.journal_pipeline.analyze_text_with_groq')
+    @patch('backend.journal_pipeline.analyze_texts_with_groq')
+    def test_unusable_packed_response_falls_back(self, mock_batch, mock_single):
+        mock_batch.return_value = None
+        mock_single.return_value = self.raw
+        pipeline = JournalPipeline(MagicMock())
+        results = asyncio.run(pipeline._analyze_group([entry("a", "one"), entry("b", "two")]))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(mock_single.call_count, 2)
+
+
+class TestStoreAndRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.db.journal_analyses.insert_one = AsyncMock()
+        self.db.journal_analyses.delete_one = AsyncMock()
+        self.db.journal_entries.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+        self.db.journal_stats.update_one = AsyncMock()
+        self.pipeline = JournalPipeline(self.db)
+        self.analysis = {"sentiment": "neutral", "emotional_flags": []}
+
+    def test_entry_already_done_is_not_counted_again(self):
+        self.db.journal_entries.update_one.return_value = MagicMock(modified_count=0)
+
+        stored = asyncio.run(self.pipeline._store(entry("a", "one"), self.analysis))
+
+        self.assertFalse(stored)
+        match = self.db.journal_entries.update_one.call_args.args[0]
+        self.assertEqual(match, {"id": "a", "analysis_status": {"$ne": "done"}})
+        self.db.journal_analyses.delete_one.assert_awaited_once()
+        self.db.journal_stats.update_one.assert_not_called()
+
+    @patch('backend.journal_pipeline.JOURNAL_RETRY_BACKOFF', 0.01)
+    def test_failed_entry_is_retried_in_process(self):
+        self.pipeline._analyze_group = AsyncMock(side_effect=[RuntimeError("Groq unavailable"), [self.analysis]])
+
+        async def scenario():
+            await self.pipeline._process_group([entry("a", "one")], {"a": 0.0})
+            _, retried = await asyncio.wait_for(self.pipeline.queue.get(), timeout=1)
+            await self.pipeline._process_group([retried], {"a": 0.0})
+            return retried
+
+        retried = asyncio.run(scenario())
+
+        self.assertEqual(retried["analysis_attempts"], 1)
+        failure = self.db.journal_entries.update_one.call_args_list[0].args[1]
+        self.assertEqual(failure["$set"]["analysis_status"], "pending")
+        self.assertEqual(self.pipeline.stats["processed"], 1)
+
+    def test_last_attempt_marks_the_entry_failed(self):
+        last = {**entry("a", "one"), "analysis_attempts": JOURNAL_MAX_ATTEMPTS - 1}
+        self.pipeline._analyze_group = AsyncMock(side_effect=RuntimeError("Groq unavailable"))
+
+        async def scenario():
+            await self.pipeline._process_group([last], {"a": 0.0})
+            await asyncio.sleep(0.05)
+
+        with patch('backend.journal_pipeline.JOURNAL_RETRY_BACKOFF', 0.01):
+            asyncio.run(scenario())
+
+        failure = self.db.journal_entries.update_one.call_args.args[1]
+        self.assertEqual(failure["$set"]["analysis_status"], "failed")
+        self.assertTrue(self.pipeline.queue.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
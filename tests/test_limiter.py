@@ -0,0 +1,67 @@
+import unittest
+
+from backend.limiter import LIMIT_BACKOFF, AdaptiveLimiter, parse_policies
+
+
+def saturate(limiter, latency, samples):
+    """Complete `samples` calls of `latency` seconds, each while every slot is in use."""
+    for _ in range(samples):
+        while limiter.try_acquire():
+            pass
+        limiter.release(latency)
+
+
+class TestParsePolicies(unittest.TestCase):
+
+    def test_route_templates_and_actions(self):
+        self.assertEqual(
+            parse_policies(" /api/analyze=degrade, /api/relationships/{relationship_id}/analyze=shed ,"),
+            {"/api/analyze": "degrade", "/api/relationships/{relationship_id}/analyze": "shed"},
+        )
+        self.assertEqual(parse_policies(""), {})
+        with self.assertRaisesRegex(ValueError, "Bad overload policy"):
+            parse_policies("/api/analyze=queue")
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+
+    def test_rejects_past_the_limit(self):
+        limiter = AdaptiveLimiter("test", initial=2)
+        self.assertTrue(limiter.try_acquire())
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        limiter.release(None)
+        self.assertTrue(limiter.try_acquire())
+
+    def test_grows_while_latency_holds(self):
+        limiter = AdaptiveLimiter("test", initial=4, max_limit=20)
+        saturate(limiter, 0.2, 100)
+        self.assertEqual(int(limiter.limit), 20)
+
+    def test_shrinks_when_latency_climbs(self):
+        limiter = AdaptiveLimiter("test", initial=16)
+        saturate(limiter, 0.2, 20)
+        grown = limiter.limit
+        saturate(limiter, 1.0, 20)
+        self.assertLess(limiter.limit, grown * 0.6)
+        self.assertGreaterEqual(limiter.retry_after(), 1)
+
+    def test_idle_slots_are_no_reason_to_grow(self):
+        limiter = AdaptiveLimiter("test", initial=16)
+        for _ in range(50):
+            limiter.try_acquire()
+            limiter.release(0.2)
+        self.assertEqual(limiter.limit, 16)
+
+    def test_failures_back_off(self):
+        limiter = AdaptiveLimiter("test", initial=10, min_limit=9)
+        limiter.try_acquire()
+        limiter.release(5.0, ok=False)
+        self.assertAlmostEqual(limiter.limit, 10 * LIMIT_BACKOFF)
+        limiter.try_acquire()
+        limiter.release(5.0, ok=False)
+        self.assertEqual(limiter.limit, 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
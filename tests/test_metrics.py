@@ -0,0 +1,66 @@
+import unittest
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from backend.metrics import PrometheusMiddleware, MongoCommandMetrics
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestPrometheusMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(PrometheusMiddleware)
+
+        @app.get("/api/items/{item_id}")
+        async def get_item(item_id: str):
+            return {"id": item_id}
+
+        @app.get("/api/events")
+        async def events():
+            return {"in_flight": sample("http_requests_in_flight", {"method": "GET"})}
+
+        self.client = TestClient(app)
+
+    def test_latency_is_labelled_with_route_template(self):
+        labels = {"method": "GET", "route": "/api/items/{item_id}", "status": "200"}
+        before = sample("http_request_duration_seconds_count", labels)
+        self.client.get("/api/items/1")
+        self.client.get("/api/items/2")
+        self.assertEqual(sample("http_request_duration_seconds_count", labels), before + 2)
+
+    def test_unmatched_paths_share_one_label(self):
+        labels = {"method": "GET", "route": "unmatched", "status": "404"}
+        before = sample("http_request_duration_seconds_count", labels)
+        self.client.get("/nope/1")
+        self.client.get("/nope/2")
+        self.assertEqual(sample("http_request_duration_seconds_count", labels), before + 2)
+
+    def test_event_streams_are_not_counted_in_flight(self):
+        before = sample("http_requests_in_flight", {"method": "GET"})
+        self.assertEqual(self.client.get("/api/events").json()["in_flight"], before)
+
+
+class TestMongoCommandMetrics(unittest.TestCase):
+
+    def test_command_is_timed_by_collection(self):
+        listener = MongoCommandMetrics()
+        labels = {"collection": "relationships", "operation": "find", "outcome": "success"}
+        before = sample("mongo_operation_duration_seconds_count", labels)
+        listener.started(SimpleNamespace(
+            command_name="find", command={"find": "relationships"}, connection_id=("h", 1), request_id=7
+        ))
+        listener.succeeded(SimpleNamespace(
+            command_name="find", connection_id=("h", 1), request_id=7, duration_micros=1500
+        ))
+        self.assertEqual(sample("mongo_operation_duration_seconds_count", labels), before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
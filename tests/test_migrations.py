@@ -0,0 +1,133 @@
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.database import to_json, to_utc
+from pymongo.errors import OperationFailure
+
+from backend.migrations import (
+    LATER_TIMESTAMP_FIELDS, backfill_user_ids, dedupe_growth_plans, migrate_timestamps, parse_legacy_timestamp, timestamp_update,
+)
+
+
+class TestParseLegacyTimestamp(unittest.TestCase):
+
+    def test_strings_become_naive_utc(self):
+        self.assertEqual(parse_legacy_timestamp("2026-10-01T12:30:00.123456"),
+                         datetime(2026, 10, 1, 12, 30, 0, 123456))
+        self.assertEqual(parse_legacy_timestamp("2026-10-01T14:30:00+02:00"), datetime(2026, 10, 1, 12, 30))
+        self.assertIsNone(parse_legacy_timestamp("yesterday"))
+        self.assertIsNone(parse_legacy_timestamp(datetime(2026, 10, 1)))
+        self.assertIsNone(parse_legacy_timestamp(None))
+
+    def test_to_utc_and_to_json(self):
+        aware = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+        self.assertEqual(to_utc(aware), datetime(2026, 10, 1, 12))
+        self.assertEqual(to_json({"at": [datetime(2026, 10, 1, 12)]}), {"at": ["2026-10-01T12:00:00"]})
+
+
+class TestTimestampUpdate(unittest.TestCase):
+
+    def test_guards_on_old_values(self):
+        doc = {
+            "_id": 1,
+            "created_at": "2026-10-01T12:00:00",
+            "last_contact": datetime(2026, 10, 2),
+            "flag_history": [{"date": "2026-10-01T12:00:00", "flags": []}],
+        }
+        update = timestamp_update(doc, ["created_at", "last_contact", "updated_at"])
+        self.assertEqual(update._filter, {
+            "_id": 1,
+            "created_at": "2026-10-01T12:00:00",
+            "flag_history": {"$size": 1},
+        })
+        self.assertEqual(update._doc["$set"], {
+            "created_at": datetime(2026, 10, 1, 12),
+            "flag_history": [{"date": datetime(2026, 10, 1, 12), "flags": []}],
+        })
+
+    def test_nothing_to_convert(self):
+        self.assertIsNone(timestamp_update({"_id": 1, "created_at": datetime(2026, 10, 1)}, ["created_at"]))
+
+
+def mock_collection(pages):
+    """Collection whose paged find() returns `pages` in turn."""
+    collection = MagicMock()
+    cursor = collection.find.return_value.sort.return_value.limit.return_value
+    cursor.to_list = AsyncMock(side_effect=pages)
+    collection.bulk_write = AsyncMock(return_value=MagicMock(modified_count=1))
+    return collection
+
+
+class TestMigrateTimestamps(unittest.TestCase):
+
+    def test_pages_by_id_and_skips_unparseable(self):
+        db = MagicMock()
+        db.analysis_results = mock_collection([
+            [{"_id": 1, "created_at": "2026-10-01T12:00:00"}, {"_id": 2, "created_at": "not a date"}],
+            [],
+        ])
+        db.relationships = mock_collection([[]])
+
+        converted = asyncio.run(migrate_timestamps(db, batch_size=2, pause=0))
+
+        self.assertEqual(converted, 1)
+        updates = db.analysis_results.bulk_write.call_args.args[0]
+        self.assertEqual(len(updates), 1)
+        second_query = db.analysis_results.find.call_args_list[1].args[0]
+        self.assertEqual(second_query["_id"], {"$gt": 2})
+        db.relationships.bulk_write.assert_not_called()
+
+    def test_later_collections_are_converted_by_their_own_run(self):
+        db = MagicMock(**{name: mock_collection([[]]) for name in LATER_TIMESTAMP_FIELDS})
+        db.journal_entries = mock_collection([[{"_id": 1, "created_at": "2026-10-01T12:00:00"}], []])
+
+        converted = asyncio.run(migrate_timestamps(db, pause=0, timestamp_fields=LATER_TIMESTAMP_FIELDS))
+
+        self.assertEqual(converted, 1)
+        update = db.journal_entries.bulk_write.call_args.args[0][0]
+        self.assertEqual(update._doc, {"$set": {"created_at": datetime(2026, 10, 1, 12)}})
+        db.analysis_results.find.assert_not_called()
+
+
+class TestBackfillUserIds(unittest.TestCase):
+
+    def test_sets_null_owner_and_drops_unscoped_indexes(self):
+        collections = {}
+        for name in ("analysis_results", "relationships", "transcript_imports"):
+            collection = mock_collection([[{"_id": 1}, {"_id": 2}], []] if name == "analysis_results" else [[]])
+            collection.drop_index = AsyncMock(side_effect=OperationFailure("index not found"))
+            collections[name] = collection
+        db = MagicMock(**collections)
+
+        asyncio.run(backfill_user_ids(db, batch_size=2, pause=0))
+
+        updates = collections["analysis_results"].bulk_write.call_args.args[0]
+        self.assertEqual(updates[0]._filter, {"_id": 1, "user_id": {"$exists": False}})
+        self.assertEqual(updates[0]._doc, {"$set": {"user_id": None}})
+        dropped = [c.args[0] for c in collections["analysis_results"].drop_index.call_args_list]
+        self.assertEqual(dropped, ["created_at_-1", "relationship_id_1_created_at_-1"])
+
+
+class TestDedupeGrowthPlans(unittest.TestCase):
+
+    def test_keeps_one_plan_per_user_then_builds_unique_index(self):
+        async def groups():
+            yield {"_id": "u1", "ids": [3, 1, 2], "count": 3}
+            yield {"_id": None, "ids": [5, 4], "count": 2}
+
+        db = MagicMock()
+        db.growth_plans.aggregate = MagicMock(return_value=groups())
+        db.growth_plans.delete_many = AsyncMock(side_effect=[MagicMock(deleted_count=2), MagicMock(deleted_count=1)])
+        db.growth_plans.create_index = AsyncMock()
+
+        self.assertEqual(asyncio.run(dedupe_growth_plans(db)), 3)
+
+        deleted = [c.args[0] for c in db.growth_plans.delete_many.call_args_list]
+        self.assertEqual(deleted, [{"_id": {"$in": [1, 2]}}, {"_id": {"$in": [4]}}])
+        db.growth_plans.create_index.assert_awaited_once_with("user_id", unique=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
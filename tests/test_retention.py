@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.retention import ARCHIVED_FIELDS, RetentionJob, archive_analyses, archive_batch, pack, unpack
+
+NOW = datetime(2026, 10, 1, 12)
+
+
+def analysis(i):
+    return {
+        "id": f"a{i}", "user_id": "u1", "relationship_id": "r1", "text": f"message {i}",
+        "sentiment": "neutral", "flags": [], "created_at": NOW - timedelta(days=400 - i),
+    }
+
+
+def mock_db(*batches):
+    db = MagicMock()
+    db.analysis_results.distinct = AsyncMock(return_value=["u1"])
+    db.analysis_results.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+        side_effect=list(batches) + [[]]
+    )
+    db.analysis_results.update_many = AsyncMock(return_value=MagicMock(modified_count=2))
+    db.analysis_archive.insert_one = AsyncMock()
+    return db
+
+
+class TestArchive(unittest.TestCase):
+
+    def test_pack_round_trip(self):
+        docs = [analysis(0), analysis(1)]
+        self.assertEqual(unpack(pack(docs))[1]["text"], "message 1")
+        self.assertEqual(unpack(pack(docs))[0]["created_at"], docs[0]["created_at"].isoformat())
+
+    def test_batch_is_archived_before_originals_are_compacted(self):
+        db = mock_db()
+        docs = [analysis(0), analysis(1)]
+        self.assertEqual(asyncio.run(archive_batch(db, "u1", docs)), 2)
+
+        archive = db.analysis_archive.insert_one.call_args.args[0]
+        self.assertEqual(archive["analysis_ids"], ["a0", "a1"])
+        self.assertEqual(unpack(archive["data"]), unpack(pack(docs)))
+        match, update = db.analysis_results.update_many.call_args.args
+        self.assertEqual(match, {"user_id": "u1", "id": {"$in": ["a0", "a1"]}, "archived_at": {"$exists": False}})
+        self.assertEqual(set(update["$unset"]), set(ARCHIVED_FIELDS))
+        self.assertNotIn("sentiment", update["$unset"])
+        self.assertEqual(update["$set"]["archive_id"], archive["id"])
+
+    def test_batches_continue_from_the_last_one(self):
+        first, second = [analysis(0), analysis(1)], [analysis(2)]
+        db = mock_db(first, second)
+        on_archived = AsyncMock()
+        cutoff = NOW - timedelta(days=180)
+
+        asyncio.run(archive_analyses(db, cutoff, pause=0, on_archived=on_archived))
+
+        queries = [call.args[0] for call in db.analysis_results.find.call_args_list]
+        self.assertEqual(queries[0]["created_at"], {"$lt": cutoff})
+        self.assertEqual(queries[1]["created_at"], {"$lt": cutoff, "$gte": first[-1]["created_at"]})
+        on_archived.assert_called_with("u1", {"r1"})
+
+
+class TestRetentionJob(unittest.TestCase):
+
+    def test_each_run_covers_every_unarchived_analysis(self):
+        # An import can insert analyses older than anything a previous run reached
+        db = mock_db()
+        db.retention.update_one = AsyncMock()
+
+        self.assertEqual(asyncio.run(RetentionJob(db, retention_days=180).run_once(NOW)), 0)
+
+        query = db.analysis_results.find.call_args.args[0]
+        self.assertEqual(query, {"user_id": "u1", "created_at": {"$lt": NOW - timedelta(days=180)},
+                                 "archived_at": {"$exists": False}})
+
+    def test_skips_while_another_worker_holds_the_lease(self):
+        db = mock_db()
+        db.retention.update_one = AsyncMock(side_effect=DuplicateKeyError("leased"))
+        self.assertIsNone(asyncio.run(RetentionJob(db, retention_days=180).run_once(NOW)))
+        db.analysis_results.distinct.assert_not_called()
+
+    def test_disabled_without_retention(self):
+        job = RetentionJob(MagicMock(), retention_days=0)
+        job.start()
+        self.assertIsNone(job._task)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import unittest
+
+from backend.scheduler import BACKGROUND, BATCH, INTERACTIVE, GroqScheduler
+
+
+async def drain(scheduler, arrivals):
+    """Queue (priority, name) arrivals behind a held slot; returns the order they are granted."""
+    order = []
+    await scheduler.acquire(INTERACTIVE)  # The one slot, so everything else queues
+
+    async def call(priority, name):
+        await scheduler.acquire(priority)
+        order.append(name)
+        scheduler.release(priority)
+
+    tasks = []
+    for priority, name in arrivals:
+        tasks.append(asyncio.create_task(call(priority, name)))
+        await asyncio.sleep(0)
+    scheduler.release(INTERACTIVE)
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestGroqScheduler(unittest.TestCase):
+
+    def test_runs_in_a_worker_thread(self):
+        scheduler = GroqScheduler(concurrency=2)
+        name = asyncio.run(scheduler.run(BATCH, lambda prefix: prefix + threading.current_thread().name, "in "))
+        self.assertTrue(name.startswith("in groq"))
+        self.assertEqual(scheduler.running, 0)
+
+    def test_weighted_share_when_saturated(self):
+        scheduler = GroqScheduler(concurrency=1, weights={INTERACTIVE: 3, BATCH: 1})
+        arrivals = [(BATCH, f"b{i}") for i in range(4)] + [(INTERACTIVE, f"i{i}") for i in range(6)]
+        order = asyncio.run(drain(scheduler, arrivals))
+        # Batch arrived first, but interactive gets three slots for each batch one
+        self.assertEqual(order[:5], ["b0", "i0", "i1", "i2", "b1"])
+
+    def test_class_caps_leave_room_for_interactive(self):
+        async def scenario():
+            scheduler = GroqScheduler(concurrency=3, limits={BATCH: 2})
+            release = asyncio.Event()
+
+            async def hold(priority):
+                await scheduler.acquire(priority)
+                await release.wait()
+                scheduler.release(priority)
+
+            batch = [asyncio.create_task(hold(BATCH)) for _ in range(5)]
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.snapshot()[BATCH]["running"], 2)
+            self.assertEqual(scheduler.snapshot()[BATCH]["waiting"], 3)
+            await asyncio.wait_for(scheduler.acquire(INTERACTIVE), timeout=1)
+            scheduler.release(INTERACTIVE)
+            release.set()
+            await asyncio.gather(*batch)
+            self.assertEqual(scheduler.running, 0)
+
+        asyncio.run(scenario())
+
+    def test_long_waiters_go_first(self):
+        scheduler = GroqScheduler(concurrency=1, max_wait=0)
+        arrivals = [(BACKGROUND, "g0"), (INTERACTIVE, "i0"), (INTERACTIVE, "i1"), (BACKGROUND, "g1")]
+        self.assertEqual(asyncio.run(drain(scheduler, arrivals)), ["g0", "i0", "i1", "g1"])
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        async def scenario():
+            scheduler = GroqScheduler(concurrency=1)
+            await scheduler.acquire(INTERACTIVE)
+            waiter = asyncio.create_task(scheduler.acquire(BATCH))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            scheduler.release(INTERACTIVE)
+            self.assertEqual(scheduler.running, 0)
+            self.assertEqual(scheduler.snapshot()[BATCH]["waiting"], 0)
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
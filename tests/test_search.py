@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.search import SEARCH_DEFAULT_FIELDS, decode_cursor, encode_cursor, parse_fields, run_search, search_pipeline
+
+QUERY = {"user_id": "u1"}
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor("score", {"score": 1.75, "id": "a9"}), "score"), (1.75, "a9"))
+        at = datetime(2026, 10, 1, 12, 30)
+        self.assertEqual(decode_cursor(encode_cursor("recent", {"created_at": at, "id": "a9"}), "recent"), (at, "a9"))
+
+    def test_rejects_garbage_and_other_sort(self):
+        with self.assertRaisesRegex(ValueError, "Invalid search cursor"):
+            decode_cursor("not-a-cursor", "score")
+        with self.assertRaisesRegex(ValueError, "sort='score'"):
+            decode_cursor(encode_cursor("score", {"score": 1.0, "id": "a"}), "recent")
+
+
+class TestSearchPipeline(unittest.TestCase):
+
+    def test_text_match_comes_first_with_filters(self):
+        pipeline = search_pipeline(QUERY, "budget", flag_types=["boundary_issue"])
+        self.assertEqual(pipeline[0], {"$match": {
+            "user_id": "u1", "$text": {"$search": "budget"}, "flags.type": {"$in": ["boundary_issue"]},
+        }})
+
+    def test_score_cursor_filters_after_scoring(self):
+        cursor = encode_cursor("score", {"score": 2.5, "id": "a5"})
+        pipeline = search_pipeline(QUERY, "budget", cursor=cursor, limit=10)
+        self.assertEqual(pipeline[2], {"$match": {"$or": [
+            {"score": {"$lt": 2.5}}, {"score": 2.5, "id": {"$lt": "a5"}},
+        ]}})
+        self.assertEqual(pipeline[3:5], [{"$sort": {"score": -1, "id": -1}}, {"$limit": 11}])
+
+    def test_recent_cursor_is_part_of_the_match(self):
+        at = datetime(2026, 10, 1)
+        pipeline = search_pipeline(QUERY, "budget", sort="recent", cursor=encode_cursor("recent", {"created_at": at, "id": "a5"}))
+        self.assertEqual(pipeline[0]["$match"]["$or"], [
+            {"created_at": {"$lt": at}}, {"created_at": at, "id": {"$lt": "a5"}},
+        ])
+        self.assertEqual(pipeline[1], {"$sort": {"created_at": -1, "id": -1}})
+
+    def test_projection_and_fields(self):
+        pipeline = search_pipeline(QUERY, "budget", fields=["text"])
+        self.assertEqual(pipeline[-1], {"$project": {"_id": 0, "id": 1, "created_at": 1, "score": 1, "text": 1}})
+        self.assertEqual(parse_fields(None, []), list(SEARCH_DEFAULT_FIELDS))
+        with self.assertRaisesRegex(ValueError, "Unknown fields: secret"):
+            parse_fields("text, secret", ["text"])
+        with self.assertRaises(ValueError):
+            search_pipeline(QUERY, "budget", sort="oldest")
+
+
+class TestRunSearch(unittest.TestCase):
+
+    def test_next_cursor_only_when_more_results(self):
+        collection = MagicMock()
+        docs = [{"id": f"a{i}", "score": 3.0 - i} for i in range(3)]
+        collection.aggregate.return_value.to_list = AsyncMock(return_value=docs)
+        results, cursor = asyncio.run(run_search(collection, QUERY, "budget", limit=2))
+        self.assertEqual([doc["id"] for doc in results], ["a0", "a1"])
+        self.assertEqual(decode_cursor(cursor, "score"), (2.0, "a1"))
+
+        collection.aggregate.return_value.to_list = AsyncMock(return_value=docs[:2])
+        self.assertEqual(asyncio.run(run_search(collection, QUERY, "budget", limit=2))[1], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pymongo.errors import DuplicateKeyError
+
+import backend.server as server
+from backend.cache import TTLCache
+from backend.limiter import DEGRADE, AdaptiveLimiter
+from backend.server import MessageInput
+from backend.versions import VersionTracker
+
+
+class TestDegradedAnalysis(unittest.TestCase):
+
+    def test_placeholder_at_capacity_is_returned_but_not_stored(self):
+        limiter = AdaptiveLimiter("test", initial=1, min_limit=1)
+        limiter.try_acquire()  # At capacity
+        db = MagicMock()
+        db.relationships.find_one = AsyncMock(return_value={"id": "r1", "user_id": "u1", "name": "Sam"})
+        message = MessageInput(text="a message that arrives while we are at capacity", user_id="u1",
+                               relationship_id="r1")
+
+        with patch.object(server, "db", db), patch.object(server, "analyze_limiter", limiter), \
+                patch.dict("backend.limiter.OVERLOAD_POLICIES", {"/api/analyze": DEGRADE}), \
+                patch.object(server, "versions") as versions, patch.object(server, "change_feed") as change_feed:
+            result = asyncio.run(server.analyze_and_store(message, route="/api/analyze"))
+
+        self.assertTrue(result.degraded)
+        for collection in (db.analysis_results, db.relationships, db.health_scores):
+            collection.insert_one.assert_not_called()
+            collection.update_one.assert_not_called()
+            collection.find_one_and_update.assert_not_called()
+        versions.bump.assert_not_called()
+        change_feed.notify.assert_not_called()
+
+
+class FakeGrowthPlans:
+    """growth_plans with a unique user_id: a racing upsert fails as Mongo's does."""
+
+    def __init__(self):
+        self.plans = {}
+
+    async def find_one_and_update(self, match, update, projection=None, upsert=False, return_document=None):
+        exists = match["user_id"] in self.plans
+        await asyncio.sleep(0)  # Let concurrent requests interleave between read and write
+        if match["user_id"] in self.plans:
+            if not exists:
+                raise DuplicateKeyError("E11000 duplicate key error")
+            self.plans[match["user_id"]].update(update.get("$set", {}))
+        elif upsert:
+            self.plans[match["user_id"]] = {"user_id": match["user_id"], **update["$setOnInsert"]}
+        else:
+            return None
+        return dict(self.plans[match["user_id"]])
+
+    async def find_one(self, match, projection=None):
+        plan = self.plans.get(match["user_id"])
+        return dict(plan) if plan else None
+
+
+class TestGrowthPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.db.growth_plans = FakeGrowthPlans()
+        version_store = MagicMock()
+        version_store.find_one_and_update = AsyncMock(return_value={"version": 1})
+        self.patches = [
+            patch.object(server, "db", self.db),
+            patch.object(server, "versions", VersionTracker(version_store)),
+            patch.object(server, "growth_plan_cache", TTLCache(maxsize=16, ttl=300)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_concurrent_first_requests_get_one_plan(self):
+        async def scenario():
+            return await asyncio.gather(*(server.get_growth_plan(user_id="u1") for _ in range(3)))
+
+        plans = asyncio.run(scenario())
+        self.assertEqual(len({plan["id"] for plan in plans}), 1)
+        self.assertEqual(len(self.db.growth_plans.plans), 1)
+
+    def test_upsert_losing_the_race_reads_the_winner(self):
+        self.db.growth_plans.find_one_and_update = AsyncMock(side_effect=DuplicateKeyError("E11000"))
+        self.db.growth_plans.plans["u1"] = {"user_id": "u1", "id": "winner", "goals": []}
+
+        plan = asyncio.run(server.get_growth_plan(user_id="u1"))
+
+        self.assertEqual(plan["id"], "winner")
+
+    def test_update_invalidates_the_cached_plan(self):
+        async def scenario():
+            before = await server.get_growth_plan(user_id="u1")
+            await server.update_growth_plan({"goals": ["Listen first"]}, user_id="u1")
+            return before, await server.get_growth_plan(user_id="u1")
+
+        before, after = asyncio.run(scenario())
+        self.assertNotEqual(before["goals"], ["Listen first"])
+        self.assertEqual(after["goals"], ["Listen first"])
+        self.assertEqual(after["id"], before["id"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import patch
+
+from backend.similarity import SimilarityIndex, hamming, normalize_text, simhash
+
+MESSAGE = "Honestly I feel like you never listen to me when I talk about my day at work and it hurts"
+
+
+class TestNormalizeText(unittest.TestCase):
+
+    def test_ignores_punctuation_case_and_emoji(self):
+        self.assertEqual(normalize_text("  I CAN'T believe it!!! 😢😢 "), "i cant believe it")
+        self.assertEqual(normalize_text("sooooo late"), "soo late")
+        self.assertEqual(normalize_text("🙂"), "")
+
+    def test_simhash_is_close_for_small_edits(self):
+        base = simhash(normalize_text(MESSAGE))
+        self.assertEqual(base, simhash(normalize_text(MESSAGE.upper() + "!!")))
+        self.assertGreater(hamming(base, simhash(normalize_text("I love you"))), 10)
+
+
+class TestSimilarityIndex(unittest.TestCase):
+
+    def test_exact_match_after_normalization(self):
+        index = SimilarityIndex(threshold=3)
+        index.add("u1", MESSAGE, "a1")
+        self.assertEqual(index.lookup("u1", MESSAGE.lower() + " 🙄!!"), ("a1", 0))
+        self.assertIsNone(index.lookup("u2", MESSAGE))
+
+    def test_near_match_within_threshold(self):
+        index = SimilarityIndex(threshold=3)
+        index.add("u1", MESSAGE, "a1")
+        edited = MESSAGE.replace("never", "rarely")
+        distance = hamming(simhash(normalize_text(MESSAGE)), simhash(normalize_text(edited)))
+        self.assertIsNone(index.lookup("u1", edited))
+
+        loose = SimilarityIndex(threshold=distance)
+        loose.add("u1", MESSAGE, "a1")
+        self.assertEqual(loose.lookup("u1", edited), ("a1", distance))
+
+    def test_lookup_only_inspects_shared_bands(self):
+        index = SimilarityIndex(threshold=3)
+        for i in range(200):
+            index.add("u1", f"message number {i} about something else entirely", i)
+        with patch('backend.similarity.hamming', wraps=hamming) as compared:
+            index.lookup("u1", MESSAGE)
+        self.assertLess(compared.call_count, 20)
+
+    def test_eviction_keeps_buckets_bounded(self):
+        index = SimilarityIndex(threshold=3, maxsize=2)
+        for i, text in enumerate(["first message here", "second one there", "third is the charm"]):
+            index.add("u1", text, i)
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.lookup("u1", "first message here"))
+        self.assertLessEqual(sum(len(b) for b in index._buckets.values()), 2 * 4)
+
+    @patch('backend.similarity.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        monotonic.return_value = 100.0
+        index = SimilarityIndex(ttl=10)
+        index.add("u1", MESSAGE, "a1")
+        monotonic.return_value = 111.0
+        self.assertIsNone(index.lookup("u1", MESSAGE))
+        self.assertEqual(len(index), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
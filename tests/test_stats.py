@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.health import apply_scores
+from backend.stats import STATS_TREND_POINTS, flag_key, merge_updates, relationship_summary, stats_update
+
+
+class TestStatsUpdate(unittest.TestCase):
+
+    def test_counts_flags_and_caps_the_trend(self):
+        update = stats_update(
+            [{"flags": [{"type": "boundary_issue"}, {"type": "a.b"}]}, {"flags": [{"type": "boundary_issue"}]}, {}],
+            [70, 65],
+        )
+        self.assertEqual(update["$inc"], {
+            "stats.analysis_count": 3, "stats.flag_counts.boundary_issue": 2, "stats.flag_counts.a_b": 1,
+        })
+        self.assertEqual(update["$push"], {"stats.health_trend": {"$each": [70, 65], "$slice": -STATS_TREND_POINTS}})
+        self.assertNotIn("$push", stats_update([{}]))
+        self.assertEqual(flag_key("$where"), "where")
+
+    def test_merge_keeps_every_operator(self):
+        merged = merge_updates({"$set": {"a": 1}, "$push": {"history": 1}}, stats_update([{}], [50]))
+        self.assertEqual(set(merged), {"$set", "$push", "$inc"})
+        self.assertEqual(set(merged["$push"]), {"history", "stats.health_trend"})
+
+    def test_update_can_depend_on_health_snapshots(self):
+        collection = MagicMock()
+        collection.find_one = AsyncMock(return_value={"health": None})
+        collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        _, snapshots = asyncio.run(apply_scores(
+            collection, {"id": "r1"}, [(40.0, datetime(2026, 10, 1))],
+            update=lambda snapshots: stats_update([{}], snapshots),
+        ))
+        changes = collection.update_one.call_args.args[1]
+        self.assertEqual(changes["$push"]["stats.health_trend"]["$each"], snapshots)
+        self.assertIn("health", changes["$set"])
+
+
+class TestRelationshipSummary(unittest.TestCase):
+
+    def test_compact_stats_without_history(self):
+        summary = relationship_summary({
+            "id": "r1", "name": "Sam", "sentiment": "negative", "flag_history": [{}] * 500,
+            "stats": {"analysis_count": 7, "flag_counts": {"a": 1, "b": 5, "c": 2, "d": 3}, "health_trend": [70, 60]},
+        })
+        self.assertNotIn("flag_history", summary)
+        self.assertEqual(summary["stats"], {
+            "analysis_count": 7, "last_sentiment": "negative",
+            "top_flags": [{"type": "b", "count": 5}, {"type": "d", "count": 3}, {"type": "c", "count": 2}],
+            "health_trend": [70, 60],
+        })
+
+    def test_relationship_without_analyses(self):
+        stats = relationship_summary({"id": "r1", "sentiment": "neutral"})["stats"]
+        self.assertEqual(stats, {"analysis_count": 0, "last_sentiment": None, "top_flags": [], "health_trend": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.timing import TimingMiddleware, span
+
+
+class TestTimingMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(TimingMiddleware)
+
+        def blocking_stage():
+            with span("in_thread"):
+                pass
+
+        @app.get("/work")
+        async def work():
+            with span("db"):
+                await asyncio.sleep(0)
+            with span("db"):
+                pass
+            await asyncio.to_thread(blocking_stage)
+            return {"ok": True}
+
+        self.client = TestClient(app)
+
+    def test_server_timing_header_lists_spans(self):
+        response = self.client.get("/work")
+        header = response.headers["server-timing"]
+        names = [part.split(";")[0] for part in header.split(", ")]
+        self.assertEqual(names, ["db", "in_thread", "total"])
+
+    def test_request_id_is_propagated(self):
+        response = self.client.get("/work", headers={"X-Request-ID": "abc123"})
+        self.assertEqual(response.headers["x-request-id"], "abc123")
+
+    def test_span_outside_request_is_a_no_op(self):
+        with span("orphan") as s:
+            pass
+        self.assertIsNone(s.timer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.transcripts import TranscriptParser, iter_lines, parse_timestamp, run_import, stage_transcript
+
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
+def parse(lines, **kwargs):
+    parser = TranscriptParser(**kwargs)
+    messages = [m for m in (parser.feed(line) for line in lines) if m]
+    last = parser.finish()
+    return messages + ([last] if last else []), parser
+
+
+class TestParseTimestamp(unittest.TestCase):
+
+    def test_us_and_day_first_dates(self):
+        self.assertEqual(parse_timestamp("12/31/23", "9:41 PM"), datetime(2023, 12, 31, 21, 41))
+        self.assertEqual(parse_timestamp("03/04/2024", "12:05 am", dayfirst=True), datetime(2024, 4, 3, 0, 5))
+        # A first field above 12 can only be the day
+        self.assertEqual(parse_timestamp("31.12.23", "21:41:05"), datetime(2023, 12, 31, 21, 41, 5))
+        self.assertIsNone(parse_timestamp("99/99/99", "9:41"))
+
+
+class TestTranscriptParser(unittest.TestCase):
+
+    def test_whatsapp_android(self):
+        messages, parser = parse([
+            "12/31/23, 9:40 PM - Messages and calls are end-to-end encrypted.",
+            "12/31/23, 9:41 PM - Alice: are you coming?",
+            "it's getting late",
+            "12/31/23, 9:42 PM - Bob: <Media omitted>",
+            "12/31/23, 9:43 PM - Bob: yes, leaving now",
+        ])
+        self.assertEqual(parser.format, "whatsapp_android")
+        self.assertEqual(messages, [
+            {"speaker": "Alice", "sent_at": datetime(2023, 12, 31, 21, 41), "text": "are you coming?\nit's getting late"},
+            {"speaker": "Bob", "sent_at": datetime(2023, 12, 31, 21, 43), "text": "yes, leaving now"},
+        ])
+        self.assertEqual(parser.skipped_lines, 2)
+
+    def test_whatsapp_ios_with_invisible_marks(self):
+        messages, parser = parse(["\u200e[12/31/23, 9:41:05\u202fPM] Alice: hi"])
+        self.assertEqual(parser.format, "whatsapp_ios")
+        self.assertEqual(messages[0]["sent_at"], datetime(2023, 12, 31, 21, 41, 5))
+
+    def test_continuation_lines_with_colons_stay_in_message(self):
+        messages, _ = parse([
+            "2024-01-02 08:00 Alice: list for today",
+            "Note: buy milk",
+        ])
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0]["text"], "list for today\nNote: buy milk")
+
+    def test_plain_log(self):
+        messages, parser = parse(["Alice: hello", "Bob: hi there", ""])
+        self.assertEqual(parser.format, "plain")
+        self.assertEqual([(m["speaker"], m["sent_at"]) for m in messages], [("Alice", None), ("Bob", None)])
+
+
+class TestIterLines(unittest.TestCase):
+
+    def test_splits_across_chunks_and_multibyte_characters(self):
+        data = "café: one\r\nBob: two".encode("utf-8")
+        chunks = [data[:4], data[4:9], data[9:]]
+
+        async def run():
+            return [line async for line in iter_lines(async_iter(chunks))]
+
+        self.assertEqual(asyncio.run(run()), ["café: one", "Bob: two"])
+
+
+class TestRunImport(unittest.TestCase):
+
+    def test_bounded_pipeline_batches_and_failures(self):
+        in_flight, peak, stored = 0, 0, []
+
+        async def analyze(pack):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            if pack[0]["text"] == "m5":
+                raise RuntimeError("groq down")
+            return [{"text": m["text"]} for m in pack]
+
+        async def store(documents, stats):
+            stored.append(len(documents))
+
+        messages = async_iter({"text": f"m{i}"} for i in range(23))
+        stats = asyncio.run(run_import(messages, analyze, store, concurrency=2, pack_size=5,
+                                       batch_size=4, max_messages=20))
+        self.assertLessEqual(peak, 2)
+        self.assertEqual(stats, {"parsed": 20, "analyzed": 15, "failed": 5, "truncated": True})
+        self.assertEqual(sum(stored), 15)
+        self.assertTrue(all(size <= 4 for size in stored))
+
+    def test_stores_in_chat_order_whatever_finishes_first(self):
+        stored = []
+
+        async def analyze(pack):
+            # Later packs come back first
+            await asyncio.sleep(0.01 * (3 - int(pack[0]["text"][1:]) // 2))
+            return [{"text": m["text"]} for m in pack]
+
+        async def store(documents, stats):
+            stored.extend(doc["text"] for doc in documents)
+
+        messages = async_iter({"text": f"m{i}"} for i in range(6))
+        asyncio.run(run_import(messages, analyze, store, concurrency=3, pack_size=2, batch_size=1))
+        self.assertEqual(stored, [f"m{i}" for i in range(6)])
+
+
+class TestStageTranscript(unittest.TestCase):
+
+    def test_numbers_messages_and_truncates(self):
+        collection = MagicMock()
+        collection.insert_many = AsyncMock()
+        messages = async_iter({"speaker": "Alice", "text": f"m{i}"} for i in range(7))
+
+        stats = asyncio.run(stage_transcript(messages, collection, "imp1", batch_size=2, max_messages=5))
+
+        self.assertEqual(stats, {"parsed": 5, "truncated": True})
+        staged = [doc for call in collection.insert_many.call_args_list for doc in call.args[0]]
+        self.assertEqual([doc["seq"] for doc in staged], [0, 1, 2, 3, 4])
+        self.assertEqual(staged[4], {"speaker": "Alice", "text": "m4", "import_id": "imp1", "seq": 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
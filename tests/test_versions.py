@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.versions import VersionTracker, etag_matches, user_key
+
+
+class AsyncCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+
+class TestEtagMatches(unittest.TestCase):
+
+    def test_matches_listed_and_weak_tags(self):
+        self.assertTrue(etag_matches('"3"', '"3"'))
+        self.assertTrue(etag_matches('"1", W/"3"', '"3"'))
+        self.assertTrue(etag_matches('*', '"3"'))
+        self.assertFalse(etag_matches('"2"', '"3"'))
+        self.assertFalse(etag_matches(None, '"3"'))
+
+    def test_user_key(self):
+        self.assertEqual(user_key("relationships", "u1"), "relationships:u1")
+        self.assertEqual(user_key("relationships", None), "relationships")
+
+
+class TestVersionTracker(unittest.TestCase):
+
+    def test_bump_changes_etag(self):
+        collection = MagicMock()
+        collection.find_one_and_update = AsyncMock(return_value={"_id": "relationships", "version": 4})
+        tracker = VersionTracker(collection)
+        before = tracker.etag("relationships")
+        asyncio.run(tracker.bump("relationships"))
+        self.assertEqual(before, '"0"')
+        self.assertEqual(tracker.etag("relationships"), '"4"')
+
+    def test_bump_falls_back_to_local_counter(self):
+        collection = MagicMock()
+        collection.find_one_and_update = AsyncMock(side_effect=Exception("mongo down"))
+        tracker = VersionTracker(collection)
+        asyncio.run(tracker.bump("analysis_results", "relationships"))
+        self.assertEqual(tracker.etag("analysis_results", "relationships"), '"1-1"')
+
+    def test_refresh_picks_up_other_processes_bumps(self):
+        collection = MagicMock()
+        collection.find.return_value = AsyncCursor([
+            {"_id": "analysis_results", "version": 7},
+            {"_id": "relationships", "version": 1},
+        ])
+        tracker = VersionTracker(collection)
+        tracker.versions["relationships"] = 2
+        asyncio.run(tracker.refresh())
+        self.assertEqual(tracker.versions, {"analysis_results": 7, "relationships": 2})
+        # Later refreshes only fetch recently bumped counters
+        collection.find.return_value = AsyncCursor([])
+        asyncio.run(tracker.refresh())
+        self.assertIn("updated_at", collection.find.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()